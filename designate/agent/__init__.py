@@ -38,6 +38,17 @@ OPTS = [
                help='The backend driver to use'),
     cfg.StrOpt('transfer-source', default=None,
                help='An IP address to be used to fetch zones transferred in'),
+    cfg.FloatOpt('xfr-timeout', default=10.0,
+                 help='Timeout in seconds for each message of a zone transfer '
+                      'from the masters'),
+    cfg.FloatOpt('xfr-connect-timeout', default=5.0,
+                 help='Timeout in seconds for a master to start answering a '
+                      'zone transfer before failing over to the next one'),
+    cfg.IntOpt('transfer-workers', default=10,
+               help='Number of zones the Agent will transfer concurrently'),
+    cfg.FloatOpt('serial-query-timeout', default=1.0,
+                 help='Timeout in seconds for the SOA query sent to the '
+                      'masters to check if a NOTIFY requires a transfer'),
 ]
 
 cfg.CONF.register_opts(OPTS, group='service:agent')
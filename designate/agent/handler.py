@@ -13,17 +13,26 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
+import functools
+import socket
+
 import dns
+import dns.exception
 import dns.opcode
+import dns.query
 import dns.rcode
+import dns.rdatatype
 import dns.message
 import dns.flags
 import dns.opcode
+import eventlet
 from oslo.config import cfg
 from oslo_log import log as logging
 
 from designate import dnsutils
 from designate.backend import agent_backend
+from designate.i18n import _LE
 from designate.i18n import _LW
 from designate.i18n import _LI
 
@@ -44,6 +53,96 @@ CREATE = 65282
 DELETE = 65283
 
 
+def _serial_gt(serial1, serial2):
+    """Compare two SOA serials, accounting for wrap around (RFC 1982)"""
+    return serial1 != serial2 and (serial1 - serial2) % 2 ** 32 < 2 ** 31
+
+
+class TransferQueue(object):
+    """
+    Per-zone deduplicating work queue, served by a bounded pool of workers.
+
+    Work queued for a zone which is already pending is collapsed into the
+    pending entry, a CREATE taking precedence over a NOTIFY. A zone is only
+    ever worked on by a single worker at a time, work queued for a zone while
+    it is being worked on is picked up again once that work completes. This
+    includes a DELETE of a zone being worked on, see discard().
+    """
+    def __init__(self, callback, workers):
+        self.callback = callback
+        self.pool = eventlet.GreenPool(workers)
+
+        self.queue = collections.deque()
+        self.pending = {}
+        self.in_progress = set()
+
+    def enqueue(self, domain_name, action):
+        if domain_name in self.pending:
+            if action == 'CREATE':
+                self.pending[domain_name] = action
+
+            LOG.debug("Collapsed %(action)s for %(name)s into pending work" %
+                      {'action': action, 'name': domain_name})
+            return
+
+        self.pending[domain_name] = action
+
+        if domain_name not in self.in_progress:
+            self.queue.append(domain_name)
+            self._spawn_worker()
+
+    def discard(self, domain_name):
+        """
+        Drop any pending work for a zone.
+
+        Returns True if the zone is being worked on, in which case a DELETE
+        is queued for it instead, and performed once that work completes.
+        """
+        if self.pending.pop(domain_name, None) is not None:
+            try:
+                self.queue.remove(domain_name)
+            except ValueError:
+                pass
+
+        if domain_name in self.in_progress:
+            self.pending[domain_name] = 'DELETE'
+            return True
+
+        return False
+
+    def is_pending(self, domain_name):
+        return domain_name in self.pending or domain_name in self.in_progress
+
+    def wait(self):
+        """Wait for all queued work to complete"""
+        self.pool.waitall()
+
+    def _spawn_worker(self):
+        # NOTE: Never block the caller waiting for a free worker, the busy
+        #       workers will drain the queue before exiting.
+        if self.pool.free() > 0:
+            self.pool.spawn_n(self._worker)
+
+    def _worker(self):
+        while self.queue:
+            domain_name = self.queue.popleft()
+            action = self.pending.pop(domain_name)
+
+            self.in_progress.add(domain_name)
+            try:
+                self.callback(domain_name, action)
+            except Exception:
+                LOG.exception(_LE("Failed to process %(action)s for "
+                                  "%(name)s") %
+                              {'action': action, 'name': domain_name})
+            finally:
+                self.in_progress.discard(domain_name)
+
+                # More work arrived while we were busy with this zone
+                if domain_name in self.pending:
+                    self.queue.append(domain_name)
+
+
 class RequestHandler(object):
     def __init__(self):
         self.masters = []
@@ -57,8 +156,14 @@ class RequestHandler(object):
 
         self.allow_notify = CONF['service:agent'].allow_notify
         self.transfer_source = CONF['service:agent'].transfer_source
+        self.serial_query_timeout = \
+            CONF['service:agent'].serial_query_timeout
+        self.xfr_timeout = CONF['service:agent'].xfr_timeout
+        self.xfr_connect_timeout = CONF['service:agent'].xfr_connect_timeout
         backend_driver = cfg.CONF['service:agent'].backend_driver
         self.backend = agent_backend.get_backend(backend_driver, self)
+        self.transfers = TransferQueue(
+            self._process, CONF['service:agent'].transfer_workers)
 
     def __call__(self, request):
         """
@@ -124,13 +229,7 @@ class RequestHandler(object):
         LOG.debug("Received %(verb)s for %(name)s from %(host)s" %
                  {'verb': "CREATE", 'name': domain_name, 'host': requester})
 
-        try:
-            zone = dnsutils.do_axfr(domain_name, self.masters,
-                source=self.transfer_source)
-            self.backend.create_domain(zone)
-        except Exception:
-            response.set_rcode(dns.rcode.from_text("SERVFAIL"))
-            return response
+        self.transfers.enqueue(domain_name, 'CREATE')
 
         # Provide an authoritative answer
         response.flags |= dns.flags.AA
@@ -143,8 +242,7 @@ class RequestHandler(object):
 
         * Decodes the NOTIFY
         * Checks if the master sending the NOTIFY is allowed to notify
-        * Does a serial check to see if further action needs to be taken
-        * Kicks off an AXFR and returns a valid response
+        * Queues a transfer for the zone and returns a valid response
         """
         response = dns.message.make_response(request)
 
@@ -156,38 +254,88 @@ class RequestHandler(object):
             response.set_rcode(dns.rcode.from_text("REFUSED"))
             return response
 
-        serial = self.backend.find_domain_serial(domain_name)
+        # A zone with queued work is about to exist, even if the backend
+        # doesn't know about it yet.
+        if not self.transfers.is_pending(domain_name):
+            serial = self.backend.find_domain_serial(domain_name)
 
-        if serial is None:
-            LOG.warn(_LW("Refusing NOTIFY for %(name)s, doesn't exist") %
-                 {'name': domain_name})
-            response.set_rcode(dns.rcode.from_text("REFUSED"))
-            return response
+            if serial is None:
+                LOG.warn(_LW("Refusing NOTIFY for %(name)s, doesn't exist") %
+                     {'name': domain_name})
+                response.set_rcode(dns.rcode.from_text("REFUSED"))
+                return response
 
         LOG.debug("Received %(verb)s for %(name)s from %(host)s" %
                  {'verb': "NOTIFY", 'name': domain_name, 'host': requester})
 
-        # According to RFC we should query the server that sent the NOTIFY
-        # TODO(Tim): Reenable this when it makes more sense
-        # resolver = dns.resolver.Resolver()
-        # resolver.nameservers = [requester]
-        # This assumes that the Master is running on port 53
-        # soa_answer = resolver.query(domain_name, 'SOA')
-        # Check that the serial is < serial above
-
-        try:
-            zone = dnsutils.do_axfr(domain_name, self.masters,
-                source=self.transfer_source)
-            self.backend.update_domain(zone)
-        except Exception:
-            response.set_rcode(dns.rcode.from_text("SERVFAIL"))
-            return response
+        self.transfers.enqueue(domain_name, 'NOTIFY')
 
         # Provide an authoritative answer
         response.flags |= dns.flags.AA
 
         return response
 
+    def _process(self, domain_name, action):
+        """
+        Performs the queued work for a zone, called from the TransferQueue
+        workers.
+
+        * For a CREATE, does an AXFR and creates the zone in the backend
+        * For a NOTIFY, does a serial check to see if further action needs
+          to be taken, then an AXFR and updates the zone in the backend
+        * For a DELETE received while the zone was being transferred, deletes
+          the zone from the backend
+        """
+        serial = self.backend.find_domain_serial(domain_name)
+
+        if action == 'DELETE':
+            if serial is not None:
+                self.backend.delete_domain(domain_name)
+            return
+
+        if action == 'CREATE' and serial is None:
+            self.backend.create_domain_xfr(
+                domain_name, functools.partial(self._do_axfr, domain_name))
+            return
+
+        if serial is None:
+            LOG.warn(_LW("Not updating %(name)s, zone doesn't exist") %
+                     {'name': domain_name})
+            return
+
+        # NOTE: According to RFC we should query the server that sent the
+        # NOTIFY. We query the masters instead, as that's where the AXFR will
+        # come from.
+        master_serial = self._get_master_serial(domain_name)
+
+        if master_serial is not None and \
+                not _serial_gt(master_serial, serial):
+            LOG.debug("Not transferring %(name)s, local serial %(serial)d "
+                      "is current with the masters (%(master_serial)d)" %
+                      {'name': domain_name, 'serial': serial,
+                       'master_serial': master_serial})
+            return
+
+        self.backend.update_domain_xfr(
+            domain_name, functools.partial(self._do_axfr, domain_name))
+
+    def _do_axfr(self, domain_name, output_path=None):
+        """
+        Transfer a zone from the masters. Returns a DNSPython Zone object,
+        or streams the zone into a zone file if output_path is given.
+        """
+        kwargs = {
+            'source': self.transfer_source,
+            'timeout': self.xfr_timeout,
+            'connect_timeout': self.xfr_connect_timeout,
+        }
+
+        if output_path is None:
+            return dnsutils.do_axfr(domain_name, self.masters, **kwargs)
+
+        dnsutils.do_axfr_to_file(domain_name, self.masters, output_path,
+                                 **kwargs)
+
     def _handle_delete(self, request):
         """
         Constructs the response to a DELETE and acts accordingly on it.
@@ -207,6 +355,16 @@ class RequestHandler(object):
             response.set_rcode(dns.rcode.from_text("REFUSED"))
             return response
 
+        # Any queued transfer for the zone is now moot, while a transfer in
+        # progress would recreate the zone, so it's deleted once done.
+        if self.transfers.discard(domain_name):
+            LOG.debug("Deferring DELETE for %(name)s from %(host)s until its "
+                      "transfer completes" %
+                      {'name': domain_name, 'host': requester})
+            # Provide an authoritative answer
+            response.flags |= dns.flags.AA
+            return response
+
         serial = self.backend.find_domain_serial(domain_name)
 
         if serial is None:
@@ -231,6 +389,38 @@ class RequestHandler(object):
 
         return response
 
+    def _get_master_serial(self, domain_name):
+        """
+        Query the masters, in order, for the SOA serial of a zone.
+
+        :param domain_name: The name of the zone.
+        :return: The serial from the first master to answer, or None if no
+            master could provide one.
+        """
+        query = dns.message.make_query(domain_name, dns.rdatatype.SOA)
+
+        for master in self.masters:
+            try:
+                response = dns.query.udp(
+                    query, master['ip'], port=master['port'],
+                    timeout=self.serial_query_timeout,
+                    source=self.transfer_source)
+            except (dns.exception.DNSException, socket.error) as e:
+                LOG.warn(_LW("Failed to query %(host)s:%(port)d for the SOA "
+                             "of %(name)s: %(error)s") %
+                         {'host': master['ip'], 'port': master['port'],
+                          'name': domain_name, 'error': e})
+                continue
+
+            if response.rcode() != dns.rcode.NOERROR:
+                continue
+
+            for rrset in response.answer:
+                if rrset.rdtype == dns.rdatatype.SOA:
+                    return rrset[0].serial
+
+        return None
+
     def _allowed(self, request, requester, op, domain_name):
         if requester not in self.allow_notify:
             LOG.warn(_LW("%(verb)s for %(name)s from %(server)s refused") %
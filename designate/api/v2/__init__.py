@@ -25,6 +25,8 @@ LOG = logging.getLogger(__name__)
 OPTS = [
     cfg.ListOpt('enabled-extensions-v2', default=[],
                 help='Enabled API Extensions'),
+    cfg.IntOpt('max-bulk-recordsets-v2', default=5000,
+               help='Maximum number of RecordSets in a bulk request'),
 ]
 
 cfg.CONF.register_opts(OPTS, group='service:api')
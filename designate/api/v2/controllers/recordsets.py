@@ -14,6 +14,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import pecan
+from oslo.config import cfg
 from oslo_log import log as logging
 
 from designate import exceptions
@@ -22,12 +23,48 @@ from designate import utils
 from designate.api.v2.controllers import rest
 from designate.api.v2.views import recordsets as recordsets_view
 from designate.objects import RecordSet
+from designate.objects import RecordSetList
 from designate.objects import Record
 
 
 LOG = logging.getLogger(__name__)
 
 
+def _update_recordset(recordset, new_recordset):
+    """
+    Apply the values loaded from an update request to a recordset, adding
+    and removing records to match any list of records given.
+    """
+    # Get original list of Records
+    original_records = set()
+    for record in recordset.records:
+        original_records.add(record.data)
+    # Get new list of Records
+    new_records = set()
+    if 'records' in new_recordset:
+        for record in new_recordset['records']:
+            new_records.add(record.data)
+    # Get differences of Records
+    records_to_add = new_records.difference(original_records)
+    records_to_rm = original_records.difference(new_records)
+
+    # Update all items except records
+    record_update = False
+    if 'records' in new_recordset:
+        record_update = True
+        del new_recordset['records']
+    recordset.update(new_recordset)
+
+    # Remove deleted records if we have provided a records array
+    if record_update:
+        recordset.records[:] = [record for record in recordset.records
+                                if record.data not in records_to_rm]
+
+    # Add new records
+    for record in records_to_add:
+        recordset.records.append(Record(data=record))
+
+
 class RecordSetsController(rest.RestController):
     _view = recordsets_view.RecordSetsView()
     _resource_schema = schema.Schema('v2', 'recordset')
@@ -60,6 +97,7 @@ class RecordSetsController(rest.RestController):
 
         # Extract the pagination params
         marker, limit, sort_key, sort_dir = self._get_paging_params(params)
+        total_count = self._get_total_count_param(params)
 
         # Extract any filter params.
         accepted_filters = ('name', 'type', 'ttl', 'data', )
@@ -74,7 +112,8 @@ class RecordSetsController(rest.RestController):
 
         # Retrieve recordsets
         recordsets = self.central_api.find_recordsets(
-            context, criterion, marker, limit, sort_key, sort_dir)
+            context, criterion, marker, limit, sort_key, sort_dir,
+            total_count)
 
         # 'data' filter param: only return recordsets with matching data
         if data:
@@ -156,34 +195,7 @@ class RecordSetsController(rest.RestController):
         # Validate the new set of data
         self._resource_schema.validate(recordset_data)
 
-        # Get original list of Records
-        original_records = set()
-        for record in recordset.records:
-            original_records.add(record.data)
-        # Get new list of Records
-        new_records = set()
-        if 'records' in new_recordset:
-            for record in new_recordset['records']:
-                new_records.add(record.data)
-        # Get differences of Records
-        records_to_add = new_records.difference(original_records)
-        records_to_rm = original_records.difference(new_records)
-
-        # Update all items except records
-        record_update = False
-        if 'records' in new_recordset:
-            record_update = True
-            del new_recordset['records']
-        recordset.update(new_recordset)
-
-        # Remove deleted records if we have provided a records array
-        if record_update:
-            recordset.records[:] = [record for record in recordset.records
-                                    if record.data not in records_to_rm]
-
-        # Add new records
-        for record in records_to_add:
-            recordset.records.append(Record(data=record))
+        _update_recordset(recordset, new_recordset)
 
         # Persist the resource
         recordset = self.central_api.update_recordset(context, recordset)
@@ -215,3 +227,175 @@ class RecordSetsController(rest.RestController):
         response.status_int = 202
 
         return self._view.show(context, request, recordset)
+
+
+class RecordSetsBulkController(rest.RestController):
+    """
+    Change many of a zone's RecordSets at once. The changes are applied in a
+    single transaction, so either all of them are made or none are.
+    """
+    _view = recordsets_view.RecordSetsView()
+    _collection_schema = schema.Schema('v2', 'recordsets')
+
+    # Number of RecordSets fetched from central per call
+    FETCH_SIZE = 500
+
+    def _get_items(self, body):
+        items = body.get('recordsets') if isinstance(body, dict) else None
+
+        if not isinstance(items, list):
+            raise exceptions.InvalidObject(
+                'Provided object does not match schema.  A list of '
+                'recordsets is required')
+
+        max_items = cfg.CONF['service:api'].max_bulk_recordsets_v2
+        if len(items) > max_items:
+            raise exceptions.BadRequest(
+                'A bulk request may change at most %d recordsets' % max_items)
+
+        return items
+
+    def _get_ids(self, items):
+        ids = []
+
+        for index, item in enumerate(items):
+            recordset_id = item.get('id') if isinstance(item, dict) else None
+
+            if not utils.is_uuid_like(recordset_id):
+                raise exceptions.InvalidUUID(
+                    'recordsets.%d.id is not a valid UUID' % index)
+
+            ids.append(recordset_id)
+
+        if len(set(ids)) != len(ids):
+            raise exceptions.BadRequest(
+                'A recordset may only appear once in a bulk request')
+
+        return ids
+
+    def _get_recordsets(self, context, zone_id, ids):
+        """Fetch the zone's RecordSets with the given IDs, in their order"""
+        recordsets = {}
+
+        for i in range(0, len(ids), self.FETCH_SIZE):
+            criterion = {
+                'domain_id': zone_id,
+                'id': ids[i:i + self.FETCH_SIZE],
+            }
+
+            for recordset in self.central_api.find_recordsets(context,
+                                                              criterion):
+                recordsets[recordset.id] = recordset
+
+        missing = [i for i in ids if i not in recordsets]
+        if missing:
+            raise exceptions.RecordSetNotFound(
+                'RecordSets not found: %s' % ', '.join(missing))
+
+        return [recordsets[i] for i in ids]
+
+    def _render(self, context, request, recordsets):
+        pecan.response.status_int = 202
+
+        return {
+            'recordsets': self._view.list_basic(context, request, recordsets)
+        }
+
+    @pecan.expose(template='json:', content_type='application/json')
+    @utils.validate_uuid('zone_id')
+    def post_all(self, zone_id):
+        """Create RecordSets"""
+        request = pecan.request
+        context = request.environ['context']
+
+        body = request.body_dict
+        items = self._get_items(body)
+
+        # Validate the request conforms to the schema
+        self._collection_schema.validate(body)
+
+        recordsets = RecordSetList()
+
+        for item in items:
+            # Convert from APIv2 -> Central format
+            values = self._view.load(context, request, {'recordset': item})
+
+            # SOA recordsets cannot be created manually
+            if values['type'] == 'SOA':
+                raise exceptions.BadRequest(
+                    "Creating a SOA recordset is now allowed")
+
+            recordsets.append(RecordSet(**values))
+
+        # Create the recordsets, with a single serial increment
+        created, _, _ = self.central_api.apply_recordset_changes(
+            context, zone_id, create=recordsets)
+
+        return self._render(context, request, created)
+
+    @pecan.expose(template='json:', content_type='application/json')
+    @utils.validate_uuid('zone_id')
+    def patch_all(self, zone_id):
+        """Update RecordSets"""
+        request = pecan.request
+        context = request.environ['context']
+
+        items = self._get_items(request.body_dict)
+        ids = self._get_ids(items)
+
+        zone = self.central_api.get_domain(context, zone_id)
+        recordsets = self._get_recordsets(context, zone_id, ids)
+
+        recordsets_data = []
+        for item, recordset in zip(items, recordsets):
+            # SOA recordsets cannot be updated manually
+            if recordset['type'] == 'SOA':
+                raise exceptions.BadRequest(
+                    'Updating SOA recordsets is now allowed')
+
+            # NS recordsets at the zone root cannot be manually updated
+            if recordset['type'] == 'NS' and \
+                    recordset['name'] == zone['name']:
+                raise exceptions.BadRequest(
+                    'Updating a root zone NS record is not allowed')
+
+            recordset_data = self._view.show_basic(context, request,
+                                                   recordset)
+            recordsets_data.append(utils.deep_dict_merge(recordset_data,
+                                                         item))
+
+        # Validate the new set of data, for all the recordsets together
+        self._collection_schema.validate({'recordsets': recordsets_data})
+
+        for item, recordset in zip(items, recordsets):
+            values = dict((k, v) for k, v in item.items() if k != 'id')
+            values = self._view.load(context, request, {'recordset': values})
+
+            _update_recordset(recordset, values)
+
+        # Update the recordsets, with a single serial increment
+        _, updated, _ = self.central_api.apply_recordset_changes(
+            context, zone_id, update=RecordSetList(objects=recordsets))
+
+        return self._render(context, request, updated)
+
+    @pecan.expose(template='json:', content_type='application/json')
+    @utils.validate_uuid('zone_id')
+    def delete_all(self, zone_id):
+        """Delete RecordSets"""
+        request = pecan.request
+        context = request.environ['context']
+
+        items = self._get_items(request.body_dict)
+        ids = self._get_ids(items)
+
+        for recordset in self._get_recordsets(context, zone_id, ids):
+            if recordset['type'] == 'SOA':
+                raise exceptions.BadRequest(
+                    'Deleting a SOA recordset is now allowed')
+
+        # Delete the recordsets, with a single serial increment
+        _, _, deleted = self.central_api.apply_recordset_changes(
+            context, zone_id, delete=ids)
+
+        return self._render(context, request, deleted)
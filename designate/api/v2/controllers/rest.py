@@ -31,6 +31,7 @@ import pecan
 import pecan.rest
 import pecan.routing
 from oslo_log import log as logging
+from oslo_utils import strutils
 
 from designate import exceptions
 from designate.central import rpcapi as central_rpcapi
@@ -93,6 +94,13 @@ class RestController(pecan.rest.RestController):
 
         return marker, limit, sort_key, sort_dir
 
+    def _get_total_count_param(self, params):
+        """
+        Extract the total_count parameter. Counting every matching item costs
+        an extra query, so collections only report it when asked to.
+        """
+        return strutils.bool_from_string(params.pop('total_count', False))
+
     def _apply_filter_params(self, params, accepted_filters, criterion):
 
         for k in accepted_filters:
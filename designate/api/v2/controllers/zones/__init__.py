@@ -36,6 +36,9 @@ class ZonesController(rest.RestController):
     SORT_KEYS = ['created_at', 'id', 'updated_at', 'name', 'tenant_id',
                  'serial', 'ttl', 'status']
 
+    # Number of records fetched from central per call, when exporting
+    EXPORT_PAGE_SIZE = 1000
+
     nameservers = nameservers.NameServersController()
     recordsets = recordsets.RecordSetsController()
     tasks = tasks.TasksController()
@@ -72,31 +75,39 @@ class ZonesController(rest.RestController):
         servers = self.central_api.get_domain_servers(context, zone_id)
         domain = self.central_api.get_domain(context, zone_id)
 
-        criterion = {'domain_id': zone_id}
-        recordsets = self.central_api.find_recordsets(context, criterion)
+        stream = utils.stream_template(
+            'bind9-zone.jinja2', servers=servers, domain=domain,
+            records=self._iter_zonefile_records(context, zone_id))
+
+        # Stream the zonefile, rather than rendering it in full
+        response = pecan.response
+        response.content_type = 'text/dns'
+        response.app_iter = (chunk.encode('utf-8') for chunk in stream)
+
+        return response
 
-        records = []
+    def _iter_zonefile_records(self, context, zone_id):
+        """Page through the zone's records, in a query per page"""
+        marker = None
 
-        for recordset in recordsets:
-            criterion = {
-                'domain_id': domain['id'],
-                'recordset_id': recordset['id']
-            }
+        while True:
+            recordsets = self.central_api.find_export_records(
+                context, zone_id, marker, self.EXPORT_PAGE_SIZE)
 
-            raw_records = self.central_api.find_records(context, criterion)
+            for recordset in recordsets:
+                for record in recordset.records:
+                    marker = record.id
 
-            for record in raw_records:
-                records.append({
-                    'name': recordset['name'],
-                    'type': recordset['type'],
-                    'ttl': recordset['ttl'],
-                    'data': record['data'],
-                })
+                    yield {
+                        'name': recordset.name,
+                        'type': recordset.type,
+                        'ttl': recordset.ttl,
+                        'data': record.data,
+                    }
 
-        return utils.render_template('bind9-zone.jinja2',
-                                     servers=servers,
-                                     domain=domain,
-                                     records=records)
+            if sum(len(r.records) for r in recordsets) < \
+                    self.EXPORT_PAGE_SIZE:
+                break
 
     @pecan.expose(template='json:', content_type='application/json')
     def get_all(self, **params):
@@ -105,6 +116,7 @@ class ZonesController(rest.RestController):
         context = request.environ['context']
 
         marker, limit, sort_key, sort_dir = self._get_paging_params(params)
+        total_count = self._get_total_count_param(params)
 
         # Extract any filter params.
         accepted_filters = ('name', 'email', 'status', )
@@ -112,7 +124,8 @@ class ZonesController(rest.RestController):
                          if k in params)
 
         zones = self.central_api.find_domains(
-            context, criterion, marker, limit, sort_key, sort_dir)
+            context, criterion, marker, limit, sort_key, sort_dir,
+            total_count)
 
         return self._view.list(context, request, zones)
 
@@ -252,3 +265,10 @@ class ZonesController(rest.RestController):
         response.status_int = 202
 
         return self._view.show(context, request, zone)
+
+
+# NOTE: Bulk changes use a custom verb on the recordsets collection, i.e.
+#       /v2/zones/{zone_id}/recordsets:bulk, which can't be spelt as a class
+#       attribute.
+setattr(ZonesController, 'recordsets:bulk',
+        recordsets.RecordSetsBulkController())
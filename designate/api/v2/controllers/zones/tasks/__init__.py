@@ -21,6 +21,7 @@ from designate.api.v2.controllers.zones.tasks.transfer_requests \
 from designate.api.v2.controllers.zones.tasks.transfer_accepts \
     import TransferAcceptsController as TRA
 from designate.api.v2.controllers.zones.tasks import abandon
+from designate.api.v2.controllers.zones.tasks import imports
 
 LOG = logging.getLogger(__name__)
 
@@ -30,3 +31,4 @@ class TasksController(rest.RestController):
     transfer_accepts = TRA()
     transfer_requests = TRC()
     abandon = abandon.AbandonController()
+    imports = imports.ZoneImportController()
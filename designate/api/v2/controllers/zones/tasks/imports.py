@@ -0,0 +1,94 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import pecan
+from oslo_log import log as logging
+
+from designate import exceptions
+from designate import utils
+from designate.api.v2.controllers import rest
+from designate.api.v2.views.zones.tasks import imports as zone_imports_view
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ZoneImportController(rest.RestController):
+    _view = zone_imports_view.ZoneImportsView()
+    SORT_KEYS = ['created_at', 'id', 'updated_at']
+
+    @pecan.expose(template='json:', content_type='application/json')
+    @utils.validate_uuid('import_id')
+    def get_one(self, import_id):
+        """Get Zone Import"""
+
+        request = pecan.request
+        context = request.environ['context']
+
+        zone_import = self.central_api.get_zone_import(context, import_id)
+
+        return self._view.show(context, request, zone_import)
+
+    @pecan.expose(template='json:', content_type='application/json')
+    def get_all(self, **params):
+        """List Zone Imports"""
+        request = pecan.request
+        context = request.environ['context']
+
+        # Extract the pagination params
+        marker, limit, sort_key, sort_dir = self._get_paging_params(params)
+
+        # Extract any filter params.
+        criterion = self._apply_filter_params(params, ('status',), {})
+
+        zone_imports = self.central_api.find_zone_imports(
+            context, criterion, marker, limit, sort_key, sort_dir)
+
+        return self._view.list(context, request, zone_imports)
+
+    @pecan.expose(template='json:', content_type='application/json')
+    def post_all(self):
+        """Create Zone Import"""
+        request = pecan.request
+        response = pecan.response
+        context = request.environ['context']
+
+        if request.content_type != 'text/dns':
+            raise exceptions.UnsupportedContentType(
+                'Content-type must be text/dns')
+
+        # The zonefile is parsed and imported by central in the background,
+        # the returned import is polled for its progress.
+        zone_import = self.central_api.create_zone_import(
+            context, request.body)
+
+        response.status_int = 202
+
+        response.headers['Location'] = self._view._get_resource_href(
+            request, zone_import)
+
+        # Prepare and return the response body
+        return self._view.show(context, request, zone_import)
+
+    @pecan.expose(template=None, content_type='application/json')
+    @utils.validate_uuid('import_id')
+    def delete_one(self, import_id):
+        """Delete Zone Import"""
+        request = pecan.request
+        response = pecan.response
+        context = request.environ['context']
+
+        self.central_api.delete_zone_import(context, import_id)
+
+        response.status_int = 204
+
+        # NOTE: This is a hack and a half.. But Pecan needs it.
+        return ''
@@ -20,6 +20,7 @@ from oslo_log import log as logging
 
 from designate import exceptions
 from designate import objects
+from designate import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -52,7 +53,8 @@ class BaseView(object):
 
         metadata = metadata or {}
 
-        if isinstance(items, objects.base.PagedListObjectMixin):
+        if isinstance(items, objects.base.PagedListObjectMixin) and \
+                items.obj_attr_is_set('total_count'):
             metadata['total_count'] = items.total_count
 
         result['metadata'] = metadata
@@ -170,7 +172,8 @@ class BaseView(object):
     def _get_next_href(self, request, items, parents=None):
         # Prepare the extra params
         extra_params = {
-            'marker': items[-1]['id']
+            'marker': utils.get_next_marker(
+                items, request.GET.get('sort_key'))
         }
 
         return self._get_collection_href(request, parents, extra_params)
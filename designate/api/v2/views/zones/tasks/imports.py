@@ -0,0 +1,54 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo_log import log as logging
+
+from designate.api.v2.views import base as base_view
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ZoneImportsView(base_view.BaseView):
+    """Model a ZoneImport API response as a python dictionary"""
+
+    _resource_name = 'import'
+    _collection_name = 'imports'
+
+    def _get_base_href(self, parents=None):
+        href = "%s/v2/zones/tasks/%s" % (self.base_uri, self._collection_name)
+        return href.rstrip('?')
+
+    def _get_resource_links(self, request, item, parents=None):
+        links = {
+            "self": self._get_resource_href(request, item)
+        }
+
+        if item.domain_id is not None:
+            links["zone"] = "%s/v2/zones/%s" % (self.base_uri, item.domain_id)
+
+        return links
+
+    def show_basic(self, context, request, zone_import):
+        """Basic view of a ZoneImport"""
+
+        return {
+            "id": zone_import.id,
+            "project_id": zone_import.tenant_id,
+            "zone_id": zone_import.domain_id,
+            "status": zone_import.status,
+            "message": zone_import.message,
+            "recordsets_total": zone_import.recordsets_total,
+            "recordsets_imported": zone_import.recordsets_imported,
+            "created_at": zone_import.created_at,
+            "updated_at": zone_import.updated_at,
+            "links": self._get_resource_links(request, zone_import)
+        }
@@ -55,3 +55,22 @@ class AgentBackend(DriverPlugin):
     @abc.abstractmethod
     def delete_domain(self, domain_name):
         """Delete a DNS domain"""
+
+    def create_domain_xfr(self, domain_name, xfr):
+        """
+        Create a DNS domain from a zone transfer.
+
+        :param domain_name: The name of the DNS domain.
+        :param xfr: A callable performing the transfer. Called without
+            arguments it returns a DNSPython Zone object, called with a path
+            it streams the zone into a zone file at that path instead.
+        """
+        self.create_domain(xfr())
+
+    def update_domain_xfr(self, domain_name, xfr):
+        """
+        Update a DNS domain from a zone transfer.
+
+        See create_domain_xfr() for the parameters.
+        """
+        self.update_domain(xfr())
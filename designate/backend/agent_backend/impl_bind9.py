@@ -74,6 +74,14 @@ class Bind9Backend(base.AgentBackend):
         LOG.debug("Updating %s" % domain.origin.to_text())
         self._sync_domain(domain)
 
+    def create_domain_xfr(self, domain_name, xfr):
+        LOG.debug("Creating %s from a transfer" % domain_name)
+        self._sync_domain_file(domain_name, xfr, new_domain_flag=True)
+
+    def update_domain_xfr(self, domain_name, xfr):
+        LOG.debug("Updating %s from a transfer" % domain_name)
+        self._sync_domain_file(domain_name, xfr)
+
     def delete_domain(self, domain_name):
         LOG.debug('Delete Domain: %s' % domain_name)
 
@@ -102,10 +110,20 @@ class Bind9Backend(base.AgentBackend):
 
     def _sync_domain(self, domain, new_domain_flag=False):
         """Sync a single domain's zone file and reload bind config"""
+        def write(output_path):
+            domain.to_file(output_path, relativize=False)
 
+        self._sync_domain_file(domain.origin.to_text(), write,
+                               new_domain_flag=new_domain_flag)
+
+    def _sync_domain_file(self, domain_name, write, new_domain_flag=False):
+        """
+        Write a single domain's zone file with write(output_path) and reload
+        bind config
+        """
         # NOTE: Different versions of BIND9 behave differently with a trailing
         #       dot, so we're just going to take it off.
-        domain_name = domain.origin.to_text().rstrip('.')
+        domain_name = domain_name.rstrip('.')
 
         # NOTE: Only one thread should be working with the Zonefile at a given
         #       time. The sleep(1) below introduces a not insignificant risk
@@ -118,7 +136,7 @@ class Bind9Backend(base.AgentBackend):
             output_path = os.path.join(zone_path,
                                        '%s.zone' % domain_name)
 
-            domain.to_file(output_path, relativize=False)
+            write(output_path)
 
             rndc_call = self._rndc_base()
 
@@ -15,18 +15,32 @@
 # under the License.
 
 import logging
+import sys
+import time
 
+import eventlet
+import six
 from oslo.config import cfg
 from oslo_utils import excutils
 
 from designate import backend
+from designate import exceptions
 from designate.backend import base
+from designate.i18n import _LE
 
 
 LOG = logging.getLogger(__name__)
 CFG_GROUP = 'backend:multi'
 
 
+class MultiBackendTimeout(exceptions.Backend):
+    """
+    A call to one of the child backends timed out.
+    """
+    error_code = 504
+    error_type = 'multi_backend_timeout'
+
+
 class MultiBackend(base.Backend):
     """
     Multi-backend backend
@@ -34,18 +48,24 @@ class MultiBackend(base.Backend):
     This backend dispatches calls to a master backend and a slave backend.
     It enforces master/slave ordering semantics as follows:
 
-    Creates for tsigkeys, servers and domains are done on the master first,
-    then on the slave.
+    Creates for domains are done on the master first, then on the slave.
 
     Updates for tsigkeys, servers and domains and all operations on records
     are done on the master only. It's assumed masters and slaves use an
     external mechanism to sync existing domains, most likely XFR.
 
-    Deletes are done on the slave first, then on the master.
+    Deletes for domains are done on the slave first, then on the master.
 
-    If the create on the slave fails, the domain/tsigkey/server is deleted from
-    the master. If delete on the master fails, the domain/tdigkey/server is
+    TSIG keys have no ordering requirement between master and slave, so
+    creates and deletes for them (and pings) are dispatched to both backends
+    concurrently.
+
+    If the create on the slave fails, the domain/tsigkey is deleted from
+    the master. If delete on the master fails, the domain/tsigkey is
     recreated on the slave.
+
+    Every call to a child backend is bounded by the configured timeout, and
+    its latency is recorded per child (see get_timings()).
     """
     __plugin_name__ = 'multi'
 
@@ -58,6 +78,9 @@ class MultiBackend(base.Backend):
         opts = [
             cfg.StrOpt('master', default='fake', help='Master backend'),
             cfg.StrOpt('slave', default='fake', help='Slave backend'),
+            cfg.IntOpt('timeout', default=30,
+                       help='Timeout in seconds for each call to the master '
+                            'or slave backend, 0 disables the timeout'),
         ]
 
         return [(group, opts)]
@@ -70,6 +93,83 @@ class MultiBackend(base.Backend):
         self.slave = backend.get_backend(cfg.CONF[CFG_GROUP].slave,
                                          central_service)
 
+        self.timeout = cfg.CONF[CFG_GROUP].timeout
+        self.reset_timings()
+
+    def get_timings(self):
+        """
+        Return the per-child call latencies, in the form:
+
+        {'master': {'create_domain': {'count': 1, 'total': 0.1, 'max': 0.1}}}
+        """
+        return self.times
+
+    def reset_timings(self):
+        self.times = {'master': {}, 'slave': {}}
+
+    def _record_timing(self, name, method, elapsed):
+        stats = self.times[name].setdefault(
+            method, {'count': 0, 'total': 0.0, 'max': 0.0})
+
+        stats['count'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
+
+        LOG.debug("%(name)s backend %(method)s took %(elapsed)f" %
+                  {'name': name, 'method': method, 'elapsed': elapsed})
+
+    def _call(self, name, method, *args):
+        """Call a method on the named child backend, timed and bounded"""
+        child = getattr(self, name)
+
+        error = MultiBackendTimeout(
+            'Timeout reached calling %s on the %s backend' % (method, name))
+        timeout = eventlet.Timeout(self.timeout or None, error)
+
+        start_time = time.time()
+        try:
+            return getattr(child, method)(*args)
+        finally:
+            timeout.cancel()
+            self._record_timing(name, method, time.time() - start_time)
+
+    def _dispatch(self, method, *args):
+        """
+        Call a method on the master and the slave concurrently.
+
+        Returns a tuple of (results, failures), both dicts keyed by the
+        child name. Failures hold the exc_info of the failed call.
+        """
+        threads = [(name, eventlet.spawn(self._call, name, method, *args))
+                   for name in ('master', 'slave')]
+
+        results = {}
+        failures = {}
+
+        for name, thread in threads:
+            try:
+                results[name] = thread.wait()
+            except Exception:
+                failures[name] = sys.exc_info()
+
+        return results, failures
+
+    def _rollback(self, results, failures, method, *args):
+        """
+        Undo the calls which succeeded on one child when the other failed,
+        then re-raise the original failure (the master's first).
+        """
+        for name in results:
+            try:
+                self._call(name, method, *args)
+            except Exception:
+                LOG.exception(_LE('Failed to roll back with %(method)s on '
+                                  'the %(name)s backend') %
+                              {'method': method, 'name': name})
+
+        exc_info = failures.get('master') or failures['slave']
+        six.reraise(*exc_info)
+
     def start(self):
         self.master.start()
         self.slave.start()
@@ -79,34 +179,32 @@ class MultiBackend(base.Backend):
         self.master.stop()
 
     def create_tsigkey(self, context, tsigkey):
-        self.master.create_tsigkey(context, tsigkey)
-        try:
-            self.slave.create_tsigkey(context, tsigkey)
-        except Exception:
-            with excutils.save_and_reraise_exception():
-                self.master.delete_tsigkey(context, tsigkey)
+        results, failures = self._dispatch('create_tsigkey', context, tsigkey)
+
+        if failures:
+            self._rollback(results, failures, 'delete_tsigkey', context,
+                           tsigkey)
 
     def update_tsigkey(self, context, tsigkey):
-        self.master.update_tsigkey(context, tsigkey)
+        self._call('master', 'update_tsigkey', context, tsigkey)
 
     def delete_tsigkey(self, context, tsigkey):
-        self.slave.delete_tsigkey(context, tsigkey)
-        try:
-            self.master.delete_tsigkey(context, tsigkey)
-        except Exception:
-            with excutils.save_and_reraise_exception():
-                self.slave.create_tsigkey(context, tsigkey)
+        results, failures = self._dispatch('delete_tsigkey', context, tsigkey)
+
+        if failures:
+            self._rollback(results, failures, 'create_tsigkey', context,
+                           tsigkey)
 
     def create_domain(self, context, domain):
-        self.master.create_domain(context, domain)
+        self._call('master', 'create_domain', context, domain)
         try:
-            self.slave.create_domain(context, domain)
+            self._call('slave', 'create_domain', context, domain)
         except Exception:
             with excutils.save_and_reraise_exception():
-                self.master.delete_domain(context, domain)
+                self._call('master', 'delete_domain', context, domain)
 
     def update_domain(self, context, domain):
-        self.master.update_domain(context, domain)
+        self._call('master', 'update_domain', context, domain)
 
     def delete_domain(self, context, domain):
         # Fetch the full domain from Central first, as we may
@@ -117,37 +215,52 @@ class MultiBackend(base.Backend):
         full_domain = self.central.find_domain(
             deleted_context, {'id': domain['id']})
 
-        self.slave.delete_domain(context, domain)
+        self._call('slave', 'delete_domain', context, domain)
         try:
-            self.master.delete_domain(context, domain)
+            self._call('master', 'delete_domain', context, domain)
         except Exception:
             with excutils.save_and_reraise_exception():
-                self.slave.create_domain(context, domain)
+                self._call('slave', 'create_domain', context, domain)
+
+                # Once the domain exists again, the records can be
+                # recreated on the slave concurrently
+                pool = eventlet.GreenPool()
 
-                [self.slave.create_record(context, domain, record)
-                 for record in self.central.find_records(
-                     context, {'domain_id': full_domain['id']})]
+                for recordset in self.central.find_recordsets(
+                        context, {'domain_id': full_domain['id']}):
+                    for record in self.central.find_records(
+                            context, {'recordset_id': recordset['id']}):
+                        pool.spawn(self._call, 'slave', 'create_record',
+                                   context, domain, recordset, record)
+
+                pool.waitall()
 
     def create_recordset(self, context, domain, recordset):
-        self.master.create_recordset(context, domain, recordset)
+        self._call('master', 'create_recordset', context, domain, recordset)
 
     def update_recordset(self, context, domain, recordset):
-        self.master.update_recordset(context, domain, recordset)
+        self._call('master', 'update_recordset', context, domain, recordset)
 
     def delete_recordset(self, context, domain, recordset):
-        self.master.delete_recordset(context, domain, recordset)
+        self._call('master', 'delete_recordset', context, domain, recordset)
 
     def create_record(self, context, domain, recordset, record):
-        self.master.create_record(context, domain, recordset, record)
+        self._call('master', 'create_record', context, domain, recordset,
+                   record)
 
     def update_record(self, context, domain, recordset, record):
-        self.master.update_record(context, domain, recordset, record)
+        self._call('master', 'update_record', context, domain, recordset,
+                   record)
 
     def delete_record(self, context, domain, recordset, record):
-        self.master.delete_record(context, domain, recordset, record)
+        self._call('master', 'delete_record', context, domain, recordset,
+                   record)
 
     def ping(self, context):
-        return {
-            'master': self.master.ping(context),
-            'slave': self.slave.ping(context)
-        }
+        results, failures = self._dispatch('ping', context)
+
+        if failures:
+            exc_info = failures.get('master') or failures['slave']
+            six.reraise(*exc_info)
+
+        return results
@@ -24,6 +24,26 @@ cfg.CONF.register_opts([
                help='Number of worker processes to spawn'),
     cfg.StrOpt('storage-driver', default='sqlalchemy',
                help='The storage driver to use'),
+    cfg.StrOpt('lock-driver', default='local',
+               help='The driver used to lock domains while they are '
+                    'changed. Use "file", "memcache" or "database" when '
+                    'running more than one designate-central process'),
+    cfg.FloatOpt('lock-timeout', default=120,
+                 help='Seconds to wait for a domain lock before giving up'),
+    cfg.IntOpt('retry-attempts', default=50,
+               help='Number of times a transaction is attempted when it '
+                    'fails on a database deadlock'),
+    cfg.IntOpt('retry-delay', default=50,
+               help='Base delay in milliseconds before retrying a '
+                    'transaction, doubled after each attempt. The actual '
+                    'delay is chosen at random up to this, so concurrent '
+                    'retries spread out'),
+    cfg.IntOpt('retry-max-delay', default=2000,
+               help='Maximum delay in milliseconds before retrying a '
+                    'transaction'),
+    cfg.FloatOpt('retry-budget', default=30,
+                 help='Seconds a transaction may be retried for, after '
+                      'which its last failure is raised'),
     cfg.ListOpt('enabled-notification-handlers', default=[],
                 help='Enabled Notification Handlers'),
     cfg.IntOpt('max_domain_name_len', default=255,
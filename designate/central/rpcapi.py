@@ -47,14 +47,18 @@ class CentralAPI(object):
         4.2 - Add methods for pool manager integration
         4.3 - Added Zone Transfer Methods
         5.0 - Remove dead server code
+        5.1 - Add total_count to find_domains and find_recordsets
+        5.2 - Add apply_recordset_changes
+        5.3 - Add find_export_records
+        5.4 - Add zone import methods
     """
-    RPC_API_VERSION = '5.0'
+    RPC_API_VERSION = '5.4'
 
     def __init__(self, topic=None):
         topic = topic if topic else cfg.CONF.central_topic
 
         target = messaging.Target(topic=topic, version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='5.0')
+        self.client = rpc.get_client(target, version_cap='5.4')
 
     @classmethod
     def get_instance(cls):
@@ -154,11 +158,11 @@ class CentralAPI(object):
                                 domain_id=domain_id)
 
     def find_domains(self, context, criterion=None, marker=None, limit=None,
-                     sort_key=None, sort_dir=None):
+                     sort_key=None, sort_dir=None, total_count=False):
         LOG.info(_LI("find_domains: Calling central's find_domains."))
         return self.client.call(context, 'find_domains', criterion=criterion,
                                 marker=marker, limit=limit, sort_key=sort_key,
-                                sort_dir=sort_dir)
+                                sort_dir=sort_dir, total_count=total_count)
 
     def find_domain(self, context, criterion=None):
         LOG.info(_LI("find_domain: Calling central's find_domain."))
@@ -217,12 +221,12 @@ class CentralAPI(object):
                                 recordset_id=recordset_id)
 
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None):
+                        sort_key=None, sort_dir=None, total_count=False):
         LOG.info(_LI("find_recordsets: Calling central's find_recordsets."))
         return self.client.call(context, 'find_recordsets',
                                 criterion=criterion, marker=marker,
                                 limit=limit, sort_key=sort_key,
-                                sort_dir=sort_dir)
+                                sort_dir=sort_dir, total_count=total_count)
 
     def find_recordset(self, context, criterion=None):
         LOG.info(_LI("find_recordset: Calling central's find_recordset."))
@@ -242,6 +246,14 @@ class CentralAPI(object):
                                 recordset_id=recordset_id,
                                 increment_serial=increment_serial)
 
+    def apply_recordset_changes(self, context, domain_id, create=None,
+                                update=None, delete=None):
+        LOG.info(_LI("apply_recordset_changes: "
+                     "Calling central's apply_recordset_changes."))
+        return self.client.call(context, 'apply_recordset_changes',
+                                domain_id=domain_id, create=create,
+                                update=update, delete=delete)
+
     def count_recordsets(self, context, criterion=None):
         LOG.info(_LI("count_recordsets: Calling central's count_recordsets."))
         return self.client.call(context, 'count_recordsets',
@@ -275,6 +287,14 @@ class CentralAPI(object):
         LOG.info(_LI("find_record: Calling central's find_record."))
         return self.client.call(context, 'find_record', criterion=criterion)
 
+    def find_export_records(self, context, domain_id, marker=None,
+                            limit=None):
+        LOG.info(_LI("find_export_records: "
+                     "Calling central's find_export_records."))
+        return self.client.call(context, 'find_export_records',
+                                domain_id=domain_id, marker=marker,
+                                limit=limit)
+
     def update_record(self, context, record, increment_serial=True):
         LOG.info(_LI("update_record: Calling central's update_record."))
         return self.client.call(context, 'update_record',
@@ -490,3 +510,30 @@ class CentralAPI(object):
             context,
             'delete_zone_transfer_accept',
             zone_transfer_accept_id=zone_transfer_accept_id)
+
+    # Zone Import Methods
+    def create_zone_import(self, context, request_body):
+        LOG.info(_LI("create_zone_import: "
+                     "Calling central's create_zone_import."))
+        return self.client.call(context, 'create_zone_import',
+                                request_body=request_body)
+
+    def get_zone_import(self, context, zone_import_id):
+        LOG.info(_LI("get_zone_import: Calling central's get_zone_import."))
+        return self.client.call(context, 'get_zone_import',
+                                zone_import_id=zone_import_id)
+
+    def find_zone_imports(self, context, criterion=None, marker=None,
+                          limit=None, sort_key=None, sort_dir=None):
+        LOG.info(_LI("find_zone_imports: "
+                     "Calling central's find_zone_imports."))
+        return self.client.call(context, 'find_zone_imports',
+                                criterion=criterion, marker=marker,
+                                limit=limit, sort_key=sort_key,
+                                sort_dir=sort_dir)
+
+    def delete_zone_import(self, context, zone_import_id):
+        LOG.info(_LI("delete_zone_import: "
+                     "Calling central's delete_zone_import."))
+        return self.client.call(context, 'delete_zone_import',
+                                zone_import_id=zone_import_id)
@@ -16,7 +16,9 @@
 # under the License.
 import re
 import collections
+import contextlib
 import copy
+import datetime
 import functools
 import threading
 import itertools
@@ -28,14 +30,20 @@ from oslo.config import cfg
 from oslo import messaging
 from oslo_log import log as logging
 from oslo_utils import excutils
-from oslo_concurrency import lockutils
+from oslo_utils import timeutils
 from oslo_db import exception as db_exception
+from dns import exception as dnsexception
+from dns import rdatatype
+from dns import zone as dnszone
 
 from designate.i18n import _LI
+from designate.i18n import _LE
 from designate.i18n import _LC
 from designate.i18n import _LW
 from designate import context as dcontext
+from designate import dnsutils
 from designate import exceptions
+from designate import locking
 from designate import network_api
 from designate import objects
 from designate import policy
@@ -51,6 +59,19 @@ DOMAIN_LOCKS = threading.local()
 NOTIFICATION_BUFFER = threading.local()
 RETRY_STATE = threading.local()
 
+# Counts of the retries made by the retry decorator, and of the calls which
+# failed once they ran out of retries, by method. The counts are also kept
+# for the most recently contended domains.
+RETRY_COUNTERS = collections.Counter()
+RETRY_DOMAINS = collections.OrderedDict()
+RETRY_DOMAINS_SIZE = 100
+
+# Number of recordsets written to storage per transaction by zone imports
+IMPORT_BATCH_SIZE = 500
+
+# How far back each sync of the zone name index looks past the last one
+ZONE_NAME_INDEX_SYNC_MARGIN = datetime.timedelta(seconds=60)
+
 
 def _retry_on_deadlock(exc):
     """Filter to trigger retry a when a Deadlock is received."""
@@ -62,7 +83,18 @@ def _retry_on_deadlock(exc):
     return False
 
 
-def retry(cb=None, retries=50, delay=150):
+def _get_retry_delay(attempt):
+    """
+    Exponential backoff with full jitter: a random delay, in seconds, of up
+    to the base delay doubled for each previous attempt.
+    """
+    conf = cfg.CONF['service:central']
+    ceiling = min(conf.retry_max_delay, conf.retry_delay * 2 ** (attempt - 1))
+
+    return random.uniform(0, ceiling) / float(1000)
+
+
+def retry(cb=None, retries=None):
     """A retry decorator that ignores attempts at creating nested retries"""
     def outer(f):
         @functools.wraps(f)
@@ -76,6 +108,10 @@ def retry(cb=None, retries=50, delay=150):
                 # We're the outermost retry decorator
                 RETRY_STATE.held = True
 
+                conf = cfg.CONF['service:central']
+                max_retries = retries or conf.retry_attempts
+                deadline = time.time() + conf.retry_budget
+
                 try:
                     while True:
                         try:
@@ -83,16 +119,26 @@ def retry(cb=None, retries=50, delay=150):
                                        **copy.deepcopy(kwargs))
                             break
                         except Exception as exc:
-                            RETRY_STATE.retries += 1
-                            if RETRY_STATE.retries >= retries:
-                                # Exceeded retry attempts, raise.
-                                raise
-                            elif cb is not None and cb(exc) is False:
+                            if cb is not None and cb(exc) is False:
                                 # We're not setup to retry on this exception.
                                 raise
-                            else:
-                                # Retry, with a delay.
-                                time.sleep(delay / float(1000))
+
+                            RETRY_STATE.retries += 1
+                            delay = _get_retry_delay(RETRY_STATE.retries)
+
+                            if RETRY_STATE.retries >= max_retries or \
+                                    time.time() + delay > deadline:
+                                # Exceeded retry attempts or the time budget
+                                LOG.warn(_LW('%(method)s failed after '
+                                             '%(retries)d attempts'),
+                                         {'method': f.__name__,
+                                          'retries': RETRY_STATE.retries})
+                                _count_retry('failures', f.__name__)
+                                raise
+
+                            # Retry, with a delay.
+                            _count_retry('retries', f.__name__)
+                            time.sleep(delay)
 
                 finally:
                     RETRY_STATE.held = False
@@ -107,6 +153,39 @@ def retry(cb=None, retries=50, delay=150):
     return outer
 
 
+def _count_retry(event, method):
+    RETRY_COUNTERS[(event, method)] += 1
+
+    # Count against the domains locked by this thread, which is where the
+    # contention lies
+    for domain_id in getattr(DOMAIN_LOCKS, 'held', None) or []:
+        counters = RETRY_DOMAINS.pop(domain_id, None) or collections.Counter()
+        counters[event] += 1
+
+        # Keep the most recently contended domains
+        RETRY_DOMAINS[domain_id] = counters
+
+        while len(RETRY_DOMAINS) > RETRY_DOMAINS_SIZE:
+            RETRY_DOMAINS.popitem(last=False)
+
+
+def get_retry_counters():
+    """
+    Return the retries and final failures counted by the retry decorator in
+    this process, by method name and for the most recently contended domains.
+    """
+    methods = collections.defaultdict(dict)
+
+    for (event, method), count in RETRY_COUNTERS.items():
+        methods[method][event] = count
+
+    return {
+        'methods': dict(methods),
+        'domains': dict((domain_id, dict(counters))
+                        for domain_id, counters in RETRY_DOMAINS.items()),
+    }
+
+
 # TODO(kiall): Get this a better home :)
 def transaction(f):
     @retry(cb=_retry_on_deadlock)
@@ -128,7 +207,8 @@ def synchronized_domain(domain_arg=1, new_domain=False):
     """Ensures only a single operation is in progress for each domain
 
     A Decorator which ensures only a single operation can be happening
-    on a single domain at once, within the current designate-central instance
+    on a single domain at once. Whether this holds across designate-central
+    processes depends on the configured lock driver.
     """
     def outer(f):
         @functools.wraps(f)
@@ -186,31 +266,73 @@ def synchronized_domain(domain_arg=1, new_domain=False):
                 # Call the wrapped function
                 return f(self, *args, **kwargs)
             else:
-                with lockutils.lock('domain-%s' % domain_id):
+                with self.lock_manager.lock('domain-%s' % domain_id):
                     DOMAIN_LOCKS.held.add(domain_id)
 
-                    # Call the wrapped function
-                    result = f(self, *args, **kwargs)
-
-                    DOMAIN_LOCKS.held.remove(domain_id)
-                    return result
+                    try:
+                        # Call the wrapped function
+                        return f(self, *args, **kwargs)
+                    finally:
+                        DOMAIN_LOCKS.held.remove(domain_id)
 
         return wrapper
     return outer
 
 
+@contextlib.contextmanager
+def buffered_notifications(notifier):
+    """
+    Buffer the notifications queued within, sending them once the outermost
+    buffer is exited.
+    """
+    if not hasattr(NOTIFICATION_BUFFER, 'queue'):
+        # Create the notifications queue if necessary
+        NOTIFICATION_BUFFER.stack = 0
+        NOTIFICATION_BUFFER.queue = collections.deque()
+
+    NOTIFICATION_BUFFER.stack += 1
+
+    try:
+        yield NOTIFICATION_BUFFER.queue
+
+    finally:
+        NOTIFICATION_BUFFER.stack -= 1
+
+        if NOTIFICATION_BUFFER.stack == 0:
+            LOG.debug('Emitting %(count)d notifications',
+                      {'count': len(NOTIFICATION_BUFFER.queue)})
+            # Send the queued notifications, in order.
+            for value in NOTIFICATION_BUFFER.queue:
+                LOG.debug('Emitting %(type)s notification',
+                          {'type': value[1]})
+                notifier.info(value[0], value[1], value[2])
+
+            # Reset the queue
+            NOTIFICATION_BUFFER.queue.clear()
+
+
+def replica_reads(f):
+    """
+    Allow the storage reads of a read only API path to be served by a read
+    replica. Reads made while this thread holds a domain lock always go to
+    the primary, as they are part of a read-modify-write.
+    """
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        if getattr(DOMAIN_LOCKS, 'held', None):
+            return f(self, *args, **kwargs)
+
+        with self.storage.replica_reads():
+            return f(self, *args, **kwargs)
+
+    return wrapper
+
+
 def notification(notification_type):
     def outer(f):
         @functools.wraps(f)
         def wrapper(self, *args, **kwargs):
-            if not hasattr(NOTIFICATION_BUFFER, 'queue'):
-                # Create the notifications queue if necessary
-                NOTIFICATION_BUFFER.stack = 0
-                NOTIFICATION_BUFFER.queue = collections.deque()
-
-            NOTIFICATION_BUFFER.stack += 1
-
-            try:
+            with buffered_notifications(self.notifier) as queue:
                 # Find the context argument
                 context = dcontext.DesignateContext.\
                     get_context_from_function_and_args(f, args, kwargs)
@@ -221,32 +343,118 @@ def notification(notification_type):
                 # Enqueue the notification
                 LOG.debug('Queueing notification for %(type)s ',
                           {'type': notification_type})
-                NOTIFICATION_BUFFER.queue.appendleft(
-                    (context, notification_type, result,))
+                queue.appendleft((context, notification_type, result,))
 
                 return result
 
-            finally:
-                NOTIFICATION_BUFFER.stack -= 1
+        return wrapper
+    return outer
 
-                if NOTIFICATION_BUFFER.stack == 0:
-                    LOG.debug('Emitting %(count)d notifications',
-                              {'count': len(NOTIFICATION_BUFFER.queue)})
-                    # Send the queued notifications, in order.
-                    for value in NOTIFICATION_BUFFER.queue:
-                        LOG.debug('Emitting %(type)s notification',
-                                  {'type': value[1]})
-                        self.notifier.info(value[0], value[1], value[2])
 
-                    # Reset the queue
-                    NOTIFICATION_BUFFER.queue.clear()
+class BlacklistMatcher(object):
+    """Searches domain names for any of a set of blacklist patterns"""
 
-        return wrapper
-    return outer
+    def __init__(self, patterns):
+        alternatives = []
+        self.regexes = []
+
+        for pattern in patterns:
+            regex = re.compile(pattern)
+
+            # Groups and inline flags would change meaning once alternated
+            # with the other patterns, so those are searched for separately
+            if regex.groups or regex.flags:
+                self.regexes.append(regex)
+            else:
+                alternatives.append('(?:%s)' % pattern)
+
+        if alternatives:
+            self.regexes.insert(0, re.compile('|'.join(alternatives)))
+
+    def search(self, domain_name):
+        for regex in self.regexes:
+            if regex.search(domain_name):
+                return True
+
+        return False
+
+
+class ZoneNameIndex(object):
+    """
+    An index of zone names, held as a trie of their labels from the root
+    down, to find the zones above and below a name.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+        # When the index was last synced with storage, None until the index
+        # has been loaded
+        self.synced_at = None
+
+    @staticmethod
+    def _labels(name):
+        # DNS names are case insensitive
+        return reversed(name.rstrip('.').lower().split('.'))
+
+    def add(self, name, domain_id):
+        node = self.root
+
+        for label in self._labels(name):
+            node = node.setdefault(label, {})
+
+        # Domain IDs are held under the None key, which no label can use
+        node[None] = domain_id
+
+    def remove(self, name, domain_id):
+        path = [self.root]
+
+        for label in self._labels(name):
+            node = path[-1].get(label)
+            if node is None:
+                return
+            path.append(node)
+
+        # The name may have been reused by a domain created since
+        if path[-1].get(None) != domain_id:
+            return
+
+        del path[-1][None]
+
+        # Prune the nodes no longer leading to any domain
+        labels = list(self._labels(name))
+        while len(path) > 1 and not path[-1]:
+            path.pop()
+            del path[-1][labels[len(path) - 1]]
+
+    def find_parent(self, name):
+        """Find the ID of the closest zone above name, if any"""
+        node = self.root
+        parent_id = None
+
+        # The name's own node is not considered
+        for label in list(self._labels(name))[:-1]:
+            node = node.get(label)
+            if node is None:
+                break
+            parent_id = node.get(None, parent_id)
+
+        return parent_id
+
+    def has_children(self, name):
+        """Whether there are any zones below name"""
+        node = self.root
+
+        for label in self._labels(name):
+            node = node.get(label)
+            if node is None:
+                return False
+
+        return any(key is not None for key in node)
 
 
 class Service(service.RPCService, service.Service):
-    RPC_API_VERSION = '5.0'
+    RPC_API_VERSION = '5.4'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -260,8 +468,23 @@ class Service(service.RPCService, service.Service):
         # Get a quota manager instance
         self.quota = quota.get_quota()
 
+        # Get the lock manager the domains are locked with
+        lock_driver = cfg.CONF['service:central'].lock_driver
+        self.lock_manager = locking.get_lock_manager(lock_driver)
+
         self.network_api = network_api.get_network_api(cfg.CONF.network_api)
 
+        # The compiled blacklists, and the storage version they were
+        # compiled from
+        self._blacklist_matcher = None
+        self._blacklist_version = None
+
+        # The TLD names, and the storage version they were loaded from
+        self._tld_names = None
+        self._tld_version = None
+
+        self._zone_name_index = ZoneNameIndex()
+
     @property
     def service_name(self):
         return 'central'
@@ -300,20 +523,14 @@ class Service(service.RPCService, service.Service):
 
         # Check the TLD for validity if there are entries in the database
         if self.check_for_tlds:
-            try:
-                self.storage.find_tld(context, {'name': domain_labels[-1]})
-            except exceptions.TldNotFound:
+            tld_names = self._get_tld_names(context)
+
+            if domain_labels[-1].lower() not in tld_names:
                 raise exceptions.InvalidDomainName('Invalid TLD')
 
             # Now check that the domain name is not the same as a TLD
-            try:
-                stripped_domain_name = domain_name.rstrip('.').lower()
-                self.storage.find_tld(
-                    context,
-                    {'name': stripped_domain_name})
-            except exceptions.TldNotFound:
-                pass
-            else:
+            stripped_domain_name = domain_name.rstrip('.').lower()
+            if stripped_domain_name in tld_names:
                 raise exceptions.InvalidDomainName(
                     'Domain name cannot be the same as a TLD')
 
@@ -356,10 +573,11 @@ class Service(service.RPCService, service.Service):
         if recordset_type != 'CNAME':
             criterion['type'] = 'CNAME'
 
-        recordsets = self.storage.find_recordsets(context, criterion)
+        # The recordset being updated doesn't conflict with itself
+        if recordset_id is not None:
+            criterion['id'] = '!%s' % recordset_id
 
-        if ((len(recordsets) == 1 and recordsets[0].id != recordset_id)
-                or len(recordsets) > 1):
+        if self.storage.recordset_exists(context, criterion):
             raise exceptions.InvalidRecordSetLocation(
                 'CNAME recordsets may not share a name with any other records')
 
@@ -401,13 +619,69 @@ class Service(service.RPCService, service.Service):
         Ensures the provided domain_name is not blacklisted.
         """
 
-        blacklists = self.storage.find_blacklists(context)
+        return self._get_blacklist_matcher(context).search(domain_name)
 
-        for blacklist in blacklists:
-            if bool(re.search(blacklist.pattern, domain_name)):
-                return True
+    def _get_blacklist_matcher(self, context):
+        # Blacklists may be changed through any central, the storage version
+        # tells us whether the matcher compiled here is still current.
+        version = self.storage.get_blacklists_version(context)
 
-        return False
+        if self._blacklist_matcher is None or \
+                version != self._blacklist_version:
+            blacklists = self.storage.find_blacklists(context)
+
+            self._blacklist_matcher = BlacklistMatcher(
+                blacklist.pattern for blacklist in blacklists)
+            self._blacklist_version = version
+
+        return self._blacklist_matcher
+
+    def _get_tld_names(self, context):
+        # TLDs may be changed through any central, the storage version tells
+        # us whether the names loaded here are still current.
+        version = self.storage.get_tlds_version(context)
+
+        if self._tld_names is None or version != self._tld_version:
+            tlds = self.storage.find_tlds(context)
+
+            self._tld_names = frozenset(tld.name.lower() for tld in tlds)
+            self._tld_version = version
+
+        return self._tld_names
+
+    def _get_zone_name_index(self, context):
+        """
+        Sync the zone name index with the domains created and deleted in
+        storage since it was last synced, returning None if it can't be.
+        """
+        context = context.elevated()
+        context.all_tenants = True
+
+        index = self._zone_name_index
+        synced_at = timeutils.utcnow()
+
+        try:
+            if index.synced_at is None:
+                domains = self.storage.find_domain_name_changes(context)
+            else:
+                # NOTE: The window overlaps the previous sync, to catch the
+                #       domains created by other centrals whose clocks are
+                #       behind ours, or whose transactions committed late.
+                domains = self.storage.find_domain_name_changes(
+                    context, index.synced_at - ZONE_NAME_INDEX_SYNC_MARGIN)
+        except Exception:
+            LOG.exception(_LE('Failed to sync the zone name index'))
+            return None
+
+        for domain in domains:
+            if domain.deleted == '0':
+                index.add(domain.name, domain.id)
+            else:
+                index.remove(domain.name, domain.id)
+
+        index.synced_at = synced_at
+
+        return index
 
     def _is_subdomain(self, context, domain_name):
         """
@@ -417,6 +691,21 @@ class Service(service.RPCService, service.Service):
         context = context.elevated()
         context.all_tenants = True
 
+        index = self._get_zone_name_index(context)
+
+        if index is not None:
+            parent_id = index.find_parent(domain_name)
+
+            if parent_id is None:
+                return False
+
+            try:
+                return self.storage.get_domain(context, parent_id)
+            except exceptions.DomainNotFound:
+                # The parent was deleted since the index was synced, fall
+                # back to searching storage for any other parent
+                pass
+
         # Break the name up into it's component labels
         labels = domain_name.split(".")
 
@@ -443,6 +732,11 @@ class Service(service.RPCService, service.Service):
         context = context.elevated()
         context.all_tenants = True
 
+        index = self._get_zone_name_index(context)
+
+        if index is not None and not index.has_children(domain_name):
+            return objects.DomainList()
+
         # Create wildcard term to catch all subdomains
         search_term = "*.%s" % domain_name
 
@@ -590,14 +884,12 @@ class Service(service.RPCService, service.Service):
         pass
 
     def _enforce_record_quota(self, context, domain, recordset):
-        # Ensure the records per domain quota is OK
-        criterion = {'domain_id': domain['id']}
-        count = self.storage.count_records(context, criterion)
-
+        # Ensure the records per domain and per recordset quotas are OK. The
+        # domain's record_count is kept up to date by storage, and the
+        # recordset's records have already been loaded.
         self.quota.limit_check(context, domain['tenant_id'],
-                               domain_records=count)
-
-        # TODO(kiall): Enforce Records per RRSet Quotas
+                               domain_records=domain.record_count,
+                               recordset_records=len(recordset.records))
 
     # Misc Methods
     def get_absolute_limits(self, context):
@@ -647,11 +939,13 @@ class Service(service.RPCService, service.Service):
 
         # The TLD is only created on central's storage and not on the backend.
         created_tld = self.storage.create_tld(context, tld)
+        self._tld_names = None
 
         # Set check for tlds to be true
         self.check_for_tlds = True
         return created_tld
 
+    @replica_reads
     def find_tlds(self, context, criterion=None, marker=None, limit=None,
                   sort_key=None, sort_dir=None):
         policy.check('find_tlds', context)
@@ -659,6 +953,7 @@ class Service(service.RPCService, service.Service):
         return self.storage.find_tlds(context, criterion, marker, limit,
                                       sort_key, sort_dir)
 
+    @replica_reads
     def get_tld(self, context, tld_id):
         policy.check('get_tld', context, {'tld_id': tld_id})
 
@@ -673,6 +968,7 @@ class Service(service.RPCService, service.Service):
         policy.check('update_tld', context, target)
 
         tld = self.storage.update_tld(context, tld)
+        self._tld_names = None
 
         return tld
 
@@ -687,6 +983,7 @@ class Service(service.RPCService, service.Service):
         policy.check('delete_tld', context, {'tld_id': tld_id})
 
         tld = self.storage.delete_tld(context, tld_id)
+        self._tld_names = None
 
         return tld
 
@@ -702,6 +999,7 @@ class Service(service.RPCService, service.Service):
 
         return created_tsigkey
 
+    @replica_reads
     def find_tsigkeys(self, context, criterion=None, marker=None, limit=None,
                       sort_key=None, sort_dir=None):
         policy.check('find_tsigkeys', context)
@@ -709,6 +1007,7 @@ class Service(service.RPCService, service.Service):
         return self.storage.find_tsigkeys(context, criterion, marker,
                                           limit, sort_key, sort_dir)
 
+    @replica_reads
     def get_tsigkey(self, context, tsigkey_id):
         policy.check('get_tsigkey', context, {'tsigkey_id': tsigkey_id})
 
@@ -740,10 +1039,12 @@ class Service(service.RPCService, service.Service):
         return tsigkey
 
     # Tenant Methods
+    @replica_reads
     def find_tenants(self, context):
         policy.check('find_tenants', context)
         return self.storage.find_tenants(context)
 
+    @replica_reads
     def get_tenant(self, context, tenant_id):
         target = {
             'tenant_id': tenant_id
@@ -753,6 +1054,7 @@ class Service(service.RPCService, service.Service):
 
         return self.storage.get_tenant(context, tenant_id)
 
+    @replica_reads
     def count_tenants(self, context):
         policy.check('count_tenants', context)
         return self.storage.count_tenants(context)
@@ -865,6 +1167,7 @@ class Service(service.RPCService, service.Service):
 
         return domain
 
+    @replica_reads
     def get_domain(self, context, domain_id):
         domain = self.storage.get_domain(context, domain_id)
 
@@ -877,6 +1180,7 @@ class Service(service.RPCService, service.Service):
 
         return domain
 
+    @replica_reads
     def get_domain_servers(self, context, domain_id=None, criterion=None):
 
         if domain_id is None:
@@ -903,14 +1207,16 @@ class Service(service.RPCService, service.Service):
 
         return nameservers
 
+    @replica_reads
     def find_domains(self, context, criterion=None, marker=None, limit=None,
-                     sort_key=None, sort_dir=None):
+                     sort_key=None, sort_dir=None, total_count=False):
         target = {'tenant_id': context.tenant}
         policy.check('find_domains', context, target)
 
         return self.storage.find_domains(context, criterion, marker, limit,
-                                         sort_key, sort_dir)
+                                         sort_key, sort_dir, total_count)
 
+    @replica_reads
     def find_domain(self, context, criterion=None):
         target = {'tenant_id': context.tenant}
         policy.check('find_domain', context, target)
@@ -1011,6 +1317,7 @@ class Service(service.RPCService, service.Service):
 
         return domain
 
+    @replica_reads
     def count_domains(self, context, criterion=None):
         if criterion is None:
             criterion = {}
@@ -1024,6 +1331,7 @@ class Service(service.RPCService, service.Service):
         return self.storage.count_domains(context, criterion)
 
     # Report combining all the count reports based on criterion
+    @replica_reads
     def count_report(self, context, criterion=None):
         reports = []
 
@@ -1128,6 +1436,7 @@ class Service(service.RPCService, service.Service):
         # Return the domain too in case it was updated
         return (recordset, domain)
 
+    @replica_reads
     def get_recordset(self, context, domain_id, recordset_id):
         domain = self.storage.get_domain(context, domain_id)
         recordset = self.storage.get_recordset(context, recordset_id)
@@ -1149,16 +1458,19 @@ class Service(service.RPCService, service.Service):
 
         return recordset
 
+    @replica_reads
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None):
+                        sort_key=None, sort_dir=None, total_count=False):
         target = {'tenant_id': context.tenant}
         policy.check('find_recordsets', context, target)
 
         recordsets = self.storage.find_recordsets(context, criterion, marker,
-                                                  limit, sort_key, sort_dir)
+                                                  limit, sort_key, sort_dir,
+                                                  total_count)
 
         return recordsets
 
+    @replica_reads
     def find_recordset(self, context, criterion=None):
         target = {'tenant_id': context.tenant}
         policy.check('find_recordset', context, target)
@@ -1173,20 +1485,7 @@ class Service(service.RPCService, service.Service):
         domain_id = recordset.obj_get_original_value('domain_id')
         domain = self.storage.get_domain(context, domain_id)
 
-        changes = recordset.obj_get_changes()
-
-        # Ensure immutable fields are not changed
-        if 'tenant_id' in changes:
-            raise exceptions.BadRequest('Moving a recordset between tenants '
-                                        'is not allowed')
-
-        if 'domain_id' in changes:
-            raise exceptions.BadRequest('Moving a recordset between domains '
-                                        'is not allowed')
-
-        if 'type' in changes:
-            raise exceptions.BadRequest('Changing a recordsets type is not '
-                                        'allowed')
+        self._ensure_recordset_immutables(recordset)
 
         target = {
             'domain_id': recordset.obj_get_original_value('domain_id'),
@@ -1204,6 +1503,23 @@ class Service(service.RPCService, service.Service):
 
         return recordset
 
+    @staticmethod
+    def _ensure_recordset_immutables(recordset):
+        changes = recordset.obj_get_changes()
+
+        # Ensure immutable fields are not changed
+        if 'tenant_id' in changes:
+            raise exceptions.BadRequest('Moving a recordset between tenants '
+                                        'is not allowed')
+
+        if 'domain_id' in changes:
+            raise exceptions.BadRequest('Moving a recordset between domains '
+                                        'is not allowed')
+
+        if 'type' in changes:
+            raise exceptions.BadRequest('Changing a recordsets type is not '
+                                        'allowed')
+
     @transaction
     def _update_recordset_in_storage(self, context, domain, recordset,
                                      increment_serial=True):
@@ -1287,6 +1603,110 @@ class Service(service.RPCService, service.Service):
 
         return (recordset, domain)
 
+    @synchronized_domain()
+    def apply_recordset_changes(self, context, domain_id, create=None,
+                                update=None, delete=None):
+        """
+        Apply a batch of recordset changes to a domain, in a single
+        transaction, with a single serial increment and pool manager update.
+
+        :param context: Security context information.
+        :param domain_id: The ID of the designate domain.
+        :param create: RecordSetList of recordsets to create.
+        :param update: RecordSetList of recordsets to update.
+        :param delete: IDs of the recordsets to delete.
+        :return: The created, updated and deleted RecordSetLists.
+        """
+        create = create or objects.RecordSetList()
+        update = update or objects.RecordSetList()
+        delete = delete or []
+
+        domain = self.storage.get_domain(context, domain_id)
+
+        target = {
+            'domain_id': domain_id,
+            'domain_name': domain.name,
+            'tenant_id': domain.tenant_id,
+        }
+
+        for recordset in create:
+            policy.check('create_recordset', context,
+                         dict(target, recordset_name=recordset.name))
+
+        for recordset in update:
+            # Ensure the domain_id matches the recordset's domain_id
+            if recordset.obj_get_original_value('domain_id') != domain.id:
+                raise exceptions.RecordSetNotFound()
+
+            self._ensure_recordset_immutables(recordset)
+
+            policy.check('update_recordset', context,
+                         dict(target,
+                              recordset_id=recordset.obj_get_original_value(
+                                  'id')))
+
+        deletes = objects.RecordSetList()
+        for recordset_id in delete:
+            recordset = self.storage.get_recordset(context, recordset_id)
+
+            # Ensure the domain_id matches the recordset's domain_id
+            if domain.id != recordset.domain_id:
+                raise exceptions.RecordSetNotFound()
+
+            policy.check('delete_recordset', context,
+                         dict(target, recordset_id=recordset.id))
+
+            deletes.append(recordset)
+
+        if len(create) == 0 and len(update) == 0 and len(deletes) == 0:
+            return (create, update, deletes)
+
+        with buffered_notifications(self.notifier) as queue:
+            results, domain = self._apply_recordset_changes_in_storage(
+                context, domain, create, update, deletes)
+
+            notifications = []
+            for notification_type, recordsets in zip(
+                    ['dns.recordset.create', 'dns.recordset.update',
+                     'dns.recordset.delete'], results):
+                notifications.extend(
+                    (context, notification_type, recordset)
+                    for recordset in recordsets)
+
+            # Queue the notifications to be sent in the order of the changes
+            queue.extendleft(reversed(notifications))
+
+        self.pool_manager_api.update_domain(context, domain)
+
+        return results
+
+    @transaction
+    def _apply_recordset_changes_in_storage(self, context, domain, create,
+                                            update, delete):
+        # Increment the serial once, for all of the changes
+        domain = self._update_domain_in_storage(context, domain)
+
+        created = objects.RecordSetList()
+        for recordset in create:
+            recordset, domain = self._create_recordset_in_storage(
+                context, domain, recordset, increment_serial=False)
+            created.append(recordset)
+
+        updated = objects.RecordSetList()
+        for recordset in update:
+            recordset, domain = self._update_recordset_in_storage(
+                context, domain, recordset, increment_serial=False)
+            updated.append(recordset)
+
+        deleted = objects.RecordSetList()
+        for recordset in delete:
+            recordset, domain = self._delete_recordset_in_storage(
+                context, domain, recordset, increment_serial=False)
+            deleted.append(recordset)
+
+        return (created, updated, deleted), domain
+
+    @replica_reads
     def count_recordsets(self, context, criterion=None):
         if criterion is None:
             criterion = {}
@@ -1346,6 +1766,7 @@ class Service(service.RPCService, service.Service):
 
         return (record, domain)
 
+    @replica_reads
     def get_record(self, context, domain_id, recordset_id, record_id):
         domain = self.storage.get_domain(context, domain_id)
         recordset = self.storage.get_recordset(context, recordset_id)
@@ -1372,6 +1793,7 @@ class Service(service.RPCService, service.Service):
 
         return record
 
+    @replica_reads
     def find_records(self, context, criterion=None, marker=None, limit=None,
                      sort_key=None, sort_dir=None):
         target = {'tenant_id': context.tenant}
@@ -1380,12 +1802,22 @@ class Service(service.RPCService, service.Service):
         return self.storage.find_records(context, criterion, marker, limit,
                                          sort_key, sort_dir)
 
+    @replica_reads
     def find_record(self, context, criterion=None):
         target = {'tenant_id': context.tenant}
         policy.check('find_record', context, target)
 
         return self.storage.find_record(context, criterion)
 
+    @replica_reads
+    def find_export_records(self, context, domain_id, marker=None,
+                            limit=None):
+        target = {'tenant_id': context.tenant}
+        policy.check('find_records', context, target)
+
+        return self.storage.find_export_records(context, domain_id, marker,
+                                                limit)
+
     @notification('dns.record.update')
     @synchronized_domain()
     def update_record(self, context, record, increment_serial=True):
@@ -1497,6 +1929,7 @@ class Service(service.RPCService, service.Service):
 
         return (record, domain)
 
+    @replica_reads
     def count_records(self, context, criterion=None):
         if criterion is None:
             criterion = {}
@@ -1579,30 +2012,33 @@ class Service(service.RPCService, service.Service):
             'host': cfg.CONF.host,
             'status': status,
             'backend': backend_status,
-            'storage': storage_status
+            'storage': storage_status,
+            'retries': get_retry_counters(),
+            'locks': dict(self.lock_manager.stats),
         }
 
-    def _determine_floatingips(self, context, fips, records=None,
-                               tenant_id=None):
+    def _determine_floatingips(self, context, fips, tenant_id=None):
         """
-        Given the context or tenant, records and fips it returns the valid
-        floatingips either with a associated record or not. Deletes invalid
-        records also.
+        Given the context or tenant and fips it returns the valid
+        floatingips either with a associated record or not, and the invalid
+        records to be deleted.
 
-        Returns a list of tuples with FloatingIPs and it's Record.
+        Returns a dict of tuples with FloatingIPs and it's Record, the
+        invalid Records, and the RecordSets of the Records by ID.
         """
         tenant_id = tenant_id or context.tenant
 
         elevated_context = context.elevated()
         elevated_context.all_tenants = True
 
-        criterion = {
-            'managed': True,
-            'managed_resource_type': 'ptr:floatingip',
-        }
+        # Fetch the records of just these addresses, along with their TTLs
+        addresses = [fip['address'] for fip in fips.values()]
+        recordsets = self.storage.find_floatingip_records(
+            elevated_context, addresses)
 
-        records = self.find_records(elevated_context, criterion)
-        records = dict([(r['managed_extra'], r) for r in records])
+        records = dict([(r['managed_extra'], r)
+                        for rs in recordsets for r in rs.records])
+        recordsets = dict([(rs['id'], rs) for rs in recordsets])
 
         invalid = []
         data = {}
@@ -1627,21 +2063,42 @@ class Service(service.RPCService, service.Service):
                     record = None
             data[fip_key] = (fip_values, record)
 
-        return data, invalid
+        return data, invalid, recordsets
 
-    def _invalidate_floatingips(self, context, records):
+    def _invalidate_floatingips(self, context, records, region=None):
         """
         Utility method to delete a list of records.
+
+        The records are only deleted once a freshly fetched list confirms
+        the tenant now holds their floating IPs, never based on a cached or
+        stale list.
         """
+        if not records:
+            return
+
         elevated_context = context.elevated()
         elevated_context.all_tenants = True
 
-        if records > 0:
-            for r in records:
-                msg = 'Deleting record %s for FIP %s'
-                LOG.debug(msg, r['id'], r['managed_resource_id'])
-                self.delete_record(elevated_context, r['domain_id'],
-                                   r['recordset_id'], r['id'])
+        try:
+            tenant_fips = self._list_floatingips(context, region=region,
+                                                 use_cache=False)
+        except Exception:
+            LOG.warn(_LW('Unable to fetch the FloatingIPs of tenant %s, not '
+                         'deleting the records of other tenants'),
+                     context.tenant)
+            return
+
+        for r in records:
+            fip = tenant_fips.get((r['managed_resource_region'],
+                                   r['managed_resource_id']))
+
+            if fip is None or fip['address'] != r['managed_extra']:
+                continue
+
+            msg = 'Deleting record %s for FIP %s'
+            LOG.debug(msg, r['id'], r['managed_resource_id'])
+            self.delete_record(elevated_context, r['domain_id'],
+                               r['recordset_id'], r['id'])
 
     def _format_floatingips(self, context, data, recordsets=None):
         """
@@ -1689,8 +2146,9 @@ class Service(service.RPCService, service.Service):
             fips[key] = fip_ptr
         return fips
 
-    def _list_floatingips(self, context, region=None):
-        data = self.network_api.list_floatingips(context, region=region)
+    def _list_floatingips(self, context, region=None, use_cache=True):
+        data = self.network_api.list_floatingips(context, region=region,
+                                                 use_cache=use_cache)
         return self._list_to_dict(data, keys=['region', 'id'])
 
     def _list_to_dict(self, data, keys=['id']):
@@ -1721,12 +2179,12 @@ class Service(service.RPCService, service.Service):
 
         tenant_fips = self._list_floatingips(context)
 
-        valid, invalid = self._determine_floatingips(
+        valid, invalid, recordsets = self._determine_floatingips(
             elevated_context, tenant_fips)
 
         self._invalidate_floatingips(context, invalid)
 
-        return self._format_floatingips(context, valid).values()
+        return self._format_floatingips(context, valid, recordsets).values()
 
     def get_floatingip(self, context, region, floatingip_id):
         """
@@ -1739,12 +2197,12 @@ class Service(service.RPCService, service.Service):
 
         self._get_floatingip(context, region, floatingip_id, tenant_fips)
 
-        valid, invalid = self._determine_floatingips(
+        valid, invalid, recordsets = self._determine_floatingips(
             elevated_context, tenant_fips)
 
-        self._invalidate_floatingips(context, invalid)
+        self._invalidate_floatingips(context, invalid, region=region)
 
-        mangled = self._format_floatingips(context, valid)
+        mangled = self._format_floatingips(context, valid, recordsets)
         return mangled[region, floatingip_id]
 
     def _set_floatingip_reverse(self, context, region, floatingip_id, values):
@@ -1756,7 +2214,10 @@ class Service(service.RPCService, service.Service):
         elevated_context = context.elevated()
         elevated_context.all_tenants = True
 
-        tenant_fips = self._list_floatingips(context, region=region)
+        # NOTE: Check the tenant owns the floating IP now, not as of the
+        #       cached or stale list, as it may have been reassigned since
+        tenant_fips = self._list_floatingips(context, region=region,
+                                             use_cache=False)
 
         fip = self._get_floatingip(context, region, floatingip_id, tenant_fips)
 
@@ -1894,9 +2355,11 @@ class Service(service.RPCService, service.Service):
         policy.check('create_blacklist', context)
 
         created_blacklist = self.storage.create_blacklist(context, blacklist)
+        self._blacklist_matcher = None
 
         return created_blacklist
 
+    @replica_reads
     def get_blacklist(self, context, blacklist_id):
         policy.check('get_blacklist', context)
 
@@ -1904,6 +2367,7 @@ class Service(service.RPCService, service.Service):
 
         return blacklist
 
+    @replica_reads
     def find_blacklists(self, context, criterion=None, marker=None,
                         limit=None, sort_key=None, sort_dir=None):
         policy.check('find_blacklists', context)
@@ -1914,6 +2378,7 @@ class Service(service.RPCService, service.Service):
 
         return blacklists
 
+    @replica_reads
     def find_blacklist(self, context, criterion):
         policy.check('find_blacklist', context)
 
@@ -1930,6 +2395,7 @@ class Service(service.RPCService, service.Service):
         policy.check('update_blacklist', context, target)
 
         blacklist = self.storage.update_blacklist(context, blacklist)
+        self._blacklist_matcher = None
 
         return blacklist
 
@@ -1939,6 +2405,7 @@ class Service(service.RPCService, service.Service):
         policy.check('delete_blacklist', context)
 
         blacklist = self.storage.delete_blacklist(context, blacklist_id)
+        self._blacklist_matcher = None
 
         return blacklist
 
@@ -1956,6 +2423,7 @@ class Service(service.RPCService, service.Service):
 
         return created_pool
 
+    @replica_reads
     def find_pools(self, context, criterion=None, marker=None, limit=None,
                    sort_key=None, sort_dir=None):
 
@@ -1964,12 +2432,14 @@ class Service(service.RPCService, service.Service):
         return self.storage.find_pools(context, criterion, marker, limit,
                                        sort_key, sort_dir)
 
+    @replica_reads
     def find_pool(self, context, criterion=None):
 
         policy.check('find_pool', context)
 
         return self.storage.find_pool(context, criterion)
 
+    @replica_reads
     def get_pool(self, context, pool_id):
 
         policy.check('get_pool', context)
@@ -2089,30 +2559,32 @@ class Service(service.RPCService, service.Service):
             self.storage.delete_domain(context, domain.id)
 
     def _update_record_status(self, context, domain_id, status, serial):
-        criterion = {
-            'domain_id': domain_id
-        }
-        records = self.storage.find_records(context, criterion=criterion)
-
-        for record in records:
-            record, deleted = self._update_domain_or_record_status(
-                record, status, serial)
-
-            LOG.debug('Setting record %s, serial %s: action %s, status %s'
-                      % (record.id, record.serial,
-                         record.action, record.status))
-            self.storage.update_record(context, record)
+        # NOTE: These mirror the transitions in
+        #       _update_domain_or_record_status, applied to all of the
+        #       domain's records at once rather than record by record.
+        if status == 'SUCCESS':
+            count = self.storage.update_records_status(
+                context, domain_id, {'action': 'NONE', 'status': 'ACTIVE'},
+                statuses=['PENDING', 'ERROR'], actions=['CREATE', 'UPDATE'],
+                serial=serial)
 
             # TODO(Ron): Including this to retain the current logic.
             # We should NOT be deleting records.  The record status should
             # be used to indicate the record has been deleted.
-            if deleted:
-                self.storage.delete_record(context, record.id)
+            deleted = self.storage.purge_records(
+                context, domain_id, statuses=['PENDING', 'ERROR'],
+                actions=['DELETE'], serial=serial)
 
-                recordset = self.storage.get_recordset(
-                    context, record.recordset_id)
-                if len(recordset.records) == 0:
-                    self.storage.delete_recordset(context, recordset.id)
+            LOG.debug('Set %d records of domain %s active and deleted %d, '
+                      'serial %s' % (count, domain_id, deleted, serial))
+
+        elif status == 'ERROR':
+            count = self.storage.update_records_status(
+                context, domain_id, {'status': 'ERROR'},
+                statuses=['PENDING'], serial=serial if serial != 0 else None)
+
+            LOG.debug('Set %d records of domain %s to error, serial %s'
+                      % (count, domain_id, serial))
 
     @staticmethod
     def _update_domain_or_record_status(domain_or_record, status, serial):
@@ -2167,6 +2639,7 @@ class Service(service.RPCService, service.Service):
 
         return created_zone_transfer_request
 
+    @replica_reads
     def get_zone_transfer_request(self, context, zone_transfer_request_id):
 
         elevated_context = context.elevated()
@@ -2185,6 +2658,7 @@ class Service(service.RPCService, service.Service):
 
         return zone_transfer_request
 
+    @replica_reads
     def find_zone_transfer_requests(self, context, criterion=None, marker=None,
                                     limit=None, sort_key=None, sort_dir=None):
 
@@ -2197,6 +2671,7 @@ class Service(service.RPCService, service.Service):
 
         return requests
 
+    @replica_reads
     def find_zone_transfer_request(self, context, criterion):
         target = {
             'tenant_id': context.tenant,
@@ -2290,6 +2765,7 @@ class Service(service.RPCService, service.Service):
 
         return created_zone_transfer_accept
 
+    @replica_reads
     def get_zone_transfer_accept(self, context, zone_transfer_accept_id):
         # Get zone transfer accept
 
@@ -2303,6 +2779,7 @@ class Service(service.RPCService, service.Service):
 
         return zone_transfer_accept
 
+    @replica_reads
     def find_zone_transfer_accepts(self, context, criterion=None, marker=None,
                                    limit=None, sort_key=None, sort_dir=None):
         policy.check('find_zone_transfer_accepts', context)
@@ -2310,6 +2787,7 @@ class Service(service.RPCService, service.Service):
                                                        marker, limit,
                                                        sort_key, sort_dir)
 
+    @replica_reads
     def find_zone_transfer_accept(self, context, criterion):
         policy.check('find_zone_transfer_accept', context)
         return self.storage.find_zone_transfer_accept(context, criterion)
@@ -2340,3 +2818,146 @@ class Service(service.RPCService, service.Service):
         return self.storage.delete_zone_transfer_accept(
             context,
             zone_transfer_accept_id)
+
+    # Zone Import Methods
+    @notification('dns.zone_import.create')
+    def create_zone_import(self, context, request_body):
+        target = {'tenant_id': context.tenant}
+        policy.check('create_zone_import', context, target)
+
+        zone_import = objects.ZoneImport(
+            tenant_id=context.tenant,
+            status='PENDING',
+            message=None,
+            recordsets_imported=0)
+
+        created_zone_import = self.storage.create_zone_import(
+            context, zone_import)
+
+        # The zonefile is parsed and written out of the caller's request,
+        # which only waits for the import to be recorded.
+        self.tg.add_thread(self._import_zone, context,
+                           created_zone_import.id, request_body)
+
+        return created_zone_import
+
+    def _import_zone(self, context, zone_import_id, request_body):
+        zone_import = self.storage.get_zone_import(context, zone_import_id)
+        created_domain = None
+
+        try:
+            dnspython_zone = dnszone.from_text(
+                request_body,
+                # Don't relativize, otherwise we end up with '@' record names.
+                relativize=False,
+                # Dont check origin, we allow missing NS records (missing SOA
+                # records are taken care of in domain_from_dnspython_zone).
+                check_origin=False)
+            domain = dnsutils.domain_from_dnspython_zone(dnspython_zone)
+
+            zone_import.recordsets_total = sum(
+                1 for _ in self._iter_import_rdatasets(dnspython_zone))
+
+            created_domain = self.create_domain(context, domain)
+
+            zone_import.domain_id = created_domain.id
+            zone_import = self.storage.update_zone_import(
+                context, zone_import)
+
+            batch = []
+            for name, rdataset in self._iter_import_rdatasets(
+                    dnspython_zone):
+                batch.append(
+                    dnsutils.dnspythonrecord_to_recordset(name, rdataset))
+
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    zone_import = self._import_recordsets(
+                        context, zone_import, batch)
+                    batch = []
+
+            if batch:
+                zone_import = self._import_recordsets(
+                    context, zone_import, batch)
+
+        except dnszone.UnknownOrigin:
+            message = ('The $ORIGIN statement is required and must be the '
+                       'first statement in the zonefile.')
+        except dnsexception.SyntaxError:
+            message = 'Malformed zonefile.'
+        except exceptions.Base as e:
+            message = e.error_message or e.error_type or \
+                e.__class__.__name__
+        except Exception:
+            LOG.exception(_LE('Unexpected error importing zone'))
+            message = 'An unknown error occurred.'
+        else:
+            zone_import.status = 'COMPLETE'
+            zone_import.message = 'Imported %d recordsets' % \
+                zone_import.recordsets_imported
+            return self.storage.update_zone_import(context, zone_import)
+
+        # NOTE: The recordsets are written in batches, so a failed import
+        #       deletes the domain rather than leaving it partially imported.
+        if created_domain is not None:
+            try:
+                self.delete_domain(context, created_domain.id)
+            except Exception:
+                LOG.exception(_LE('Failed to delete partially imported zone '
+                                  '%s'), created_domain.name)
+
+            zone_import.domain_id = None
+
+        zone_import.status = 'ERROR'
+        zone_import.message = message[:160]
+        return self.storage.update_zone_import(context, zone_import)
+
+    @staticmethod
+    def _iter_import_rdatasets(dnspython_zone):
+        for name, rdataset in dnspython_zone.iterate_rdatasets():
+            # The SOA and apex NS recordsets are managed by Designate
+            if rdataset.rdtype == rdatatype.SOA:
+                continue
+            if rdataset.rdtype == rdatatype.NS and \
+                    name == dnspython_zone.origin:
+                continue
+
+            yield name, rdataset
+
+    def _import_recordsets(self, context, zone_import, recordsets):
+        self.apply_recordset_changes(context, zone_import.domain_id,
+                                     create=recordsets)
+
+        zone_import.recordsets_imported += len(recordsets)
+        return self.storage.update_zone_import(context, zone_import)
+
+    @replica_reads
+    def get_zone_import(self, context, zone_import_id):
+        zone_import = self.storage.get_zone_import(context, zone_import_id)
+
+        target = {
+            'tenant_id': zone_import.tenant_id
+        }
+        policy.check('get_zone_import', context, target)
+
+        return zone_import
+
+    @replica_reads
+    def find_zone_imports(self, context, criterion=None, marker=None,
+                          limit=None, sort_key=None, sort_dir=None):
+        target = {'tenant_id': context.tenant}
+        policy.check('find_zone_imports', context, target)
+
+        return self.storage.find_zone_imports(context, criterion, marker,
+                                              limit, sort_key, sort_dir)
+
+    @notification('dns.zone_import.delete')
+    @transaction
+    def delete_zone_import(self, context, zone_import_id):
+        zone_import = self.storage.get_zone_import(context, zone_import_id)
+
+        target = {
+            'tenant_id': zone_import.tenant_id
+        }
+        policy.check('delete_zone_import', context, target)
+
+        return self.storage.delete_zone_import(context, zone_import_id)
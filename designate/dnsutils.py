@@ -13,12 +13,22 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import itertools
+import os
 import socket
+import sys
+import tempfile
+import time
 
 import dns
+import dns.exception
+import dns.query
 import dns.zone
+import eventlet
+import six
 from dns import rdatatype
 from oslo_log import log as logging
+from oslo_utils import excutils
 
 from designate import context
 from designate import exceptions
@@ -106,6 +116,15 @@ class ContextMiddleware(DNSMiddleware):
 
 
 def from_dnspython_zone(dnspython_zone):
+    zone = domain_from_dnspython_zone(dnspython_zone)
+
+    rrsets = dnspyrecords_to_recordsetlist(dnspython_zone.nodes)
+    zone.recordsets = rrsets
+    return zone
+
+
+def domain_from_dnspython_zone(dnspython_zone):
+    """Build the Domain described by a zone's SOA, without its recordsets"""
     # dnspython never builds a zone with more than one SOA, even if we give
     # it a zonefile that contains more than one
     soa = dnspython_zone.get_rdataset(dnspython_zone.origin, 'SOA')
@@ -119,16 +138,19 @@ def from_dnspython_zone(dnspython_zone):
         'ttl': soa.ttl
     }
 
-    zone = objects.Domain(**values)
-
-    rrsets = dnspyrecords_to_recordsetlist(dnspython_zone.nodes)
-    zone.recordsets = rrsets
-    return zone
+    return objects.Domain(**values)
 
 
 def dnspyrecords_to_recordsetlist(dnspython_records):
     rrsets = objects.RecordList()
 
+    for rrset in iter_dnspython_recordsets(dnspython_records):
+        rrsets.append(rrset)
+    return rrsets
+
+
+def iter_dnspython_recordsets(dnspython_records):
+    """Convert dnspython nodes to RecordSets, one at a time"""
     for rname in dnspython_records.keys():
         for rdataset in dnspython_records[rname]:
             rrset = dnspythonrecord_to_recordset(rname, rdataset)
@@ -136,8 +158,7 @@ def dnspyrecords_to_recordsetlist(dnspython_records):
             if rrset is None:
                 continue
 
-            rrsets.append(rrset)
-    return rrsets
+            yield rrset
 
 
 def dnspythonrecord_to_recordset(rname, rdataset):
@@ -184,26 +205,218 @@ def bind_udp(host, port):
     return sock_udp
 
 
-def do_axfr(zone_name, masters, source=None):
+class MasterHealth(object):
+    """
+    Tracks the health of a master, acting as a circuit breaker.
+
+    After `failure_threshold` consecutive failed transfers the circuit opens
+    and the master is passed over for `reset_timeout` seconds, after which a
+    single transfer is let through to probe it again. The probe is recorded
+    when it is let through; should it never report back, another is let
+    through once `reset_timeout` has passed again. The time taken for a
+    master to start answering a transfer is tracked as a moving average.
+    """
+    def __init__(self, failure_threshold=3, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self.probed_at = None
+        self.latency = None
+
+    def is_available(self):
+        if self.opened_at is None:
+            return True
+
+        now = time.time()
+
+        if now - self.opened_at < self.reset_timeout:
+            return False
+
+        if self.probed_at is not None and \
+                now - self.probed_at < self.reset_timeout:
+            # Another caller is probing the master
+            return False
+
+        # Half open, let this transfer through to probe the master
+        self.probed_at = now
+        return True
+
+    def record_success(self, latency):
+        self.failures = 0
+        self.opened_at = None
+        self.probed_at = None
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = 0.7 * self.latency + 0.3 * latency
+
+    def record_failure(self):
+        self.failures += 1
+        self.probed_at = None
+
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+
+
+_master_health = {}
+
+
+def get_master_health(master):
+    key = (master['ip'], master['port'])
+
+    if key not in _master_health:
+        _master_health[key] = MasterHealth()
+
+    return _master_health[key]
+
+
+def order_masters(masters):
+    """
+    Order masters for a transfer: healthy masters first, those with the
+    fewest recent failures then the fastest to answer first (masters with no
+    history keep their configured order, ahead of the rest), then the masters
+    with an open circuit, least recently opened first.
+    """
+    available = []
+    unavailable = []
+
+    for index, master in enumerate(masters):
+        health = get_master_health(master)
+
+        if health.is_available():
+            available.append(
+                (health.failures, health.latency or 0, index, master))
+        else:
+            unavailable.append((health.opened_at, 0, index, master))
+
+    return [m[-1] for m in sorted(available) + sorted(unavailable)]
+
+
+def do_axfr(zone_name, masters, source=None, timeout=None,
+            connect_timeout=None):
+    """
+    Performs an AXFR for a given zone name, failing over between the masters
+
+    :param zone_name: The name of the zone to transfer.
+    :param masters: A list of masters, as {'ip': ip, 'port': port} dicts.
+    :param source: The source address to transfer from.
+    :param timeout: The time (in seconds) to wait for each message of the
+        transfer.
+    :param connect_timeout: The time (in seconds) to wait for a master to
+        connect and start answering the transfer.
+    :return: The DNSPython Zone object
+    """
+    def consume(xfr):
+        return dns.zone.from_xfr(xfr, relativize=False)
+
+    return _do_xfr(zone_name, masters, consume, source=source,
+                   timeout=timeout, connect_timeout=connect_timeout)
+
+
+def do_axfr_to_file(zone_name, masters, output_path, source=None,
+                    timeout=None, connect_timeout=None):
     """
-    Performs an AXFR for a given zone name
+    Performs an AXFR for a given zone name, streaming the RRs straight into
+    a zone file rather than building the zone in memory. The zone file at
+    output_path is only replaced once the transfer completes.
+
+    The parameters are those of do_axfr.
     """
-    # TODO(Tim): Try the first master, try others if they exist
-    master = masters[0]
+    def consume(xfr):
+        write_xfr_to_file(xfr, output_path)
 
-    LOG.info(_LI("Doing AXFR for %(name)s from %(host)s") %
-             {'name': zone_name, 'host': master})
+    _do_xfr(zone_name, masters, consume, source=source, timeout=timeout,
+            connect_timeout=connect_timeout)
 
-    xfr = dns.query.xfr(master['ip'], zone_name, relativize=False,
-                        port=master['port'], source=source)
+
+def write_xfr_to_file(xfr, output_path):
+    """
+    Write the RRs from a stream of XFR messages to a zone file, atomically
+    replacing the file at output_path once the stream is complete.
+    """
+    # Write to a temporary file alongside the zone file, so that the rename
+    # is atomic
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(output_path),
+        prefix='.%s.' % os.path.basename(output_path))
 
     try:
-        # TODO(Tim): Add a timeout to this function
-        raw_zone = dns.zone.from_xfr(xfr, relativize=False)
+        os.chmod(tmp_path, 0o644)
+
+        with os.fdopen(fd, 'w') as zone_file:
+            soa_seen = False
+
+            for message in xfr:
+                for rrset in message.answer:
+                    if rrset.rdtype == rdatatype.SOA:
+                        if soa_seen:
+                            # The SOA closing the transfer
+                            continue
+                        soa_seen = True
+                    elif not soa_seen:
+                        raise dns.exception.FormError(
+                            'The first RR of a transfer must be the SOA')
+
+                    zone_file.write(rrset.to_text())
+                    zone_file.write('\n')
+
+            if not soa_seen:
+                raise dns.exception.FormError('No SOA in the transfer')
+
+        os.rename(tmp_path, output_path)
     except Exception:
-        LOG.exception(_LE("There was a problem with the AXFR"))
-        raise
+        with excutils.save_and_reraise_exception():
+            os.unlink(tmp_path)
+
+
+def _do_xfr(zone_name, masters, consume, source=None, timeout=None,
+            connect_timeout=None):
+    """
+    Performs an AXFR from the first master able to complete it, handing the
+    stream of messages to consume() and returning its result.
+    """
+    if not masters:
+        raise exceptions.NoServersConfigured(
+            'No masters to transfer %s from' % zone_name)
+
+    exc_info = None
+
+    for master in order_masters(masters):
+        health = get_master_health(master)
+
+        LOG.info(_LI("Doing AXFR for %(name)s from %(host)s") %
+                 {'name': zone_name, 'host': master})
+
+        start_time = time.time()
+        try:
+            xfr = dns.query.xfr(master['ip'], zone_name, relativize=False,
+                                port=master['port'], source=source,
+                                timeout=timeout)
+
+            # NOTE: dnspython only bounds the connect by the lifetime of the
+            #       whole transfer, so wait for the first message ourselves.
+            with eventlet.Timeout(connect_timeout, dns.exception.Timeout()):
+                first = next(xfr)
+
+            latency = time.time() - start_time
+
+            result = consume(itertools.chain([first], xfr))
+        except Exception:
+            exc_info = sys.exc_info()
+            health.record_failure()
+
+            LOG.exception(_LE("There was a problem with the AXFR of "
+                              "%(name)s from %(host)s") %
+                          {'name': zone_name, 'host': master})
+            continue
+
+        health.record_success(latency)
+
+        LOG.debug("AXFR Successful for %s" % zone_name)
 
-    LOG.debug("AXFR Successful for %s" % raw_zone.origin.to_text())
+        return result
 
-    return raw_zone
+    six.reraise(*exc_info)
@@ -56,6 +56,11 @@ class ConfigurationError(Base):
     error_type = 'configuration_error'
 
 
+class LockTimeout(Base):
+    error_code = 503
+    error_type = 'lock_timeout'
+
+
 class UnknownFailure(Base):
     error_code = 500
     error_type = 'unknown_failure'
@@ -258,6 +263,10 @@ class DuplicateZoneTransferAccept(Duplicate):
     error_type = 'duplicate_zone_transfer_accept'
 
 
+class DuplicateZoneImport(Duplicate):
+    error_type = 'duplicate_zone_import'
+
+
 class NotFound(Base):
     expected = True
     error_code = 404
@@ -320,6 +329,10 @@ class ZoneTransferAcceptNotFound(NotFound):
     error_type = 'zone_transfer_accept_not_found'
 
 
+class ZoneImportNotFound(NotFound):
+    error_type = 'zone_import_not_found'
+
+
 class LastServerDeleteNotAllowed(BadRequest):
     error_type = 'last_server_delete_not_allowed'
 
@@ -0,0 +1,26 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo_log import log as logging
+
+from designate.locking.base import LockManager
+
+
+LOG = logging.getLogger(__name__)
+
+
+def get_lock_manager(lock_driver):
+    """Return the lock manager for the provided driver name"""
+    LOG.debug("Loading lock driver: %s" % lock_driver)
+
+    cls = LockManager.get_driver(lock_driver)
+
+    return cls()
@@ -0,0 +1,115 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import abc
+import collections
+import contextlib
+import time
+
+import six
+from oslo.config import cfg
+from oslo_log import log as logging
+
+from designate import exceptions
+from designate.i18n import _LW
+from designate.plugin import DriverPlugin
+
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_opt('lock_timeout', 'designate.central',
+                    group='service:central')
+
+# Seconds between attempts to take a contended lock
+POLL_INTERVAL = 0.05
+
+
+@six.add_metaclass(abc.ABCMeta)
+class LockManager(DriverPlugin):
+    """
+    Base class for lock drivers, which provide named locks that are
+    exclusive across every process using the same driver configuration.
+    """
+    __plugin_ns__ = 'designate.locking'
+    __plugin_type__ = 'locking'
+
+    def __init__(self):
+        super(LockManager, self).__init__()
+
+        # Counters of the acquired, contended and timed out locks, and the
+        # total seconds spent waiting for them, reported by central's ping
+        self.stats = collections.Counter()
+
+    @abc.abstractmethod
+    def try_acquire(self, name):
+        """
+        Attempt to take a lock without waiting.
+
+        :param name: Name of the lock.
+        :return: A token to release the lock with, or None if the lock is
+                 held elsewhere.
+        """
+
+    @abc.abstractmethod
+    def release(self, name, token):
+        """
+        Release a lock taken by try_acquire.
+
+        :param name: Name of the lock.
+        :param token: Token returned when the lock was taken.
+        """
+
+    def acquire(self, name, timeout=None):
+        """
+        Take a lock, waiting up to timeout seconds for it to be released
+        elsewhere.
+
+        :return: A token to release the lock with.
+        :raises: LockTimeout
+        """
+        if timeout is None:
+            timeout = cfg.CONF['service:central'].lock_timeout
+
+        start = time.time()
+        token = self.try_acquire(name)
+
+        if token is None:
+            self.stats['contended'] += 1
+
+            while token is None:
+                if time.time() - start >= timeout:
+                    self.stats['timeouts'] += 1
+                    LOG.warn(_LW('Timed out after %(timeout)ss waiting for '
+                                 'lock %(name)s'),
+                             {'timeout': timeout, 'name': name})
+                    raise exceptions.LockTimeout(
+                        'Timed out waiting for lock %s' % name)
+
+                time.sleep(POLL_INTERVAL)
+                token = self.try_acquire(name)
+
+            wait = time.time() - start
+            self.stats['wait_seconds'] += wait
+            LOG.debug('Acquired contended lock %s after %0.3fs' %
+                      (name, wait))
+
+        self.stats['acquired'] += 1
+
+        return token
+
+    @contextlib.contextmanager
+    def lock(self, name, timeout=None):
+        token = self.acquire(name, timeout)
+
+        try:
+            yield
+        finally:
+            self.release(name, token)
@@ -0,0 +1,113 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import hashlib
+import struct
+
+from oslo.config import cfg
+from oslo_db.sqlalchemy import session
+from oslo_utils import excutils
+from sqlalchemy import text
+
+from designate import exceptions
+from designate.locking import base
+
+
+cfg.CONF.import_group('storage:sqlalchemy',
+                      'designate.storage.impl_sqlalchemy')
+
+cfg.CONF.register_group(cfg.OptGroup(
+    name='locking:database', title="Configuration for the Database Lock "
+                                   "Driver"
+))
+
+cfg.CONF.register_opts([
+    cfg.IntOpt('max-pool-size', default=5,
+               help='Number of idle connections to keep for taking locks. '
+                    'Each held lock uses a connection, beyond which more '
+                    'are opened as needed.'),
+], group='locking:database')
+
+
+class DatabaseLockManager(base.LockManager):
+    """
+    Locks which are exclusive across every process using the same database,
+    taken as advisory locks on the storage database. MySQL and PostgreSQL
+    are supported.
+
+    Each lock holds a connection until it is released, so the lock is
+    dropped by the database should its holder die. The connections come from
+    a pool of their own, as holding locks must never starve storage of
+    connections, nor wait on storage for one.
+    """
+    __plugin_name__ = 'database'
+
+    def __init__(self):
+        super(DatabaseLockManager, self).__init__()
+
+        storage_conf = cfg.CONF['storage:sqlalchemy']
+
+        self.engine = session.create_engine(
+            storage_conf.connection,
+            idle_timeout=storage_conf.idle_timeout,
+            max_pool_size=cfg.CONF['locking:database'].max_pool_size,
+            max_overflow=-1)
+        self.dialect = self.engine.dialect.name
+
+        if self.dialect not in ('mysql', 'postgresql'):
+            raise exceptions.ConfigurationError(
+                'The database lock driver does not support %s' % self.dialect)
+
+    def _get_key(self, name):
+        if self.dialect == 'mysql':
+            return 'designate-%s' % name
+
+        # PostgreSQL locks are identified by a 64 bit integer
+        digest = hashlib.md5(name.encode('utf-8')).digest()
+
+        return struct.unpack('>q', digest[:8])[0]
+
+    def try_acquire(self, name):
+        if self.dialect == 'mysql':
+            query = text('SELECT GET_LOCK(:key, 0)')
+        else:
+            query = text('SELECT pg_try_advisory_lock(:key)')
+
+        connection = self.engine.connect()
+
+        try:
+            locked = connection.execute(
+                query, key=self._get_key(name)).scalar()
+        except Exception:
+            connection.close()
+            raise
+
+        if not locked:
+            connection.close()
+            return None
+
+        return connection
+
+    def release(self, name, token):
+        if self.dialect == 'mysql':
+            query = text('SELECT RELEASE_LOCK(:key)')
+        else:
+            query = text('SELECT pg_advisory_unlock(:key)')
+
+        try:
+            token.execute(query, key=self._get_key(name))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # NOTE: Discard the connection, and the lock with it, rather
+                #       than return it to the pool still holding the lock
+                token.invalidate()
+        finally:
+            token.close()
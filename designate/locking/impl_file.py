@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import errno
+import fcntl
+import os
+
+from oslo.config import cfg
+
+from designate.locking import impl_local
+
+
+cfg.CONF.register_group(cfg.OptGroup(
+    name='locking:file', title="Configuration for the File Lock Driver"
+))
+
+cfg.CONF.register_opts([
+    cfg.StrOpt('lock-path', default='$state_path/locks',
+               help='Directory the lock files are kept in'),
+], group='locking:file')
+
+
+class FileLockManager(impl_local.LocalLockManager):
+    """
+    Locks which are exclusive across the processes of a single host, held
+    on files in a shared directory.
+    """
+    __plugin_name__ = 'file'
+
+    def __init__(self):
+        super(FileLockManager, self).__init__()
+
+        self.lock_path = cfg.CONF['locking:file'].lock_path
+
+        if not os.path.exists(self.lock_path):
+            os.makedirs(self.lock_path)
+
+    def try_acquire(self, name):
+        # NOTE: File locks are held by the process, so the local lock keeps
+        #       out the other greenthreads of this process.
+        semaphore = super(FileLockManager, self).try_acquire(name)
+
+        if semaphore is None:
+            return None
+
+        lock_file = None
+
+        try:
+            lock_file = open(os.path.join(self.lock_path, name), 'a')
+            fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as e:
+            if lock_file is not None:
+                lock_file.close()
+
+            semaphore.release()
+
+            if e.errno in (errno.EACCES, errno.EAGAIN):
+                return None
+
+            raise
+
+        return (semaphore, lock_file)
+
+    def release(self, name, token):
+        semaphore, lock_file = token
+
+        try:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+        finally:
+            semaphore.release()
@@ -0,0 +1,52 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import threading
+import weakref
+
+from designate.locking import base
+
+
+class LocalLockManager(base.LockManager):
+    """
+    Locks which are only exclusive within the current process. Only suitable
+    when a single designate-central process is running.
+    """
+    __plugin_name__ = 'local'
+
+    def __init__(self):
+        super(LocalLockManager, self).__init__()
+
+        # NOTE: A lock's semaphore is kept alive by the token of whoever
+        #       holds it, unused semaphores are dropped.
+        self._semaphores = weakref.WeakValueDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    def _get_semaphore(self, name):
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(name)
+
+            if semaphore is None:
+                semaphore = threading.Semaphore()
+                self._semaphores[name] = semaphore
+
+            return semaphore
+
+    def try_acquire(self, name):
+        semaphore = self._get_semaphore(name)
+
+        if semaphore.acquire(False):
+            return semaphore
+
+        return None
+
+    def release(self, name, token):
+        token.release()
@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import uuid
+
+from oslo.config import cfg
+from oslo_log import log as logging
+
+from designate.i18n import _LW
+from designate.locking import base
+from designate.openstack.common import memorycache
+
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_opt('lock_timeout', 'designate.central',
+                    group='service:central')
+
+cfg.CONF.register_group(cfg.OptGroup(
+    name='locking:memcache', title="Configuration for the Memcache Lock "
+                                   "Driver"
+))
+
+cfg.CONF.register_opts([
+    cfg.ListOpt('memcached-servers', default=None,
+                help='Memcached servers or None for in process cache.'),
+    cfg.IntOpt('expiration', default=3600,
+               help='Seconds after which a lock is dropped, should its '
+                    'holder fail to release it. Must comfortably exceed '
+                    'both the lock timeout and the longest operation holding '
+                    'a lock, such as a zone import.'),
+], group='locking:memcache')
+
+
+class MemcacheLockManager(base.LockManager):
+    """
+    Locks which are exclusive across every process using the same memcached
+    servers. Each lock is a key added with a random token as its value.
+
+    Releasing a lock checks the token then deletes the key, which memcached
+    can not do atomically. Should the lock expire in between, and be taken
+    elsewhere, the new holder's lock is deleted. The expiration must
+    therefore comfortably exceed the time any lock is held for.
+    """
+    __plugin_name__ = 'memcache'
+
+    def __init__(self):
+        super(MemcacheLockManager, self).__init__()
+
+        self.client = memorycache.get_client(
+            cfg.CONF['locking:memcache'].memcached_servers)
+        self.expiration = cfg.CONF['locking:memcache'].expiration
+
+        lock_timeout = cfg.CONF['service:central'].lock_timeout
+        if self.expiration <= lock_timeout:
+            LOG.warning(_LW('The memcache lock expiration of %(expiration)ss '
+                            'does not exceed the lock timeout of '
+                            '%(timeout)ss, locks may be dropped while held'),
+                        {'expiration': self.expiration,
+                         'timeout': lock_timeout})
+
+    def _get_key(self, name):
+        return str('designate-lock-%s' % name)
+
+    def try_acquire(self, name):
+        token = uuid.uuid4().hex
+
+        # Adding a key fails if it already exists
+        if self.client.add(self._get_key(name), token, time=self.expiration):
+            return token
+
+        return None
+
+    def release(self, name, token):
+        key = self._get_key(name)
+
+        # NOTE: Only delete the key while it's still ours, it may have
+        #       expired and been added by another holder since.
+        if self.client.get(key) == token:
+            self.client.delete(key)
@@ -0,0 +1,47 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo.config import cfg
+from oslo_log import log as logging
+
+from designate import storage
+from designate.i18n import _LI
+from designate.manage import base
+
+
+LOG = logging.getLogger(__name__)
+
+cfg.CONF.import_opt('storage_driver', 'designate.central',
+                    group='service:central')
+
+CONF = cfg.CONF
+
+
+class QuotaCommands(base.Commands):
+    """
+    Maintain the usage counters the quotas are enforced against.
+    """
+    @base.args('--domain-id', dest='domain_id', default=None,
+               help='Only reconcile this domain')
+    def reconcile(self, domain_id):
+        """
+        Recount the records of each domain, correcting any record_count
+        which has drifted from the records actually stored.
+        """
+        # NOTE: Storage is loaded here, as the commands are instantiated
+        #       before the config files have been read.
+        storage_api = storage.get_storage(
+            CONF['service:central'].storage_driver)
+
+        count = storage_api.reconcile_record_counts(
+            self.context, domain_id=domain_id)
+
+        LOG.info(_LI("Corrected the record count of %d domain(s)"), count)
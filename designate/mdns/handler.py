@@ -57,10 +57,13 @@ class RequestHandler(object):
             # It is permissible for a server to send an AXFR response when
             # receiving an IXFR request.
             # TODO(Ron): send IXFR response when receiving IXFR request.
-            if q_rrset.rdtype in (dns.rdatatype.AXFR, dns.rdatatype.IXFR):
-                response = self._handle_axfr(context, request)
-            else:
-                response = self._handle_record_query(context, request)
+            # NOTE: mdns only reads, so may be served by a replica
+            with self.storage.replica_reads():
+                if q_rrset.rdtype in (dns.rdatatype.AXFR,
+                                      dns.rdatatype.IXFR):
+                    response = self._handle_axfr(context, request)
+                else:
+                    response = self._handle_record_query(context, request)
         else:
             # Unhandled OpCode's include STATUS, IQUERY, NOTIFY, UPDATE
             response = self._handle_query_error(request, dns.rcode.REFUSED)
@@ -23,7 +23,12 @@ from designate.network_api.base import NetworkAPI
 LOG = logging.getLogger(__name__)
 
 cfg.CONF.register_opts([
-    cfg.StrOpt('network_api', default='neutron', help='Which API to use.')
+    cfg.StrOpt('network_api', default='neutron', help='Which API to use.'),
+    cfg.IntOpt('floatingips_cache_ttl', default=0,
+               help='Seconds the floating IPs of a tenant in a region are '
+                    'cached for. Whatever the TTL, the last floating IPs '
+                    'fetched are used, marked as stale, should fetching them '
+                    'from the region fail.'),
 ])
 
 
@@ -13,11 +13,17 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
+import time
+
+import eventlet
+import eventlet.event
 import eventlet.patcher
 from oslo.config import cfg
 from oslo_log import log as logging
 
 from designate import exceptions
+from designate.i18n import _LW
 from designate.plugin import DriverPlugin
 
 
@@ -26,6 +32,9 @@ LOG = logging.getLogger(__name__)
 #              of eventlet's 0.17.0 monkey patching of dnspython.
 reversename = eventlet.patcher.original('dns.reversename')
 
+# Number of tenant and region floating IP lists kept
+FLOATINGIPS_CACHE_SIZE = 1000
+
 
 class NetworkAPI(DriverPlugin):
     """
@@ -34,6 +43,16 @@ class NetworkAPI(DriverPlugin):
     __plugin_ns__ = 'designate.network_api'
     __plugin_type__ = 'network_api'
 
+    def __init__(self):
+        super(NetworkAPI, self).__init__()
+
+        # The last floating IPs fetched for each tenant and region, with
+        # their expiry time, and the fetches in progress
+        self._floatingips = collections.OrderedDict()
+        self._floatingips_fetches = {}
+
+        self._pool = eventlet.GreenPool()
+
     def _endpoints(self, service_catalog=None, service_type=None,
                    endpoint_type='publicURL', config_section=None,
                    region=None):
@@ -81,7 +100,7 @@ class NetworkAPI(DriverPlugin):
             raise exceptions.NetworkEndpointNotFound
         return urls
 
-    def list_floatingips(self, context, region=None):
+    def list_floatingips(self, context, region=None, use_cache=True):
         """
         List Floating IPs.
 
@@ -92,6 +111,105 @@ class NetworkAPI(DriverPlugin):
             'region': '<region where this belongs>',
             'id': '<id of the FIP>'
         }]
+
+        The floating IPs of a region which couldn't be fetched are the last
+        ones fetched, if any, and are marked with 'stale': True. Fetching
+        only fails when every region does.
+
+        Callers deciding whether the tenant owns a floating IP, before
+        acting on it, pass use_cache=False. The floating IPs are then always
+        fetched, and fetching fails should any region fail.
+        """
+        targets = self._get_floatingip_targets(context, region)
+
+        if not use_cache:
+            data = []
+
+            for fips in self._pool.imap(
+                    lambda target: self._fetch_floatingips(context, target),
+                    targets):
+                data.extend(fips)
+
+            return data
+
+        def _call(target):
+            try:
+                return self._get_floatingips(context, target), None
+            except Exception as e:
+                return None, e
+
+        data = []
+        failed = []
+
+        for fips, exc in self._pool.imap(_call, targets):
+            if exc is not None:
+                failed.append(exc)
+            else:
+                data.extend(fips)
+
+        if failed and len(failed) == len(targets):
+            raise failed[0]
+
+        return data
+
+    def _get_floatingips(self, context, target):
+        key = (context.tenant, context.is_admin, target)
+        cached = self._floatingips.get(key)
+
+        if cached is not None and cached[0] > time.time():
+            return list(cached[1])
+
+        # Concurrent callers share a single fetch
+        fetch = self._floatingips_fetches.get(key)
+        if fetch is not None:
+            return list(fetch.wait())
+
+        fetch = eventlet.event.Event()
+        self._floatingips_fetches[key] = fetch
+
+        try:
+            try:
+                fips = self._fetch_floatingips(context, target)
+            except Exception:
+                if cached is None:
+                    raise
+
+                LOG.warn(_LW('Using the last FloatingIPs fetched from %s'),
+                         target)
+                fips = [dict(fip, stale=True) for fip in cached[1]]
+            else:
+                self._cache_floatingips(key, fips)
+
+            fetch.send(fips)
+        except Exception as e:
+            fetch.send_exception(e)
+            raise
+        finally:
+            del self._floatingips_fetches[key]
+
+        return list(fips)
+
+    def _cache_floatingips(self, key, fips):
+        expires = time.time() + cfg.CONF.floatingips_cache_ttl
+
+        self._floatingips.pop(key, None)
+        self._floatingips[key] = (expires, fips)
+
+        # Drop the least recently fetched lists
+        while len(self._floatingips) > FLOATINGIPS_CACHE_SIZE:
+            self._floatingips.popitem(last=False)
+
+    def _get_floatingip_targets(self, context, region=None):
+        """
+        Return the hashable targets, usually one per region, that floating
+        IPs are fetched from.
+        """
+        raise NotImplementedError
+
+    def _fetch_floatingips(self, context, target):
+        """
+        Fetch the floating IPs of the context's tenant from a target, in the
+        format returned by list_floatingips.
         """
         raise NotImplementedError
 
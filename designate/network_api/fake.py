@@ -71,7 +71,10 @@ def reset_floatingips():
 class FakeNetworkAPI(NetworkAPI):
     __plugin_name__ = 'fake'
 
-    def list_floatingips(self, context, region=None):
+    def _get_floatingip_targets(self, context, region=None):
+        return [region]
+
+    def _fetch_floatingips(self, context, region):
         if context.is_admin:
             data = []
             for tenant_id, allocated in ALLOCATIONS.items():
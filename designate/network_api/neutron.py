@@ -23,7 +23,6 @@ from oslo.config import cfg
 from oslo_log import log as logging
 
 from designate import exceptions
-from designate.openstack.common import threadgroup
 from designate.i18n import _LW
 from designate.i18n import _LE
 from designate.network_api.base import NetworkAPI
@@ -81,7 +80,7 @@ def get_client(context, endpoint):
         params['username'] = CONF['network_api:neutron'].admin_username
         params['tenant_name'] = CONF['network_api:neutron'].admin_tenant_name
         params['password'] = CONF['network_api:neutron'].admin_password
-        params['auth_url'] = CONF['network_api:neutron'].admin_auth_url
+        params['auth_url'] = CONF['network_api:neutron'].auth_url
         params['auth_strategy'] = CONF['network_api:neutron'].auth_strategy
     return clientv20.Client(**params)
 
@@ -92,62 +91,70 @@ class NeutronNetworkAPI(NetworkAPI):
     """
     __plugin_name__ = 'neutron'
 
-    def list_floatingips(self, context, region=None):
-        """
-        Get floating ips based on the current context from Neutron
-        """
-        endpoints = self._endpoints(
+    def __init__(self):
+        super(NeutronNetworkAPI, self).__init__()
+
+        # Clients using the admin credentials, by endpoint
+        self._clients = {}
+
+    def _get_client(self, context, endpoint):
+        # NOTE: Clients authenticating with the request's token are only
+        #       good for the request. Clients using the admin credentials
+        #       are kept, along with the token they authenticated with.
+        if context.auth_token:
+            return get_client(context, endpoint=endpoint)
+
+        if endpoint not in self._clients:
+            self._clients[endpoint] = get_client(context, endpoint=endpoint)
+
+        return self._clients[endpoint]
+
+    def _get_floatingip_targets(self, context, region=None):
+        return self._endpoints(
             service_catalog=context.service_catalog,
             service_type='network',
             endpoint_type=CONF['network_api:neutron'].endpoint_type,
             config_section='network_api:neutron',
             region=region)
 
-        tg = threadgroup.ThreadGroup()
+    def _fetch_floatingips(self, context, target):
+        """
+        Get floating ips based on the current context from Neutron
+        """
+        endpoint, region = target
+
+        client = self._get_client(context, endpoint)
+        LOG.debug("Attempting to fetch FloatingIPs from %s @ %s" %
+                  (endpoint, region))
+        try:
+            fips = client.list_floatingips(tenant_id=context.tenant)
+        except neutron_exceptions.Unauthorized as e:
+            # NOTE: 401 might be that the user doesn't have neutron
+            # activated in a particular region, we'll just log the failure
+            # and go on with our lives.
+            LOG.warn(_LW("Calling Neutron resulted in a 401, "
+                         "please investigate."))
+            LOG.exception(e)
+            return []
+        except Exception as e:
+            LOG.error(_LE('Failed calling Neutron '
+                          '%(region)s - %(endpoint)s') %
+                      {'region': region, 'endpoint': endpoint})
+            LOG.exception(e)
+
+            msg = 'Failed retrieving FloatingIPs from Neutron in %s - %s' % \
+                (endpoint, region)
+            raise exceptions.NeutronCommunicationFailure(msg)
 
-        failed = []
         data = []
+        for fip in fips['floatingips']:
+            data.append({
+                'id': fip['id'],
+                'address': fip['floating_ip_address'],
+                'region': region
+            })
+
+        LOG.debug("Added %i FloatingIPs from %s @ %s" %
+                  (len(data), endpoint, region))
 
-        def _call(endpoint, region, *args, **kw):
-            client = get_client(context, endpoint=endpoint)
-            LOG.debug("Attempting to fetch FloatingIPs from %s @ %s" %
-                      (endpoint, region))
-            try:
-                fips = client.list_floatingips(*args, **kw)
-            except neutron_exceptions.Unauthorized as e:
-                # NOTE: 401 might be that the user doesn't have neutron
-                # activated in a particular region, we'll just log the failure
-                # and go on with our lives.
-                LOG.warn(_LW("Calling Neutron resulted in a 401, "
-                             "please investigate."))
-                LOG.exception(e)
-                return
-            except Exception as e:
-                LOG.error(_LE('Failed calling Neutron '
-                              '%(region)s - %(endpoint)s') %
-                          {'region': region, 'endpoint': endpoint})
-                LOG.exception(e)
-                failed.append((e, endpoint, region))
-                return
-
-            for fip in fips['floatingips']:
-                data.append({
-                    'id': fip['id'],
-                    'address': fip['floating_ip_address'],
-                    'region': region
-                })
-
-            LOG.debug("Added %i FloatingIPs from %s @ %s" %
-                      (len(data), endpoint, region))
-
-        for endpoint, region in endpoints:
-            tg.add_thread(_call, endpoint, region,
-                          tenant_id=context.tenant)
-        tg.wait()
-
-        # NOTE: Sadly tg code doesn't give us a good way to handle failures.
-        if failed:
-            msg = 'Failed retrieving FLoatingIPs from Neutron in %s' % \
-                ", ".join(['%s - %s' % (i[1], i[2]) for i in failed])
-            raise exceptions.NeutronCommunicationFailure(msg)
         return data
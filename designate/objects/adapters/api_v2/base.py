@@ -16,6 +16,7 @@ import urllib
 from oslo_log import log as logging
 from oslo.config import cfg
 
+from designate import utils
 from designate.objects.adapters import base
 from designate.objects import base as obj_base
 
@@ -48,7 +49,8 @@ class APIv2Adapter(base.DesignateAdapter):
             outer['links'] = cls._get_collection_links(
                 list_object, kwargs['request'])
         # Check if we should include metadata
-        if isinstance(list_object, obj_base.PagedListObjectMixin):
+        if isinstance(list_object, obj_base.PagedListObjectMixin) and \
+                list_object.obj_attr_is_set('total_count'):
             metadata = {}
             metadata['total_count'] = list_object.total_count
             outer['metadata'] = metadata
@@ -135,7 +137,8 @@ class APIv2Adapter(base.DesignateAdapter):
     def _get_next_href(cls, request, items):
         # Prepare the extra params
         extra_params = {
-            'marker': items[-1]['id']
+            'marker': utils.get_next_marker(
+                items, request.GET.get('sort_key'))
         }
 
         return cls._get_collection_href(request, extra_params)
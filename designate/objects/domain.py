@@ -32,6 +32,7 @@ class Domain(base.DictObjectMixin, base.SoftDeleteObjectMixin,
         'status': {},
         'action': {},
         'pool_id': {},
+        'record_count': {},
         'recordsets': {
             'relation': True,
             'relation_cls': 'RecordSetList'
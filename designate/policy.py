@@ -13,6 +13,9 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
+import itertools
+
 from oslo.config import cfg
 from oslo_log import log as logging
 from oslo_policy import policy
@@ -34,12 +37,39 @@ LOG = logging.getLogger(__name__)
 
 _ENFORCER = None
 
+# The number of decisions kept across requests, and the rate at which
+# successful checks are logged
+DECISIONS_CACHE_SIZE = 1000
+SUCCESS_LOG_SAMPLE = 100
+
+# Decisions keyed by rule, credentials and target. The generation is bumped
+# whenever the rules change, invalidating the per request memos.
+_DECISIONS = collections.OrderedDict()
+_DECISIONS_RULES = None
+_DECISIONS_GENERATION = 0
+
+_SUCCESSES = itertools.count()
+
+# The context attributes a rule may check. The remainder, such as the
+# request ID and auth token, are unique to each request.
+CREDS_ATTRS = ('user', 'tenant', 'domain', 'user_domain', 'project_domain',
+               'is_admin', 'read_only', 'show_deleted', 'all_tenants',
+               'abandon')
+
+
+def _clear_decisions(rules=None):
+    global _DECISIONS_RULES, _DECISIONS_GENERATION
+    _DECISIONS.clear()
+    _DECISIONS_RULES = rules
+    _DECISIONS_GENERATION += 1
+
 
 def reset():
     global _ENFORCER
     if _ENFORCER:
         _ENFORCER.clear()
     _ENFORCER = None
+    _clear_decisions()
 
 
 def set_rules(data, default_rule=None, overwrite=True):
@@ -60,6 +90,7 @@ def set_rules(data, default_rule=None, overwrite=True):
         rules = policy.Rules.load_json(data, default_rule)
 
     _ENFORCER.set_rules(rules, overwrite=overwrite)
+    _clear_decisions()
 
 
 def init(default_rule=None):
@@ -81,26 +112,104 @@ def init(default_rule=None):
         _ENFORCER = policy.Enforcer(CONF)
 
     _ENFORCER.set_rules(rules)
+    _clear_decisions()
+
+
+def _get_decision_key(rule, ctxt, target):
+    creds = tuple(getattr(ctxt, attr, None) for attr in CREDS_ATTRS)
+    key = (rule, tuple(sorted(ctxt.roles or [])), creds,
+           tuple(sorted(target.items())))
+
+    try:
+        hash(key)
+    except TypeError:
+        # NOTE: Targets holding lists or dicts are evaluated every time
+        return None
+
+    return key
+
+
+def _validate_decisions():
+    # NOTE: The enforcer reloads the policy file when it changes, replacing
+    #       its rules. Decisions made against the old rules are dropped.
+    _ENFORCER.load_rules()
+
+    if _ENFORCER.rules is not _DECISIONS_RULES:
+        _clear_decisions(_ENFORCER.rules)
+
+
+def _get_memo(ctxt):
+    # NOTE: The per request memo lives on the context, and is not carried
+    #       over by to_dict(), deepcopy() or elevated(). It is tied to the
+    #       rules it was built with, as contexts may outlive a reload.
+    generation, memo = getattr(ctxt, '_policy_decisions', (None, None))
+
+    if (generation != _DECISIONS_GENERATION or
+            len(memo) >= DECISIONS_CACHE_SIZE):
+        memo = {}
+        ctxt._policy_decisions = (_DECISIONS_GENERATION, memo)
+
+    return memo
+
+
+def _get_decision(key, memo):
+    if key in memo:
+        return memo[key]
+
+    try:
+        result = _DECISIONS.pop(key)
+    except KeyError:
+        return None
+
+    # Move the decision to the most recently used end
+    _DECISIONS[key] = memo[key] = result
+
+    return result
+
+
+def _store_decision(key, memo, result):
+    _DECISIONS[key] = memo[key] = result
+
+    while len(_DECISIONS) > DECISIONS_CACHE_SIZE:
+        _DECISIONS.popitem(last=False)
+
+
+def _log_decision(rule, target, result):
+    extra = {'policy': {'rule': rule, 'target': target}}
+
+    if not result:
+        LOG.info(_("Policy check failed for rule '%(rule)s' "
+                   "on target %(target)s") %
+                 {'rule': rule, 'target': repr(target)}, extra=extra)
+
+    elif next(_SUCCESSES) % SUCCESS_LOG_SAMPLE == 0:
+        LOG.debug("Policy check succeeded for rule '%(rule)s' "
+                  "on target %(target)r", {'rule': rule, 'target': target},
+                  extra=extra)
 
 
 def check(rule, ctxt, target=None, do_raise=True, exc=exceptions.Forbidden):
-    creds = ctxt.to_dict()
     target = target or {}
-    try:
-        result = _ENFORCER.enforce(rule, target, creds, do_raise, exc)
-    except Exception:
-        result = False
-        raise
-    else:
-        return result
-    finally:
-        extra = {'policy': {'rule': rule, 'target': target}}
-
-        if result:
-            LOG.info(_("Policy check succeeded for rule '%(rule)s' "
-                       "on target %(target)s") %
-                     {'rule': rule, 'target': repr(target)}, extra=extra)
-        else:
-            LOG.info(_("Policy check failed for rule '%(rule)s' "
-                       "on target %(target)s") %
-                     {'rule': rule, 'target': repr(target)}, extra=extra)
+
+    _validate_decisions()
+
+    key = _get_decision_key(rule, ctxt, target)
+    result = None
+
+    if key is not None:
+        memo = _get_memo(ctxt)
+        result = _get_decision(key, memo)
+
+    if result is None:
+        creds = ctxt.to_dict()
+        result = _ENFORCER.enforce(rule, target, creds, False)
+
+        if key is not None:
+            _store_decision(key, memo, result)
+
+    _log_decision(rule, target, result)
+
+    if do_raise and not result:
+        raise exc()
+
+    return result
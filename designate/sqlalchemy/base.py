@@ -14,23 +14,32 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import abc
+import contextlib
+import functools
 import threading
 
 import six
 from oslo_db.sqlalchemy import utils as oslodb_utils
 from oslo_db import exception as oslo_db_exception
 from oslo_log import log as logging
+from oslo_utils import excutils
 from oslo_utils import timeutils
 from sqlalchemy import exc as sqlalchemy_exc
-from sqlalchemy import select, or_
+from sqlalchemy import bindparam, select, or_
+from sqlalchemy import types
 
 from designate import exceptions
+from designate.i18n import _LW
+from designate import utils as designate_utils
 from designate.sqlalchemy import session
 from designate.sqlalchemy import utils
 
 
 LOG = logging.getLogger(__name__)
 
+# The maximum number of IDs in a single IN clause
+BULK_CHUNK_SIZE = 500
+
 
 def _set_object_from_model(obj, model, **extra):
     """Update a DesignateObject with the values from a SQLA Model"""
@@ -62,6 +71,58 @@ def _set_listobject_from_models(obj, models, map_=None):
         return obj
 
 
+def reader(f):
+    """Route a read only method's queries to the replica, when it is safe to
+
+    The replica is only used within replica_reads(). Calls nested within
+    another reader or writer use the outer call's route.
+    """
+    @functools.wraps(f)
+    def wrapper(self, context, *args, **kwargs):
+        if getattr(self.local_store, 'route', None) is not None:
+            return f(self, context, *args, **kwargs)
+
+        use_replica = getattr(self.local_store, 'replica_reads', False) and \
+            self._use_replica(context)
+        self.local_store.route = 'replica' if use_replica else 'primary'
+
+        try:
+            return f(self, context, *args, **kwargs)
+        except oslo_db_exception.DBConnectionError:
+            if not use_replica:
+                raise
+
+            LOG.warning(_LW('Unable to connect to the replica database, '
+                            'falling back to the primary'))
+            self._replica_failed()
+
+            self.local_store.route = 'primary'
+            return f(self, context, *args, **kwargs)
+        finally:
+            self.local_store.route = None
+
+    # NOTE: Expose the wrapped method, as functools.wraps does on Python 3
+    wrapper.__wrapped__ = f
+    return wrapper
+
+
+def writer(f):
+    """Route a method's queries to the primary, and record the write"""
+    @functools.wraps(f)
+    def wrapper(self, context, *args, **kwargs):
+        route = getattr(self.local_store, 'route', None)
+        self.local_store.route = 'primary'
+
+        try:
+            return f(self, context, *args, **kwargs)
+        finally:
+            self.local_store.route = route
+            self._record_write(context)
+
+    wrapper.__wrapped__ = f
+    return wrapper
+
+
 @six.add_metaclass(abc.ABCMeta)
 class SQLAlchemy(object):
 
@@ -69,6 +130,12 @@ class SQLAlchemy(object):
         super(SQLAlchemy, self).__init__()
 
         self.engine = session.get_engine(self.get_name())
+        self.replica_engine = session.get_engine(self.get_name(),
+                                                 use_slave=True)
+
+        if self.replica_engine is self.engine:
+            # No slave_connection is configured
+            self.replica_engine = None
 
         self.local_store = threading.local()
 
@@ -83,11 +150,38 @@ class SQLAlchemy(object):
         #       greenthread may end up using a single global session, which
         #       leads to bad things happening.
 
+        if getattr(self.local_store, 'route', None) == 'replica':
+            if not hasattr(self.local_store, 'replica_session'):
+                self.local_store.replica_session = session.get_session(
+                    self.get_name(), use_slave=True)
+
+            return self.local_store.replica_session
+
         if not hasattr(self.local_store, 'session'):
             self.local_store.session = session.get_session(self.get_name())
 
         return self.local_store.session
 
+    @contextlib.contextmanager
+    def replica_reads(self):
+        allowed = getattr(self.local_store, 'replica_reads', False)
+        self.local_store.replica_reads = True
+
+        try:
+            yield
+        finally:
+            self.local_store.replica_reads = allowed
+
+    def _use_replica(self, context):
+        """Whether a reader called with this context may use the replica"""
+        return False
+
+    def _record_write(self, context):
+        """Called once a writer called with this context has run"""
+
+    def _replica_failed(self):
+        """Called when a reader was unable to connect to the replica"""
+
     def begin(self):
         self.session.begin(subtransactions=True)
 
@@ -102,8 +196,12 @@ class SQLAlchemy(object):
             for name, value in criterion.items():
                 column = getattr(table.c, name)
 
+                # List of values
+                if isinstance(value, (list, tuple)):
+                    query = query.where(column.in_(value))
+
                 # Wildcard value: '*'
-                if isinstance(value, basestring) and '*' in value:
+                elif isinstance(value, basestring) and '*' in value:
                     queryval = value.replace('*', '%')
                     query = query.where(column.like(queryval))
                 elif isinstance(value, basestring) and value.startswith('!'):
@@ -189,6 +287,88 @@ class SQLAlchemy(object):
 
         return _set_object_from_model(obj, resultproxy.fetchone())
 
+    def _group_rows(self, rows):
+        """
+        Group rows by the set of columns they carry, as every row of an
+        executemany must carry the same columns.
+        """
+        groups = {}
+
+        for row in rows:
+            groups.setdefault(frozenset(row.keys()), []).append(row)
+
+        return groups.values()
+
+    def _refetch_bulk(self, table, objs):
+        """Refetch the rows of a list of objects, for generated columns etc"""
+        objs_by_id = dict((obj.id, obj) for obj in objs)
+        ids = objs_by_id.keys()
+
+        for i in range(0, len(ids), BULK_CHUNK_SIZE):
+            query = select([table]).where(
+                table.c.id.in_(ids[i:i + BULK_CHUNK_SIZE]))
+
+            for model in self.session.execute(query).fetchall():
+                _set_object_from_model(objs_by_id[model.id], model)
+
+        return objs
+
+    def _create_bulk(self, table, objs, exc_dup, skip_values=None,
+                     extra_values=None):
+        """
+        Create a list of objects with one executemany per set of columns,
+        inside a single transaction.
+        """
+        rows = []
+
+        for obj in objs:
+            # Ensure the Object is valid
+            obj.validate()
+
+            # Generate the ID up front, so we can refetch the rows by ID
+            if obj.id is None:
+                obj.id = designate_utils.generate_uuid()
+
+            values = obj.obj_get_changes()
+
+            if skip_values is not None:
+                for skip_value in skip_values:
+                    values.pop(skip_value, None)
+
+            if extra_values is not None:
+                for key in extra_values:
+                    values[key] = extra_values[key]
+
+            rows.append(dict(values))
+
+        self.begin()
+        try:
+            for group in self._group_rows(rows):
+                self.session.execute(table.insert(), group)
+
+            self._refetch_bulk(table, objs)
+
+            self.commit()
+        except oslo_db_exception.DBDuplicateEntry:
+            self.rollback()
+            raise exc_dup()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.rollback()
+
+        return objs
+
+    def _exists(self, context, table, criterion):
+        # Select a single ID, rather than loading and counting the matches
+        query = select([table.c.id]).limit(1)
+        query = self._apply_criterion(table, query, criterion)
+        query = self._apply_tenant_criteria(context, table, query)
+        query = self._apply_deleted_criteria(context, table, query)
+
+        resultproxy = self.session.execute(query)
+
+        return resultproxy.fetchone() is not None
+
     def _find(self, context, table, cls, list_cls, exc_notfound, criterion,
               one=False, marker=None, limit=None, sort_key=None,
               sort_dir=None, query=None, apply_tenant_criteria=True):
@@ -217,9 +397,15 @@ class SQLAlchemy(object):
             else:
                 return _set_object_from_model(cls(), results[0])
         else:
-            if marker is not None:
-                # If marker is not none and basestring we query it.
-                # Otherwise, return all matching records
+            sort_keys = [sort_key, 'id', 'created_at']
+
+            if marker is not None and not designate_utils.is_uuid_like(marker):
+                # A paging cursor, carrying the sort key values of the last
+                # item of the previous page
+                marker = self._decode_marker(table, marker, sort_keys)
+
+            elif marker is not None:
+                # A plain ID. Look up the marker row for it's sort key values
                 marker_query = select([table]).where(table.c.id == marker)
 
                 try:
@@ -239,8 +425,7 @@ class SQLAlchemy(object):
 
             try:
                 query = utils.paginate_query(
-                    query, table, limit,
-                    [sort_key, 'id', 'created_at'], marker=marker,
+                    query, table, limit, sort_keys, marker=marker,
                     sort_dir=sort_dir)
 
                 resultproxy = self.session.execute(query)
@@ -256,6 +441,31 @@ class SQLAlchemy(object):
             except ValueError as value_error:
                 raise exceptions.ValueError(value_error.message)
 
+    def _decode_marker(self, table, marker, sort_keys):
+        values = designate_utils.decode_marker(marker)
+        result = {}
+
+        for key in sort_keys:
+            if key not in values:
+                # The cursor was created for another sort order
+                raise exceptions.InvalidMarker(
+                    'Marker %s is not valid for this sort key' % marker)
+
+            value = values[key]
+            column = getattr(table.c, key, None)
+
+            if value is not None and column is not None and \
+                    isinstance(column.type, types.DateTime):
+                try:
+                    value = timeutils.parse_strtime(value)
+                except (TypeError, ValueError):
+                    raise exceptions.InvalidMarker(
+                        'Marker %s is invalid' % marker)
+
+            result[key] = value
+
+        return result
+
     def _update(self, context, table, obj, exc_dup, exc_notfound,
                 skip_values=None):
         # Ensure the Object is valid
@@ -267,6 +477,8 @@ class SQLAlchemy(object):
             for skip_value in skip_values:
                 values.pop(skip_value, None)
 
+        self._apply_updated_at(table, values)
+
         query = table.update()\
                      .where(table.c.id == obj.id)\
                      .values(**values)
@@ -275,6 +487,10 @@ class SQLAlchemy(object):
         query = self._apply_deleted_criteria(context, table, query)
         query = self._apply_version_increment(context, table, query)
 
+        returning = self._use_returning(table)
+        if returning:
+            query = query.returning(table.c.version)
+
         try:
             resultproxy = self.session.execute(query)
         except oslo_db_exception.DBDuplicateEntry:
@@ -283,11 +499,155 @@ class SQLAlchemy(object):
         if resultproxy.rowcount != 1:
             raise exc_notfound()
 
-        # Refetch the row, for generated columns etc
-        query = select([table]).where(table.c.id == obj.id)
-        resultproxy = self.session.execute(query)
+        if returning:
+            obj.version = resultproxy.fetchone()[0]
+        elif hasattr(table.c, 'version') and obj.version is None:
+            # We don't know what the version was incremented from
+            query = select([table.c.version]).where(table.c.id == obj.id)
+            obj.version = self.session.execute(query).scalar()
+        elif hasattr(table.c, 'version'):
+            # NOTE: This assumes the object was loaded with the row's current
+            #       version. If the row was updated by someone else since, the
+            #       object's version will lag behind the row's.
+            obj.version += 1
+
+        return self._set_updated_values(obj, values)
+
+    def _use_returning(self, table):
+        """
+        Whether to fetch the incremented version with UPDATE .. RETURNING,
+        rather than computing it locally.
+        """
+        return hasattr(table.c, 'version') and \
+            self.engine.dialect.implicit_returning
 
-        return _set_object_from_model(obj, resultproxy.fetchone())
+    def _apply_updated_at(self, table, values):
+        """
+        Set updated_at in the UPDATE values, rather than leaving it to the
+        column's onupdate, so the object can be updated without refetching
+        the row.
+        """
+        if hasattr(table.c, 'updated_at') and 'updated_at' not in values:
+            values['updated_at'] = timeutils.utcnow()
+
+        return values
+
+    def _set_updated_values(self, obj, values):
+        if 'updated_at' in values and 'updated_at' in obj.FIELDS:
+            obj.updated_at = values['updated_at']
+
+        obj.obj_reset_changes()
+
+        return obj
+
+    def _update_bulk(self, context, table, objs, exc_dup, exc_notfound,
+                     skip_values=None):
+        """
+        Update a list of objects with one executemany per set of changed
+        columns, inside a single transaction.
+        """
+        rows = []
+        updated_values = []
+
+        unknown = []
+        if hasattr(table.c, 'version'):
+            unknown = [obj for obj in objs if obj.version is None]
+
+        for obj in objs:
+            # Ensure the Object is valid
+            obj.validate()
+
+            values = obj.obj_get_changes()
+
+            if skip_values is not None:
+                for skip_value in skip_values:
+                    values.pop(skip_value, None)
+
+            self._apply_updated_at(table, values)
+            updated_values.append(values)
+
+            # Prefix the bind names, as column names are reserved for the
+            # SET clause
+            row = dict(('_%s' % key, value) for key, value in values.items())
+            row['_match_id'] = obj.id
+
+            rows.append(row)
+
+        self.begin()
+        try:
+            for group in self._group_rows(rows):
+                keys = [key[1:] for key in group[0].keys()
+                        if key != '_match_id']
+
+                query = table.update()\
+                             .where(table.c.id == bindparam('_match_id'))\
+                             .values(dict((key, bindparam('_%s' % key))
+                                          for key in keys))
+
+                query = self._apply_tenant_criteria(context, table, query)
+                query = self._apply_deleted_criteria(context, table, query)
+                query = self._apply_version_increment(context, table, query)
+
+                resultproxy = self.session.execute(query, group)
+
+                if resultproxy.rowcount != len(group):
+                    raise exc_notfound()
+
+            # Only refetch the objects we can't compute the version of
+            self._refetch_bulk(table, unknown)
+
+            self.commit()
+        except oslo_db_exception.DBDuplicateEntry:
+            self.rollback()
+            raise exc_dup()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.rollback()
+
+        unknown_ids = set(obj.id for obj in unknown)
+
+        for obj, values in zip(objs, updated_values):
+            if hasattr(table.c, 'version') and obj.id not in unknown_ids:
+                obj.version += 1
+
+            self._set_updated_values(obj, values)
+
+        return objs
+
+    def _delete_bulk(self, context, table, objs, exc_notfound):
+        """Delete a list of objects inside a single transaction"""
+        if hasattr(table.c, 'deleted'):
+            # Perform a Soft Delete, see _delete
+            for obj in objs:
+                obj.deleted = obj.id.replace('-', '')
+                obj.deleted_at = timeutils.utcnow()
+                obj.action = 'NONE'
+                obj.status = 'DELETED'
+
+            return self._update_bulk(context, table, objs, None, exc_notfound)
+
+        ids = [obj.id for obj in objs]
+
+        self.begin()
+        try:
+            for i in range(0, len(ids), BULK_CHUNK_SIZE):
+                chunk = ids[i:i + BULK_CHUNK_SIZE]
+
+                query = table.delete().where(table.c.id.in_(chunk))
+                query = self._apply_tenant_criteria(context, table, query)
+                query = self._apply_deleted_criteria(context, table, query)
+
+                resultproxy = self.session.execute(query)
+
+                if resultproxy.rowcount != len(chunk):
+                    raise exc_notfound()
+
+            self.commit()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.rollback()
+
+        return objs
 
     def _delete(self, context, table, obj, exc_notfound):
         if hasattr(table.c, 'deleted'):
@@ -317,8 +677,6 @@ class SQLAlchemy(object):
         if resultproxy.rowcount != 1:
             raise exc_notfound()
 
-        # Refetch the row, for generated columns etc
-        query = select([table]).where(table.c.id == obj.id)
-        resultproxy = self.session.execute(query)
+        obj.obj_reset_changes()
 
-        return _set_object_from_model(obj, resultproxy.fetchone())
+        return obj
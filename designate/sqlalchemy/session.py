@@ -38,9 +38,9 @@ def _create_facade_lazily(name):
     return _FACADES[name]
 
 
-def get_engine(name):
+def get_engine(name, use_slave=False):
     facade = _create_facade_lazily(name)
-    return facade.get_engine()
+    return facade.get_engine(use_slave=use_slave)
 
 
 def get_session(name, **kwargs):
@@ -14,6 +14,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import abc
+import contextlib
 
 import six
 
@@ -131,6 +132,15 @@ class Storage(DriverPlugin):
         :param criterion: Criteria to filter by.
         """
 
+    @abc.abstractmethod
+    def get_tlds_version(self, context):
+        """
+        Get a value which changes whenever a TLD is created, updated or
+        deleted.
+
+        :param context: RPC Context.
+        """
+
     @abc.abstractmethod
     def update_tld(self, context, tld):
         """
@@ -246,18 +256,20 @@ class Storage(DriverPlugin):
 
     @abc.abstractmethod
     def find_domains(self, context, criterion=None, marker=None,
-                     limit=None, sort_key=None, sort_dir=None):
+                     limit=None, sort_key=None, sort_dir=None,
+                     total_count=False):
         """
         Find Domains
 
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
-        :param marker: Resource ID from which after the requested page will
-                       start after
+        :param marker: Resource ID, or paging cursor, from which after the
+                       requested page will start after
         :param limit: Integer limit of objects of the page size after the
                       marker
         :param sort_key: Key from which to sort after.
         :param sort_dir: Direction to sort after using sort_key.
+        :param total_count: Whether to count all matching Domains.
         """
 
     @abc.abstractmethod
@@ -287,6 +299,16 @@ class Storage(DriverPlugin):
         :param domain_id: Domain ID to delete.
         """
 
+    @abc.abstractmethod
+    def find_domain_name_changes(self, context, since=None):
+        """
+        Find the ID, name and deleted status of Domains, across all tenants.
+
+        :param context: RPC Context.
+        :param since: Find the Domains created or deleted at or after this
+                      time, rather than all undeleted Domains.
+        """
+
     @abc.abstractmethod
     def count_domains(self, context, criterion=None):
         """
@@ -317,18 +339,20 @@ class Storage(DriverPlugin):
 
     @abc.abstractmethod
     def find_recordsets(self, context, criterion=None,
-                        marker=None, limit=None, sort_key=None, sort_dir=None):
+                        marker=None, limit=None, sort_key=None, sort_dir=None,
+                        total_count=False):
         """
         Find RecordSets.
 
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
-        :param marker: Resource ID from which after the requested page will
-                       start after
+        :param marker: Resource ID, or paging cursor, from which after the
+                       requested page will start after
         :param limit: Integer limit of objects of the page size after the
                       marker
         :param sort_key: Key from which to sort after.
         :param sort_dir: Direction to sort after using sort_key.
+        :param total_count: Whether to count all matching RecordSets.
         """
 
     @abc.abstractmethod
@@ -358,6 +382,16 @@ class Storage(DriverPlugin):
         :param recordset_id: RecordSet ID to delete
         """
 
+    @abc.abstractmethod
+    def recordset_exists(self, context, criterion):
+        """
+        Check whether any recordset matches the criterion, without loading
+        the matches.
+
+        :param context: RPC Context.
+        :param criterion: Criteria to filter by.
+        """
+
     @abc.abstractmethod
     def count_recordsets(self, context, criterion=None):
         """
@@ -403,6 +437,33 @@ class Storage(DriverPlugin):
         :param sort_dir: Direction to sort after using sort_key.
         """
 
+    @abc.abstractmethod
+    def find_floatingip_records(self, context, addresses):
+        """
+        Find the floating IP PTR records of the given addresses, in undeleted
+        Domains, along with the TTL they are served with.
+
+        :param context: RPC Context.
+        :param addresses: Floating IP addresses to find the records of.
+        :return: RecordSetList, each RecordSet holding its matching records
+                 and with its TTL falling back to the Domain's.
+        """
+
+    @abc.abstractmethod
+    def find_export_records(self, context, domain_id, marker=None,
+                            limit=None):
+        """
+        Find a page of a Domain's records along with the name, type and TTL
+        of their RecordSets, ordered by name, for exporting the Domain.
+
+        :param context: RPC Context.
+        :param domain_id: Domain ID to export.
+        :param marker: Record ID after which the requested page will start.
+        :param limit: Maximum number of records in the page.
+        :return: RecordSetList, each RecordSet holding its records from
+                 the page.
+        """
+
     @abc.abstractmethod
     def find_record(self, context, criterion):
         """
@@ -430,6 +491,69 @@ class Storage(DriverPlugin):
         :param record_id: Record ID to delete
         """
 
+    @abc.abstractmethod
+    def create_records_bulk(self, context, domain_id, recordset_id, records):
+        """
+        Create a list of records in a given RecordSet, in a single
+        transaction.
+
+        :param context: RPC Context.
+        :param domain_id: Domain ID to create the records in.
+        :param recordset_id: RecordSet ID to create the records in.
+        :param records: Record objects with the values to be created.
+        """
+
+    @abc.abstractmethod
+    def update_records_bulk(self, context, records):
+        """
+        Update a list of records, in a single transaction.
+
+        :param context: RPC Context.
+        :param records: Records to update
+        """
+
+    @abc.abstractmethod
+    def delete_records_bulk(self, context, record_ids):
+        """
+        Delete a list of records, in a single transaction.
+
+        :param context: RPC Context.
+        :param record_ids: Record IDs to delete
+        """
+
+    @abc.abstractmethod
+    def update_records_status(self, context, domain_id, values, statuses,
+                              actions=None, serial=None):
+        """
+        Update the records of a domain matching a status transition, in a
+        single statement.
+
+        :param context: RPC Context.
+        :param domain_id: Domain ID the records belong to.
+        :param values: Values to set on the matching records.
+        :param statuses: Statuses the records must be in.
+        :param actions: Actions the records must have, if given.
+        :param serial: Only update records with a serial less than or equal
+                       to this, if given.
+        :return: The number of records updated.
+        """
+
+    @abc.abstractmethod
+    def purge_records(self, context, domain_id, statuses, actions=None,
+                      serial=None):
+        """
+        Delete the records of a domain matching a status transition, along
+        with any recordsets they leave empty.
+
+        :param context: RPC Context.
+        :param domain_id: Domain ID the records belong to.
+        :param statuses: Statuses the records must be in.
+        :param actions: Actions the records must have, if given.
+        :param serial: Only delete records with a serial less than or equal
+                       to this, if given.
+        :return: The number of records deleted.
+        """
+
     @abc.abstractmethod
     def count_records(self, context, criterion=None):
         """
@@ -439,6 +563,17 @@ class Storage(DriverPlugin):
         :param criterion: Criteria to filter by.
         """
 
+    @abc.abstractmethod
+    def reconcile_record_counts(self, context, domain_id=None):
+        """
+        Recount the records of undeleted Domains, correcting any record_count
+        which has drifted.
+
+        :param context: RPC Context.
+        :param domain_id: Only reconcile this Domain, if given.
+        :return: The number of Domains corrected.
+        """
+
     @abc.abstractmethod
     def create_blacklist(self, context, blacklist):
         """
@@ -482,6 +617,15 @@ class Storage(DriverPlugin):
         :param criterion: Criteria to filter by.
         """
 
+    @abc.abstractmethod
+    def get_blacklists_version(self, context):
+        """
+        Get a value which changes whenever a Blacklist is created, updated
+        or deleted.
+
+        :param context: RPC Context.
+        """
+
     @abc.abstractmethod
     def update_blacklist(self, context, blacklist):
         """
@@ -621,8 +765,69 @@ class Storage(DriverPlugin):
         :param pool_attribute_id: The ID of the PoolAttribute to be deleted
         """
 
+    @abc.abstractmethod
+    def create_zone_import(self, context, zone_import):
+        """
+        Create a ZoneImport.
+
+        :param context: RPC Context.
+        :param zone_import: ZoneImport object with the values to be created.
+        """
+
+    @abc.abstractmethod
+    def find_zone_imports(self, context, criterion=None, marker=None,
+                          limit=None, sort_key=None, sort_dir=None):
+        """
+        Find ZoneImports
+
+        :param context: RPC Context.
+        :param criterion: Criteria to filter by.
+        :param marker: Resource ID from which after the requested page will
+                       start after
+        :param limit: Integer limit of objects of the page size after the
+                      marker
+        :param sort_key: Key from which to sort after.
+        :param sort_dir: Direction to sort after using sort_key.
+        """
+
+    @abc.abstractmethod
+    def get_zone_import(self, context, zone_import_id):
+        """
+        Get a ZoneImport via ID.
+
+        :param context: RPC Context.
+        :param zone_import_id: ZoneImport ID to get.
+        """
+
+    @abc.abstractmethod
+    def update_zone_import(self, context, zone_import):
+        """
+        Update a ZoneImport
+
+        :param context: RPC Context.
+        :param zone_import: ZoneImport to update.
+        """
+
+    @abc.abstractmethod
+    def delete_zone_import(self, context, zone_import_id):
+        """
+        Delete a ZoneImport via ID.
+
+        :param context: RPC Context.
+        :param zone_import_id: Delete a ZoneImport via ID
+        """
+
     def ping(self, context):
         """Ping the Storage connection"""
         return {
             'status': None
         }
+
+    @contextlib.contextmanager
+    def replica_reads(self):
+        """
+        Allow the reads made within to be served by a read replica, where
+        the driver has one. Only read paths which tolerate replication lag
+        may use this, never a read-modify-write path.
+        """
+        yield
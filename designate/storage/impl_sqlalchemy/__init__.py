@@ -13,17 +13,21 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
 import time
 import hashlib
 
 from oslo.config import cfg
 from oslo_log import log as logging
+from oslo_db import exception as oslo_db_exception
 from oslo_db import options
+from oslo_utils import excutils
 from sqlalchemy import select, distinct, func
-from sqlalchemy.sql.expression import or_
+from sqlalchemy.sql.expression import and_, or_, case
 
 from designate import exceptions
 from designate import objects
+from designate.i18n import _LW
 from designate.sqlalchemy import base as sqlalchemy_base
 from designate.storage import base as storage_base
 from designate.storage.impl_sqlalchemy import tables
@@ -37,6 +41,20 @@ cfg.CONF.register_group(cfg.OptGroup(
 
 cfg.CONF.register_opts(options.database_opts, group='storage:sqlalchemy')
 
+cfg.CONF.register_opts([
+    cfg.IntOpt('replica_max_lag', default=5,
+               help='Maximum replication lag, in seconds, at which reads are '
+                    'still sent to the slave_connection'),
+    cfg.IntOpt('replica_lag_check_interval', default=10,
+               help='Seconds between checks of the replication lag'),
+    cfg.IntOpt('replica_write_window', default=10,
+               help='Seconds after a write during which reads for the same '
+                    'tenant are sent to the primary'),
+], group='storage:sqlalchemy')
+
+reader = sqlalchemy_base.reader
+writer = sqlalchemy_base.writer
+
 
 class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     """SQLAlchemy connection"""
@@ -45,9 +63,101 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     def __init__(self):
         super(SQLAlchemyStorage, self).__init__()
 
+        # Tenants with recent writes, oldest first
+        self._writes = collections.OrderedDict()
+
+        self._replica_lag = None
+        self._replica_checked_at = 0
+
     def get_name(self):
         return self.name
 
+    # Read replica routing
+    def _use_replica(self, context):
+        if self.replica_engine is None:
+            return False
+
+        # Read our own writes while in a transaction, or shortly after
+        # writing outside of one
+        if self.session.transaction is not None:
+            return False
+
+        written_at = self._writes.get(getattr(context, 'tenant', None))
+        window = cfg.CONF[self.name].replica_write_window
+
+        if written_at is not None and time.time() - written_at < window:
+            return False
+
+        return self._is_replica_current()
+
+    def _record_write(self, context):
+        if self.replica_engine is None:
+            return
+
+        now = time.time()
+        window = cfg.CONF[self.name].replica_write_window
+
+        tenant = getattr(context, 'tenant', None)
+        self._writes.pop(tenant, None)
+        self._writes[tenant] = now
+
+        # Forget the writes which have left the window
+        while self._writes and \
+                now - next(self._writes.itervalues()) >= window:
+            self._writes.popitem(last=False)
+
+    def _replica_failed(self):
+        # Stay on the primary until the next lag check
+        self._replica_lag = None
+        self._replica_checked_at = time.time()
+
+    def _is_replica_current(self):
+        now = time.time()
+        max_lag = cfg.CONF[self.name].replica_max_lag
+
+        if now - self._replica_checked_at >= \
+                cfg.CONF[self.name].replica_lag_check_interval:
+            self._replica_checked_at = now
+
+            try:
+                self._replica_lag = self._get_replica_lag()
+            except oslo_db_exception.DBError:
+                LOG.exception(_LW('Unable to determine the replication lag'))
+                self._replica_lag = None
+
+            if self._replica_lag is None or self._replica_lag > max_lag:
+                LOG.warning(_LW('Replication lag of %(lag)s seconds exceeds '
+                                '%(max_lag)s, reading from the primary'),
+                            {'lag': self._replica_lag, 'max_lag': max_lag})
+
+        return self._replica_lag is not None and self._replica_lag <= max_lag
+
+    def _get_replica_lag(self):
+        dialect = self.replica_engine.dialect.name
+
+        if dialect == 'mysql':
+            status = self.replica_engine.execute('SHOW SLAVE STATUS').first()
+
+            if status is None:
+                # Not a slave, so it can not lag
+                return 0
+
+            # NOTE: This is NULL while replication is stopped
+            return status['Seconds_Behind_Master']
+
+        elif dialect.startswith('postgres'):
+            # NOTE: An idle primary leaves the last replayed transaction
+            #       behind, so only measure while WAL remains to be replayed
+            return self.replica_engine.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() OR '
+                'pg_last_xlog_receive_location() = '
+                'pg_last_xlog_replay_location() THEN 0 ELSE '
+                'EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+                'END').scalar()
+
+        # Other databases can not report their lag
+        return 0
+
     # CRUD for our resources (quota, server, tsigkey, tenant, domain & record)
     # R - get_*, find_*s
     #
@@ -58,6 +168,18 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     # criterion - dictionary of filters to be applied
     #
 
+    def _get_table_version(self, table):
+        # The table's rows are hard deleted and their version is bumped by
+        # every update, so any change moves at least one of these aggregates.
+        query = select([func.count(table.c.id),
+                        func.sum(table.c.version),
+                        func.max(table.c.created_at),
+                        func.max(table.c.updated_at)])
+
+        resultproxy = self.session.execute(query)
+
+        return tuple(resultproxy.fetchone())
+
     # Quota Methods
     def _find_quotas(self, context, criterion, one=False, marker=None,
                      limit=None, sort_key=None, sort_dir=None):
@@ -66,6 +188,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             exceptions.QuotaNotFound, criterion, one, marker, limit,
             sort_key, sort_dir)
 
+    @writer
     def create_quota(self, context, quota):
         if not isinstance(quota, objects.Quota):
             # TODO(kiall): Quotas should always use Objects
@@ -74,23 +197,28 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         return self._create(
             tables.quotas, quota, exceptions.DuplicateQuota)
 
+    @reader
     def get_quota(self, context, quota_id):
         return self._find_quotas(context, {'id': quota_id}, one=True)
 
+    @reader
     def find_quotas(self, context, criterion=None, marker=None, limit=None,
                     sort_key=None, sort_dir=None):
         return self._find_quotas(context, criterion, marker=marker,
                                  limit=limit, sort_key=sort_key,
                                  sort_dir=sort_dir)
 
+    @reader
     def find_quota(self, context, criterion):
         return self._find_quotas(context, criterion, one=True)
 
+    @writer
     def update_quota(self, context, quota):
         return self._update(
             context, tables.quotas, quota, exceptions.DuplicateQuota,
             exceptions.QuotaNotFound)
 
+    @writer
     def delete_quota(self, context, quota_id):
         # Fetch the existing quota, we'll need to return it.
         quota = self._find_quotas(context, {'id': quota_id}, one=True)
@@ -105,26 +233,36 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             exceptions.TldNotFound, criterion, one, marker, limit,
             sort_key, sort_dir)
 
+    @writer
     def create_tld(self, context, tld):
         return self._create(
             tables.tlds, tld, exceptions.DuplicateTld)
 
+    @reader
     def get_tld(self, context, tld_id):
         return self._find_tlds(context, {'id': tld_id}, one=True)
 
+    @reader
     def find_tlds(self, context, criterion=None, marker=None, limit=None,
                   sort_key=None, sort_dir=None):
         return self._find_tlds(context, criterion, marker=marker, limit=limit,
                                sort_key=sort_key, sort_dir=sort_dir)
 
+    @reader
     def find_tld(self, context, criterion):
         return self._find_tlds(context, criterion, one=True)
 
+    @reader
+    def get_tlds_version(self, context):
+        return self._get_table_version(tables.tlds)
+
+    @writer
     def update_tld(self, context, tld):
         return self._update(
             context, tables.tlds, tld, exceptions.DuplicateTld,
             exceptions.TldNotFound)
 
+    @writer
     def delete_tld(self, context, tld_id):
         # Fetch the existing tld, we'll need to return it.
         tld = self._find_tlds(context, {'id': tld_id}, one=True)
@@ -138,27 +276,33 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             exceptions.TsigKeyNotFound, criterion, one, marker, limit,
             sort_key, sort_dir)
 
+    @writer
     def create_tsigkey(self, context, tsigkey):
         return self._create(
             tables.tsigkeys, tsigkey, exceptions.DuplicateTsigKey)
 
+    @reader
     def get_tsigkey(self, context, tsigkey_id):
         return self._find_tsigkeys(context, {'id': tsigkey_id}, one=True)
 
+    @reader
     def find_tsigkeys(self, context, criterion=None, marker=None, limit=None,
                       sort_key=None, sort_dir=None):
         return self._find_tsigkeys(context, criterion, marker=marker,
                                    limit=limit, sort_key=sort_key,
                                    sort_dir=sort_dir)
 
+    @reader
     def find_tsigkey(self, context, criterion):
         return self._find_tsigkeys(context, criterion, one=True)
 
+    @writer
     def update_tsigkey(self, context, tsigkey):
         return self._update(
             context, tables.tsigkeys, tsigkey, exceptions.DuplicateTsigKey,
             exceptions.TsigKeyNotFound)
 
+    @writer
     def delete_tsigkey(self, context, tsigkey_id):
         # Fetch the existing tsigkey, we'll need to return it.
         tsigkey = self._find_tsigkeys(context, {'id': tsigkey_id}, one=True)
@@ -168,6 +312,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     ##
     # Tenant Methods
     ##
+    @reader
     def find_tenants(self, context):
         # returns an array of tenant_id & count of their domains
         query = select([tables.domains.c.tenant_id,
@@ -187,6 +332,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return tenant_list
 
+    @reader
     def get_tenant(self, context, tenant_id):
         # get list list & count of all domains owned by given tenant_id
         query = select([tables.domains.c.name])
@@ -202,6 +348,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             domain_count=len(results),
             domains=[r[0] for r in results])
 
+    @reader
     def count_tenants(self, context):
         # tenants are the owner of domains, count the number of unique tenants
         # select count(distinct tenant_id) from domains
@@ -221,7 +368,8 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     # Domain Methods
     ##
     def _find_domains(self, context, criterion, one=False, marker=None,
-                      limit=None, sort_key=None, sort_dir=None):
+                      limit=None, sort_key=None, sort_dir=None,
+                      total_count=False):
         # Check to see if the criterion can use the reverse_name column
         criterion = self._rname_check(criterion)
 
@@ -230,11 +378,12 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             exceptions.DomainNotFound, criterion, one, marker, limit,
             sort_key, sort_dir)
 
-        if not one:
+        if total_count and not one:
             domains.total_count = self.count_domains(context, criterion)
 
         return domains
 
+    @writer
     def create_domain(self, context, domain):
         # Patch in the reverse_name column
         extra_values = {"reverse_name": domain.name[::-1]}
@@ -244,18 +393,22 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             tables.domains, domain, exceptions.DuplicateDomain, ['recordsets'],
             extra_values=extra_values)
 
+    @reader
     def get_domain(self, context, domain_id):
         return self._find_domains(context, {'id': domain_id}, one=True)
 
+    @reader
     def find_domains(self, context, criterion=None, marker=None, limit=None,
-                     sort_key=None, sort_dir=None):
+                     sort_key=None, sort_dir=None, total_count=False):
         return self._find_domains(context, criterion, marker=marker,
                                   limit=limit, sort_key=sort_key,
-                                  sort_dir=sort_dir)
+                                  sort_dir=sort_dir, total_count=total_count)
 
+    @reader
     def find_domain(self, context, criterion):
         return self._find_domains(context, criterion, one=True)
 
+    @writer
     def update_domain(self, context, domain):
         # Don't handle recordsets for now
 
@@ -281,12 +434,48 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return updated_domain
 
+    @writer
     def delete_domain(self, context, domain_id):
         # Fetch the existing domain, we'll need to return it.
         domain = self._find_domains(context, {'id': domain_id}, one=True)
         return self._delete(context, tables.domains, domain,
                             exceptions.DomainNotFound)
 
+    @reader
+    def find_domain_name_changes(self, context, since=None):
+        columns = [tables.domains.c.id, tables.domains.c.name,
+                   tables.domains.c.deleted, tables.domains.c.created_at,
+                   tables.domains.c.deleted_at]
+
+        if since is None:
+            query = select(columns).where(tables.domains.c.deleted == '0')
+        else:
+            query = select(columns).where(or_(
+                tables.domains.c.created_at >= since,
+                tables.domains.c.deleted_at >= since))
+
+        resultproxy = self.session.execute(query)
+
+        return objects.DomainList.from_list(
+            [dict(row) for row in resultproxy.fetchall()])
+
+    def _adjust_record_count(self, domain_id, delta):
+        # NOTE: The count is adjusted in place, without bumping the domain's
+        #       version or updated_at, so concurrent record changes don't
+        #       conflict and the domain itself isn't seen as modified.
+        if delta == 0:
+            return
+
+        domains = tables.domains
+
+        query = domains.update()\
+            .where(domains.c.id == domain_id)\
+            .values(record_count=domains.c.record_count + delta,
+                    updated_at=domains.c.updated_at)
+
+        self.session.execute(query)
+
+    @reader
     def count_domains(self, context, criterion=None):
         query = select([func.count(tables.domains.c.id)])
         query = self._apply_criterion(tables.domains, query, criterion)
@@ -303,7 +492,8 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
     # RecordSet Methods
     def _find_recordsets(self, context, criterion, one=False, marker=None,
-                         limit=None, sort_key=None, sort_dir=None):
+                         limit=None, sort_key=None, sort_dir=None,
+                         total_count=False):
         query = None
 
         # Check to see if the criterion can use the reverse_name column
@@ -326,24 +516,52 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             objects.RecordSetList, exceptions.RecordSetNotFound, criterion,
             one, marker, limit, sort_key, sort_dir, query)
 
-        if not one:
+        if total_count and not one:
             recordsets.total_count = self.count_recordsets(context, criterion)
 
         # Load Relations
-        def _load_relations(recordset):
-            recordset.records = self._find_records(
-                context, {'recordset_id': recordset.id})
-
-            recordset.obj_reset_changes(['recordset'])
-
         if one:
-            _load_relations(recordsets)
+            self._load_recordset_records(context, [recordsets])
         else:
-            for recordset in recordsets:
-                _load_relations(recordset)
+            self._load_recordset_records(context, recordsets)
 
         return recordsets
 
+    def _load_recordset_records(self, context, recordsets):
+        """
+        Load the records of a list of recordsets, fetching them with a single
+        IN query per batch of recordsets rather than a query per recordset.
+        """
+        records = dict((recordset.id, objects.RecordList())
+                       for recordset in recordsets)
+        recordset_ids = list(records.keys())
+
+        # NOTE: Keep the number of bound parameters under the limits of the
+        #       various databases (SQLite defaults to 999).
+        batch_size = 500
+
+        for i in range(0, len(recordset_ids), batch_size):
+            query = select([tables.records]).where(
+                tables.records.c.recordset_id.in_(
+                    recordset_ids[i:i + batch_size]))
+            query = self._apply_tenant_criteria(context, tables.records, query)
+            query = self._apply_deleted_criteria(
+                context, tables.records, query)
+            query = query.order_by(tables.records.c.created_at,
+                                   tables.records.c.id)
+
+            for model in self.session.execute(query).fetchall():
+                records[model.recordset_id].objects.append(
+                    sqlalchemy_base._set_object_from_model(
+                        objects.Record(), model))
+
+        for recordset in recordsets:
+            recordset.records = records[recordset.id]
+            recordset.records.obj_reset_changes()
+
+            recordset.obj_reset_changes(['records'])
+
+    @writer
     def create_recordset(self, context, domain_id, recordset):
         # Fetch the domain as we need the tenant_id
         domain = self._find_domains(context, {'id': domain_id}, one=True)
@@ -359,11 +577,11 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             ['records'], extra_values=extra_values)
 
         if recordset.obj_attr_is_set('records'):
-            for record in recordset.records:
-                # NOTE: Since we're dealing with a mutable object, the return
-                #       value is not needed. The original item will be mutated
-                #       in place on the input "recordset.records" list.
-                self.create_record(context, domain_id, recordset.id, record)
+            # NOTE: Since we're dealing with mutable objects, the return
+            #       value is not needed. The original items will be mutated
+            #       in place on the input "recordset.records" list.
+            self.create_records_bulk(
+                context, domain_id, recordset.id, recordset.records)
         else:
             recordset.records = objects.RecordList()
 
@@ -371,18 +589,23 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return recordset
 
+    @reader
     def get_recordset(self, context, recordset_id):
         return self._find_recordsets(context, {'id': recordset_id}, one=True)
 
+    @reader
     def find_recordsets(self, context, criterion=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None):
+                        sort_key=None, sort_dir=None, total_count=False):
         return self._find_recordsets(context, criterion, marker=marker,
                                      limit=limit, sort_key=sort_key,
-                                     sort_dir=sort_dir)
+                                     sort_dir=sort_dir,
+                                     total_count=total_count)
 
+    @reader
     def find_recordset(self, context, criterion):
         return self._find_recordsets(context, criterion, one=True)
 
+    @writer
     def update_recordset(self, context, recordset):
         recordset = self._update(
             context, tables.recordsets, recordset,
@@ -415,28 +638,42 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             #       "recordset.records" list.
 
             # Delete Records
-            for record_id in have_records - keep_records:
-                self.delete_record(context, record_id)
+            if have_records - keep_records:
+                self.delete_records_bulk(
+                    context, list(have_records - keep_records))
 
             # Update Records
-            for record in update_records:
-                self.update_record(context, record)
+            if update_records:
+                self.update_records_bulk(context, update_records)
 
             # Create Records
-            for record in create_records:
-                self.create_record(
-                    context, recordset.domain_id, recordset.id, record)
+            if create_records:
+                self.create_records_bulk(
+                    context, recordset.domain_id, recordset.id,
+                    create_records)
 
         return recordset
 
+    @writer
     def delete_recordset(self, context, recordset_id):
         # Fetch the existing recordset, we'll need to return it.
         recordset = self._find_recordsets(
             context, {'id': recordset_id}, one=True)
 
-        return self._delete(context, tables.recordsets, recordset,
-                            exceptions.RecordSetNotFound)
+        recordset = self._delete(context, tables.recordsets, recordset,
+                                 exceptions.RecordSetNotFound)
+
+        # The recordset's records are removed by the cascading foreign key
+        self._adjust_record_count(
+            recordset.domain_id, -len(recordset.records))
 
+        return recordset
+
+    @reader
+    def recordset_exists(self, context, criterion):
+        return self._exists(context, tables.recordsets, criterion)
+
+    @reader
     def count_recordsets(self, context, criterion=None):
         # Ensure that we return only active recordsets
         rjoin = tables.recordsets.join(
@@ -461,11 +698,11 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
     # Record Methods
     def _find_records(self, context, criterion, one=False, marker=None,
-                      limit=None, sort_key=None, sort_dir=None):
+                      limit=None, sort_key=None, sort_dir=None, query=None):
         return self._find(
             context, tables.records, objects.Record, objects.RecordList,
             exceptions.RecordNotFound, criterion, one, marker, limit,
-            sort_key, sort_dir)
+            sort_key, sort_dir, query)
 
     def _recalculate_record_hash(self, record):
         """
@@ -476,6 +713,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return md5.hexdigest()
 
+    @writer
     def create_record(self, context, domain_id, recordset_id, record):
         # Fetch the domain as we need the tenant_id
         domain = self._find_domains(context, {'id': domain_id}, one=True)
@@ -485,21 +723,137 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         record.recordset_id = recordset_id
         record.hash = self._recalculate_record_hash(record)
 
-        return self._create(
+        record = self._create(
             tables.records, record, exceptions.DuplicateRecord)
 
+        self._adjust_record_count(domain_id, 1)
+
+        return record
+
+    @reader
     def get_record(self, context, record_id):
         return self._find_records(context, {'id': record_id}, one=True)
 
+    @reader
     def find_records(self, context, criterion=None, marker=None, limit=None,
                      sort_key=None, sort_dir=None):
         return self._find_records(context, criterion, marker=marker,
                                   limit=limit, sort_key=sort_key,
                                   sort_dir=sort_dir)
 
+    @reader
+    def find_export_records(self, context, domain_id, marker=None,
+                            limit=None):
+        records = tables.records
+        recordsets = tables.recordsets
+
+        rjoin = records.join(
+            recordsets, records.c.recordset_id == recordsets.c.id)
+
+        if marker is not None:
+            # Seek past the marker record's position in the ordering
+            query = select([recordsets.c.type, recordsets.c.name,
+                            recordsets.c.id])\
+                .select_from(rjoin)\
+                .where(records.c.id == marker)
+            query = self._apply_tenant_criteria(context, records, query)
+
+            result = self.session.execute(query).fetchone()
+
+            if result is None:
+                raise exceptions.MarkerNotFound(
+                    'Marker %s could not be found' % marker)
+
+            rtype, name, recordset_id = result
+
+        # NOTE: The SOA comes first in a zonefile, then the rest by name
+        query = select([recordsets.c.id.label('recordset_id'),
+                        recordsets.c.name, recordsets.c.type,
+                        recordsets.c.ttl, records.c.id, records.c.data])\
+            .select_from(rjoin)\
+            .where(records.c.domain_id == domain_id)\
+            .order_by(case([(recordsets.c.type == 'SOA', 0)], else_=1),
+                      recordsets.c.name, recordsets.c.id, records.c.id)
+
+        if marker is not None:
+            after = or_(
+                recordsets.c.name > name,
+                and_(recordsets.c.name == name,
+                     recordsets.c.id > recordset_id),
+                and_(recordsets.c.name == name,
+                     recordsets.c.id == recordset_id,
+                     records.c.id > marker))
+
+            if rtype == 'SOA':
+                query = query.where(or_(recordsets.c.type != 'SOA', after))
+            else:
+                query = query.where(and_(recordsets.c.type != 'SOA', after))
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        query = self._apply_tenant_criteria(context, records, query)
+
+        # Group the records of each RecordSet together
+        results = objects.RecordSetList()
+
+        for row in self.session.execute(query):
+            if len(results) == 0 or results[-1].id != row.recordset_id:
+                results.append(objects.RecordSet(
+                    id=row.recordset_id, domain_id=domain_id, name=row.name,
+                    type=row.type, ttl=row.ttl,
+                    records=objects.RecordList()))
+
+            results[-1].records.append(
+                objects.Record(id=row.id, data=row.data))
+
+        return results
+
+    @reader
+    def find_floatingip_records(self, context, addresses):
+        records = tables.records
+        recordsets = tables.recordsets
+        domains = tables.domains
+
+        rjoin = records.join(
+            recordsets, records.c.recordset_id == recordsets.c.id).join(
+            domains, records.c.domain_id == domains.c.id)
+
+        ttl = func.coalesce(recordsets.c.ttl, domains.c.ttl).label('ptr_ttl')
+
+        addresses = list(set(addresses))
+        results = {}
+
+        for i in range(0, len(addresses), sqlalchemy_base.BULK_CHUNK_SIZE):
+            chunk = addresses[i:i + sqlalchemy_base.BULK_CHUNK_SIZE]
+
+            query = select([records, ttl])\
+                .select_from(rjoin)\
+                .where(records.c.managed_resource_type == 'ptr:floatingip')\
+                .where(records.c.managed_extra.in_(chunk))\
+                .where(domains.c.deleted == '0')
+            query = self._apply_tenant_criteria(context, records, query)
+
+            for row in self.session.execute(query):
+                recordset = results.get(row.recordset_id)
+
+                if recordset is None:
+                    recordset = objects.RecordSet(
+                        id=row.recordset_id, domain_id=row.domain_id,
+                        ttl=row.ptr_ttl, records=objects.RecordList())
+                    results[row.recordset_id] = recordset
+
+                recordset.records.append(
+                    sqlalchemy_base._set_object_from_model(
+                        objects.Record(), row))
+
+        return objects.RecordSetList(objects=list(results.values()))
+
+    @reader
     def find_record(self, context, criterion):
         return self._find_records(context, criterion, one=True)
 
+    @writer
     def update_record(self, context, record):
         if record.obj_what_changed():
             record.hash = self._recalculate_record_hash(record)
@@ -508,12 +862,150 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             context, tables.records, record, exceptions.DuplicateRecord,
             exceptions.RecordNotFound)
 
+    @writer
     def delete_record(self, context, record_id):
         # Fetch the existing record, we'll need to return it.
         record = self._find_records(context, {'id': record_id}, one=True)
-        return self._delete(context, tables.records, record,
-                            exceptions.RecordNotFound)
+        record = self._delete(context, tables.records, record,
+                              exceptions.RecordNotFound)
 
+        self._adjust_record_count(record.domain_id, -1)
+
+        return record
+
+    @writer
+    def create_records_bulk(self, context, domain_id, recordset_id, records):
+        # Fetch the domain as we need the tenant_id
+        domain = self._find_domains(context, {'id': domain_id}, one=True)
+
+        for record in records:
+            record.tenant_id = domain.tenant_id
+            record.domain_id = domain_id
+            record.recordset_id = recordset_id
+            record.hash = self._recalculate_record_hash(record)
+
+        records = objects.RecordList(objects=self._create_bulk(
+            tables.records, records, exceptions.DuplicateRecord))
+
+        self._adjust_record_count(domain_id, len(records))
+
+        return records
+
+    @writer
+    def update_records_bulk(self, context, records):
+        for record in records:
+            if record.obj_what_changed():
+                record.hash = self._recalculate_record_hash(record)
+
+        return objects.RecordList(objects=self._update_bulk(
+            context, tables.records, records, exceptions.DuplicateRecord,
+            exceptions.RecordNotFound))
+
+    @writer
+    def delete_records_bulk(self, context, record_ids):
+        record_ids = list(set(record_ids))
+
+        # Fetch the existing records, we'll need to return them.
+        records = []
+        for i in range(0, len(record_ids), sqlalchemy_base.BULK_CHUNK_SIZE):
+            query = select([tables.records]).where(tables.records.c.id.in_(
+                record_ids[i:i + sqlalchemy_base.BULK_CHUNK_SIZE]))
+
+            records.extend(self._find_records(context, None, query=query))
+
+        if len(records) != len(record_ids):
+            raise exceptions.RecordNotFound()
+
+        records = objects.RecordList(objects=self._delete_bulk(
+            context, tables.records, records, exceptions.RecordNotFound))
+
+        deltas = {}
+        for record in records:
+            deltas[record.domain_id] = deltas.get(record.domain_id, 0) - 1
+
+        for domain_id, delta in deltas.items():
+            self._adjust_record_count(domain_id, delta)
+
+        return records
+
+    def _apply_status_transition(self, context, query, domain_id, statuses,
+                                 actions, serial):
+        records = tables.records
+
+        query = query.where(records.c.domain_id == domain_id)\
+                     .where(records.c.status.in_(statuses))
+
+        if actions is not None:
+            query = query.where(records.c.action.in_(actions))
+
+        if serial is not None:
+            query = query.where(records.c.serial <= serial)
+
+        return self._apply_tenant_criteria(context, records, query)
+
+    @writer
+    def update_records_status(self, context, domain_id, values, statuses,
+                              actions=None, serial=None):
+        query = tables.records.update().values(
+            self._apply_updated_at(tables.records, dict(values)))
+
+        query = self._apply_status_transition(
+            context, query, domain_id, statuses, actions, serial)
+        query = self._apply_version_increment(context, tables.records, query)
+
+        resultproxy = self.session.execute(query)
+
+        return resultproxy.rowcount
+
+    @writer
+    def purge_records(self, context, domain_id, statuses, actions=None,
+                      serial=None):
+        records = tables.records
+        recordsets = tables.recordsets
+
+        query = select([distinct(records.c.recordset_id)])
+        query = self._apply_status_transition(
+            context, query, domain_id, statuses, actions, serial)
+
+        recordset_ids = [r[0] for r in self.session.execute(query)]
+
+        if len(recordset_ids) == 0:
+            return 0
+
+        self.begin()
+        try:
+            query = self._apply_status_transition(
+                context, records.delete(), domain_id, statuses, actions,
+                serial)
+
+            count = self.session.execute(query).rowcount
+
+            self._adjust_record_count(domain_id, -count)
+
+            # Remove the recordsets the purged records have left empty
+            for i in range(0, len(recordset_ids),
+                           sqlalchemy_base.BULK_CHUNK_SIZE):
+                chunk = recordset_ids[i:i + sqlalchemy_base.BULK_CHUNK_SIZE]
+
+                remaining = select([records.c.recordset_id])\
+                    .where(records.c.recordset_id.in_(chunk))
+
+                query = recordsets.delete()\
+                    .where(recordsets.c.id.in_(chunk))\
+                    .where(~recordsets.c.id.in_(remaining))
+                query = self._apply_tenant_criteria(
+                    context, recordsets, query)
+
+                self.session.execute(query)
+
+            self.commit()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.rollback()
+
+        return count
+
+    @reader
     def count_records(self, context, criterion=None):
         # Ensure that we return only active records
         rjoin = tables.records.join(
@@ -536,6 +1028,25 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return result[0]
 
+    @writer
+    def reconcile_record_counts(self, context, domain_id=None):
+        domains = tables.domains
+        records = tables.records
+
+        count = select([func.count(records.c.id)])\
+            .where(records.c.domain_id == domains.c.id)\
+            .as_scalar()
+
+        query = domains.update()\
+            .where(domains.c.deleted == '0')\
+            .where(domains.c.record_count != count)\
+            .values(record_count=count, updated_at=domains.c.updated_at)
+
+        if domain_id is not None:
+            query = query.where(domains.c.id == domain_id)
+
+        return self.session.execute(query).rowcount
+
     # Blacklist Methods
     def _find_blacklists(self, context, criterion, one=False, marker=None,
                          limit=None, sort_key=None, sort_dir=None):
@@ -544,27 +1055,37 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             objects.BlacklistList, exceptions.BlacklistNotFound, criterion,
             one, marker, limit, sort_key, sort_dir)
 
+    @writer
     def create_blacklist(self, context, blacklist):
         return self._create(
             tables.blacklists, blacklist, exceptions.DuplicateBlacklist)
 
+    @reader
     def get_blacklist(self, context, blacklist_id):
         return self._find_blacklists(context, {'id': blacklist_id}, one=True)
 
+    @reader
     def find_blacklists(self, context, criterion=None, marker=None, limit=None,
                         sort_key=None, sort_dir=None):
         return self._find_blacklists(context, criterion, marker=marker,
                                      limit=limit, sort_key=sort_key,
                                      sort_dir=sort_dir)
 
+    @reader
     def find_blacklist(self, context, criterion):
         return self._find_blacklists(context, criterion, one=True)
 
+    @reader
+    def get_blacklists_version(self, context):
+        return self._get_table_version(tables.blacklists)
+
+    @writer
     def update_blacklist(self, context, blacklist):
         return self._update(
             context, tables.blacklists, blacklist,
             exceptions.DuplicateBlacklist, exceptions.BlacklistNotFound)
 
+    @writer
     def delete_blacklist(self, context, blacklist_id):
         # Fetch the existing blacklist, we'll need to return it.
         blacklist = self._find_blacklists(
@@ -581,6 +1102,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
                           criterion, one, marker, limit, sort_key,
                           sort_dir)
 
+    @writer
     def create_pool(self, context, pool):
         pool = self._create(
             tables.pools, pool, exceptions.DuplicatePool,
@@ -602,6 +1124,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return pool
 
+    @reader
     def get_pool(self, context, pool_id):
         pool = self._find_pools(context, {'id': pool_id}, one=True)
         pool.attributes = self._find_pool_attributes(
@@ -612,6 +1135,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return pool
 
+    @reader
     def find_pools(self, context, criterion=None, marker=None,
                    limit=None, sort_key=None, sort_dir=None):
         pools = self._find_pools(context, criterion, marker=marker,
@@ -626,6 +1150,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return pools
 
+    @reader
     def find_pool(self, context, criterion):
         pool = self._find_pools(context, criterion, one=True)
         pool.attributes = self._find_pool_attributes(
@@ -635,6 +1160,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         pool.obj_reset_changes(['attributes', 'nameservers'])
         return pool
 
+    @writer
     def update_pool(self, context, pool):
         pool = self._update(context, tables.pools, pool,
                             exceptions.DuplicatePool, exceptions.PoolNotFound,
@@ -692,6 +1218,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return updated_pool
 
+    @writer
     def delete_pool(self, context, pool_id):
         pool = self._find_pools(context, {'id': pool_id}, one=True)
 
@@ -706,30 +1233,36 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
                           exceptions.PoolAttributeNotFound, criterion, one,
                           marker, limit, sort_key, sort_dir)
 
+    @writer
     def create_pool_attribute(self, context, pool_id, pool_attribute):
         pool_attribute.pool_id = pool_id
 
         return self._create(tables.pool_attributes, pool_attribute,
                             exceptions.DuplicatePoolAttribute)
 
+    @reader
     def get_pool_attribute(self, context, pool_attribute_id):
         return self._find_pool_attributes(
             context, {'id': pool_attribute_id}, one=True)
 
+    @reader
     def find_pool_attributes(self, context, criterion=None, marker=None,
                    limit=None, sort_key=None, sort_dir=None):
         return self._find_pool_attributes(context, criterion, marker=marker,
                                           limit=limit, sort_key=sort_key,
                                           sort_dir=sort_dir)
 
+    @reader
     def find_pool_attribute(self, context, criterion):
         return self._find_pool_attributes(context, criterion, one=True)
 
+    @writer
     def update_pool_attribute(self, context, pool_attribute):
         return self._update(context, tables.pool_attributes, pool_attribute,
                             exceptions.DuplicatePoolAttribute,
                             exceptions.PoolAttributeNotFound)
 
+    @writer
     def delete_pool_attribute(self, context, pool_attribute_id):
         pool_attribute = self._find_pool_attributes(
             context, {'id': pool_attribute_id}, one=True)
@@ -770,6 +1303,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             sort_key=sort_key, query=query, apply_tenant_criteria=False
         )
 
+    @writer
     def create_zone_transfer_request(self, context, zone_transfer_request):
 
         try:
@@ -785,6 +1319,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         else:
             raise exceptions.DuplicateZoneTransferRequest()
 
+    @reader
     def find_zone_transfer_requests(self, context, criterion=None,
                                     marker=None, limit=None, sort_key=None,
                                     sort_dir=None):
@@ -794,6 +1329,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             limit=limit, sort_key=sort_key,
             sort_dir=sort_dir)
 
+    @reader
     def get_zone_transfer_request(self, context, zone_transfer_request_id):
         request = self._find_zone_transfer_requests(
             context,
@@ -802,10 +1338,12 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return request
 
+    @reader
     def find_zone_transfer_request(self, context, criterion):
 
         return self._find_zone_transfer_requests(context, criterion, one=True)
 
+    @writer
     def update_zone_transfer_request(self, context, zone_transfer_request):
 
         zone_transfer_request.obj_reset_changes(('domain_name'))
@@ -820,6 +1358,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return updated_zt_request
 
+    @writer
     def delete_zone_transfer_request(self, context, zone_transfer_request_id):
 
         zone_transfer_request = self._find_zone_transfer_requests(
@@ -844,6 +1383,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
                 exceptions.ZoneTransferAcceptNotFound, criterion,
                 one, marker, limit, sort_key, sort_dir)
 
+    @writer
     def create_zone_transfer_accept(self, context, zone_transfer_accept):
 
         return self._create(
@@ -851,6 +1391,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             zone_transfer_accept,
             exceptions.DuplicateZoneTransferAccept)
 
+    @reader
     def find_zone_transfer_accepts(self, context, criterion=None,
                                    marker=None, limit=None, sort_key=None,
                                    sort_dir=None):
@@ -858,18 +1399,21 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             context, criterion, marker=marker, limit=limit, sort_key=sort_key,
             sort_dir=sort_dir)
 
+    @reader
     def get_zone_transfer_accept(self, context, zone_transfer_accept_id):
         return self._find_zone_transfer_accept(
             context,
             {'id': zone_transfer_accept_id},
             one=True)
 
+    @reader
     def find_zone_transfer_accept(self, context, criterion):
         return self._find_zone_transfer_accept(
             context,
             criterion,
             one=True)
 
+    @writer
     def update_zone_transfer_accept(self, context, zone_transfer_accept):
 
         return self._update(
@@ -879,6 +1423,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             exceptions.DuplicateZoneTransferAccept,
             exceptions.ZoneTransferAcceptNotFound)
 
+    @writer
     def delete_zone_transfer_accept(self, context, zone_transfer_accept_id):
 
         zone_transfer_accept = self._find_zone_transfer_accept(
@@ -892,6 +1437,45 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             zone_transfer_accept,
             exceptions.ZoneTransferAcceptNotFound)
 
+    # Zone Import Methods
+    def _find_zone_imports(self, context, criterion, one=False, marker=None,
+                           limit=None, sort_key=None, sort_dir=None):
+        return self._find(
+            context, tables.zone_imports, objects.ZoneImport,
+            objects.ZoneImportList, exceptions.ZoneImportNotFound, criterion,
+            one, marker, limit, sort_key, sort_dir)
+
+    @writer
+    def create_zone_import(self, context, zone_import):
+        return self._create(
+            tables.zone_imports, zone_import, exceptions.DuplicateZoneImport)
+
+    @reader
+    def find_zone_imports(self, context, criterion=None, marker=None,
+                          limit=None, sort_key=None, sort_dir=None):
+        return self._find_zone_imports(context, criterion, marker=marker,
+                                       limit=limit, sort_key=sort_key,
+                                       sort_dir=sort_dir)
+
+    @reader
+    def get_zone_import(self, context, zone_import_id):
+        return self._find_zone_imports(context, {'id': zone_import_id},
+                                       one=True)
+
+    @writer
+    def update_zone_import(self, context, zone_import):
+        return self._update(
+            context, tables.zone_imports, zone_import,
+            exceptions.DuplicateZoneImport, exceptions.ZoneImportNotFound)
+
+    @writer
+    def delete_zone_import(self, context, zone_import_id):
+        # Fetch the existing zone import, we'll need to return it.
+        zone_import = self._find_zone_imports(context, {'id': zone_import_id},
+                                              one=True)
+        return self._delete(context, tables.zone_imports, zone_import,
+                            exceptions.ZoneImportNotFound)
+
     # diagnostics
     def ping(self, context):
         start_time = time.time()
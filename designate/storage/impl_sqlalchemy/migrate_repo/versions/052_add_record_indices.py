@@ -0,0 +1,81 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from sqlalchemy import Index, MetaData, Table
+
+meta = MetaData()
+
+
+def index_exists(index):
+    table = index[1]._get_table()
+    cols = sorted([str(x).split('.')[1] for x in index[1:]])
+
+    for idx in table.indexes:
+        if sorted(idx.columns.keys()) == cols:
+            return True
+    return False
+
+
+def get_indices(migrate_engine):
+    recordsets_table = Table('recordsets', meta, autoload=True)
+    records_table = Table('records', meta, autoload=True)
+
+    indices = [
+        # Loading the records of a page of recordsets
+        ['records_recordset_created', records_table.c.recordset_id,
+         records_table.c.created_at],
+        # Sink deletes and floating IP PTR lookups
+        ['records_managed_resource', records_table.c.managed_resource_id,
+         records_table.c.managed_resource_type],
+        # Listing the floating IP PTRs of a tenant
+        ['records_managed_type_tenant',
+         records_table.c.managed_resource_type,
+         records_table.c.managed_tenant_id],
+        # Wildcard name searches, which use the reverse_name column
+        ['rrset_type_reverse_name', recordsets_table.c.type,
+         recordsets_table.c.reverse_name],
+        # Paging through the recordsets of a zone
+        ['rrset_domainid_created', recordsets_table.c.domain_id,
+         recordsets_table.c.created_at],
+    ]
+
+    # NOTE: records.data is a TEXT column. MySQL can only index a prefix of
+    #       it, and PostgreSQL refuses to index values larger than a btree
+    #       page, which long TXT records may be.
+    dialect = migrate_engine.url.get_dialect().name
+    if not dialect.startswith('postgres'):
+        indices.append(['records_domainid_data', records_table.c.domain_id,
+                        records_table.c.data])
+
+    return indices
+
+
+def _get_index(ind):
+    # Index the first 255 characters of records.data on MySQL
+    return Index(*ind, mysql_length={'data': 255})
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for ind in get_indices(migrate_engine):
+        if not index_exists(ind):
+            index = _get_index(ind)
+            index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for ind in get_indices(migrate_engine):
+        if index_exists(ind):
+            index = _get_index(ind)
+            index.drop(migrate_engine)
@@ -0,0 +1,49 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from sqlalchemy import Integer, String, DateTime, Enum
+from sqlalchemy.schema import Table, Column, MetaData
+
+from designate.sqlalchemy.types import UUID
+
+TASK_STATUSES = ['ACTIVE', 'PENDING', 'DELETED', 'ERROR', 'COMPLETE']
+
+meta = MetaData()
+
+zone_imports = Table(
+    'zone_imports',
+    meta,
+    Column('id', UUID(), primary_key=True),
+    Column('tenant_id', String(36), nullable=True),
+    Column('domain_id', UUID, nullable=True),
+    Column('status', Enum(name='resource_statuses', *TASK_STATUSES),
+           nullable=False, server_default='PENDING'),
+    Column('message', String(160), nullable=True),
+    Column('recordsets_total', Integer(), nullable=True),
+    Column('recordsets_imported', Integer(), nullable=False),
+    Column('created_at', DateTime()),
+    Column('updated_at', DateTime()),
+    Column('version', Integer(), nullable=False),
+    mysql_engine='INNODB',
+    mysql_charset='utf8'
+)
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    zone_imports.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    zone_imports.drop()
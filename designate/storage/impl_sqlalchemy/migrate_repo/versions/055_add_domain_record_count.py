@@ -0,0 +1,50 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from migrate.changeset.constraint import UniqueConstraint
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy import func, select
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    domains_table = Table('domains', meta, autoload=True)
+    records_table = Table('records', meta, autoload=True)
+
+    record_count_col = Column('record_count', Integer, nullable=False,
+                              server_default='0')
+    record_count_col.create(domains_table)
+
+    # Populate the counts of the existing domains
+    count = select([func.count(records_table.c.id)])\
+        .where(records_table.c.domain_id == domains_table.c.id)\
+        .as_scalar()
+
+    update = domains_table.update().values(record_count=count)
+    migrate_engine.execute(update)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    domains_table = Table('domains', meta, autoload=True)
+    domains_table.c.record_count.drop()
+
+    # Recreate constraints for SQLite
+    dialect = migrate_engine.url.get_dialect().name
+    if dialect.startswith('sqlite'):
+        domains_constraint = UniqueConstraint('name', 'deleted',
+                                              name='unique_domain_name',
+                                              table=domains_table)
+        domains_constraint.create()
@@ -0,0 +1,53 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from sqlalchemy import Index, MetaData, Table
+
+meta = MetaData()
+
+
+def index_exists(index):
+    table = index[1]._get_table()
+    cols = sorted([str(x).split('.')[1] for x in index[1:]])
+
+    for idx in table.indexes:
+        if sorted(idx.columns.keys()) == cols:
+            return True
+    return False
+
+
+def get_indices():
+    records_table = Table('records', meta, autoload=True)
+
+    # Looking up the floating IP PTRs of a tenant's addresses
+    return [
+        ['records_managed_type_extra',
+         records_table.c.managed_resource_type,
+         records_table.c.managed_extra],
+    ]
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for ind in get_indices():
+        if not index_exists(ind):
+            index = Index(*ind)
+            index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    for ind in get_indices():
+        if index_exists(ind):
+            index = Index(*ind)
+            index.drop(migrate_engine)
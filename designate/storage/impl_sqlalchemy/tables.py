@@ -94,6 +94,8 @@ domains = Table('domains', metadata,
            default='CREATE', server_default='CREATE', nullable=False),
     Column('pool_id', UUID, default=None, nullable=True),
     Column('reverse_name', String(255), nullable=False),
+    Column('record_count', Integer, default=0, server_default='0',
+           nullable=False),
 
     UniqueConstraint('name', 'deleted', name='unique_domain_name'),
     ForeignKeyConstraint(['parent_domain_id'],
@@ -268,3 +270,22 @@ zone_transfer_accepts = Table('zone_transfer_accepts', metadata,
     mysql_engine='InnoDB',
     mysql_charset='utf8',
 )
+
+zone_imports = Table('zone_imports', metadata,
+    Column('id', UUID, default=utils.generate_uuid, primary_key=True),
+    Column('version', Integer(), default=1, nullable=False),
+    Column('created_at', DateTime, default=lambda: timeutils.utcnow()),
+    Column('updated_at', DateTime, onupdate=lambda: timeutils.utcnow()),
+
+    Column('tenant_id', String(36), default=None, nullable=True),
+    Column('domain_id', UUID, nullable=True),
+    Column('status', Enum(name='resource_statuses', *TASK_STATUSES),
+           nullable=False, server_default='PENDING',
+           default='PENDING'),
+    Column('message', String(160), nullable=True),
+    Column('recordsets_total', Integer(), nullable=True),
+    Column('recordsets_imported', Integer(), default=0, nullable=False),
+
+    mysql_engine='InnoDB',
+    mysql_charset='utf8',
+)
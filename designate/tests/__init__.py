@@ -664,7 +664,10 @@ class TestCase(base.BaseTestCase):
     def _ensure_interface(self, interface, implementation):
         for name in interface.__abstractmethods__:
             in_arginfo = inspect.getargspec(getattr(interface, name))
-            im_arginfo = inspect.getargspec(getattr(implementation, name))
+            im_method = getattr(implementation, name)
+            # Compare decorated methods by the signature they wrap
+            im_method = getattr(im_method, '__wrapped__', im_method)
+            im_arginfo = inspect.getargspec(im_method)
 
             self.assertEqual(
                 in_arginfo, im_arginfo,
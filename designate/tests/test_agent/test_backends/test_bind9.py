@@ -13,6 +13,9 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import os
+
+import fixtures
 import mock
 import dns.zone
 
@@ -60,6 +63,39 @@ class Bind9AgentBackendTestCase(TestCase, BackendTestMixin):
     def test_delete_domain(self, execute, sync):
         self.backend.delete_domain('example.org.')
 
+    @mock.patch(('designate.backend.agent_backend.impl_bind9.Bind9Backend'
+                 '._execute_rndc'))
+    def test_create_domain_xfr(self, execute_rndc):
+        zone_path = self.useFixture(fixtures.TempDir()).path
+        self.config(zone_file_path=zone_path, group='backend:agent:bind9')
+        output_path = os.path.join(zone_path, 'example.org.zone')
+
+        xfr = mock.Mock()
+        self.backend.create_domain_xfr('example.org.', xfr)
+
+        # The zone is streamed straight into the zone file
+        xfr.assert_called_once_with(output_path)
+
+        rndc_call = execute_rndc.call_args[0][0]
+        self.assertIn('addzone', rndc_call)
+        self.assertIn('example.org { type master; file "%s"; };' %
+                      output_path, rndc_call)
+
+    @mock.patch(('designate.backend.agent_backend.impl_bind9.Bind9Backend'
+                 '._execute_rndc'))
+    def test_update_domain_xfr(self, execute_rndc):
+        zone_path = self.useFixture(fixtures.TempDir()).path
+        self.config(zone_file_path=zone_path, group='backend:agent:bind9')
+
+        xfr = mock.Mock()
+        self.backend.update_domain_xfr('example.org.', xfr)
+
+        xfr.assert_called_once_with(
+            os.path.join(zone_path, 'example.org.zone'))
+
+        rndc_call = execute_rndc.call_args[0][0]
+        self.assertEqual(['reload', 'example.org'], rndc_call[-2:])
+
     # Helper
     def _create_dnspy_zone(self, name):
         zone_text = ('$ORIGIN %(name)s\n%(name)s 3600 IN SOA %(ns)s '
@@ -50,6 +50,14 @@ class FakeAgentBackendTestCase(TestCase, BackendTestMixin):
     def test_delete_domain(self):
         self.backend.delete_domain('example.org.')
 
+    def test_create_domain_xfr(self):
+        domain = self._create_dnspy_zone('example.org')
+        self.backend.create_domain_xfr('example.org.', lambda: domain)
+
+    def test_update_domain_xfr(self):
+        domain = self._create_dnspy_zone('example.org')
+        self.backend.update_domain_xfr('example.org.', lambda: domain)
+
     # Helper
     def _create_dnspy_zone(self, name):
         zone_text = ('$ORIGIN %(name)s\n%(name)s 3600 IN SOA %(ns)s '
@@ -16,7 +16,14 @@
 import binascii
 
 import dns
+import dns.exception
+import dns.message
+import dns.query
+import dns.rcode
+import dns.rdatatype
 import dns.resolver
+import dns.rrset
+import eventlet
 import mock
 
 import designate
@@ -59,6 +66,87 @@ class AgentRequestHandlerTest(AgentTestCase):
         response = self.handler(request).to_wire()
         self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+        self.handler.transfers.wait()
+        self.assertTrue(doaxfr.called)
+
+    def _make_soa_response(self, serial):
+        query = dns.message.make_query('example.com.', dns.rdatatype.SOA)
+        response = dns.message.make_response(query)
+        response.answer.append(dns.rrset.from_text(
+            'example.com.', 3600, 'IN', 'SOA',
+            'ns1.example.com. admin.example.com. %d 3600 600 86400 3600' %
+            serial))
+        return response
+
+    @mock.patch('designate.dnsutils.do_axfr')
+    def test_receive_notify_serial_current(self, doaxfr):
+        """
+        Get a NOTIFY while the local serial matches the masters and ensure
+        no AXFR is triggered
+        """
+        payload = ("1a7220000001000000000000076578616d706c6503636f6d000006"
+                  "0001")
+        expected_response = ("1a72a4000001000000000000076578616d706c650363"
+                            "6f6d0000060001")
+        self.handler.masters = [{'ip': '127.0.0.1', 'port': 5354}]
+        request = dns.message.from_wire(binascii.a2b_hex(payload))
+        request.environ = {'addr': ["0.0.0.0", 1234]}
+
+        # The fake backend's serial is 0
+        with mock.patch.object(dns.query, 'udp',
+                               return_value=self._make_soa_response(0)):
+            response = self.handler(request).to_wire()
+            self.handler.transfers.wait()
+
+        self.assertFalse(doaxfr.called)
+        self.assertEqual(expected_response, binascii.b2a_hex(response))
+
+    @mock.patch('designate.dnsutils.do_axfr')
+    def test_receive_notify_serial_behind(self, doaxfr):
+        """
+        Get a NOTIFY while the masters have a newer serial and ensure an AXFR
+        is triggered
+        """
+        payload = ("1a7220000001000000000000076578616d706c6503636f6d000006"
+                  "0001")
+        self.handler.masters = [{'ip': '127.0.0.1', 'port': 5354}]
+        request = dns.message.from_wire(binascii.a2b_hex(payload))
+        request.environ = {'addr': ["0.0.0.0", 1234]}
+
+        with mock.patch.object(dns.query, 'udp',
+                               return_value=self._make_soa_response(1)):
+            self.handler(request)
+            self.handler.transfers.wait()
+
+        self.assertTrue(doaxfr.called)
+
+    @mock.patch('designate.dnsutils.do_axfr')
+    def test_receive_notify_serial_query_fails(self, doaxfr):
+        """
+        Get a NOTIFY while the masters can't be queried and ensure an AXFR
+        is still triggered
+        """
+        payload = ("1a7220000001000000000000076578616d706c6503636f6d000006"
+                  "0001")
+        self.handler.masters = [{'ip': '127.0.0.1', 'port': 5354}]
+        request = dns.message.from_wire(binascii.a2b_hex(payload))
+        request.environ = {'addr': ["0.0.0.0", 1234]}
+
+        with mock.patch.object(dns.query, 'udp',
+                               side_effect=dns.exception.Timeout):
+            self.handler(request)
+            self.handler.transfers.wait()
+
+        self.assertTrue(doaxfr.called)
+
+    def test_serial_gt(self):
+        self.assertTrue(handler._serial_gt(2, 1))
+        self.assertFalse(handler._serial_gt(1, 1))
+        self.assertFalse(handler._serial_gt(1, 2))
+        # Wrap around
+        self.assertTrue(handler._serial_gt(1, 2 ** 32 - 1))
+        self.assertFalse(handler._serial_gt(2 ** 32 - 1, 1))
+
     def test_receive_notify_bad_notifier(self):
         """
         Get a NOTIFY from a bad master and refuse it
@@ -111,6 +199,32 @@ class AgentRequestHandlerTest(AgentTestCase):
             response = self.handler(request).to_wire()
             self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+            self.handler.transfers.wait()
+            self.assertTrue(doaxfr.called)
+
+    @mock.patch('designate.dnsutils.do_axfr')
+    def test_receive_notify_pending_create(self, doaxfr):
+        """
+        Get a NOTIFY for a zone with a queued CREATE, and ensure it's
+        accepted and collapsed into the CREATE
+        """
+        payload = ("1a7220000001000000000000076578616d706c6503636f6d000006"
+                  "0001")
+        expected_response = ("1a72a4000001000000000000076578616d706c650363"
+                            "6f6d0000060001")
+        request = dns.message.from_wire(binascii.a2b_hex(payload))
+        request.environ = {'addr': ["0.0.0.0", 1234]}
+
+        with mock.patch.object(
+            designate.backend.agent_backend.impl_fake.FakeBackend,
+                'find_domain_serial', return_value=None):
+            self.handler.transfers.pending['example.com.'] = 'CREATE'
+
+            response = self.handler(request).to_wire()
+            self.assertEqual(expected_response, binascii.b2a_hex(response))
+            self.assertEqual({'example.com.': 'CREATE'},
+                             self.handler.transfers.pending)
+
     def test_receive_create_bad_notifier(self):
         """
         Get a NOTIFY from a bad master and refuse it
@@ -158,6 +272,43 @@ class AgentRequestHandlerTest(AgentTestCase):
 
         self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+    @mock.patch('designate.dnsutils.do_axfr')
+    def test_receive_delete_during_create(self, doaxfr):
+        """
+        Get a DELETE while the zone's CREATE is transferring, and ensure the
+        zone is deleted once the transfer completes
+        """
+        backend = self.handler.backend
+        created = set()
+        responses = []
+
+        def create_domain_xfr(domain_name, axfr):
+            # The DELETE arrives mid transfer
+            responses.append(self.handler(delete_request))
+            created.add(domain_name)
+
+        create_request = dns.message.from_wire(binascii.a2b_hex(
+            "735d70000001000000000000076578616d706c6503636f6d00ff02ff00"))
+        create_request.environ = {'addr': ["0.0.0.0", 1234]}
+        delete_request = dns.message.from_wire(binascii.a2b_hex(
+            "3b9970000001000000000000076578616d706c6503636f6d00ff03ff00"))
+        delete_request.environ = {'addr': ["0.0.0.0", 1234]}
+
+        with mock.patch.object(
+                backend, 'find_domain_serial',
+                side_effect=lambda name: 1 if name in created else None), \
+                mock.patch.object(backend, 'create_domain_xfr',
+                                  side_effect=create_domain_xfr), \
+                mock.patch.object(backend, 'delete_domain',
+                                  side_effect=created.discard) as delete:
+            self.handler(create_request)
+            self.handler.transfers.wait()
+
+        self.assertEqual(dns.rcode.NOERROR, responses[0].rcode())
+        delete.assert_called_once_with('example.com.')
+        self.assertEqual(set(), created)
+        self.assertFalse(self.handler.transfers.is_pending('example.com.'))
+
     def test_receive_delete_bad_notifier(self):
         """
         Get a message with an unsupported OPCODE and make
@@ -207,5 +358,83 @@ class AgentRequestHandlerTest(AgentTestCase):
             designate.backend.agent_backend.impl_fake.FakeBackend,
                 'find_domain_serial', return_value=None):
             response = self.handler(request).to_wire()
-            doaxfr.assert_called_with('example.com.', [], source="1.2.3.4")
+            self.handler.transfers.wait()
+            doaxfr.assert_called_with('example.com.', [], source="1.2.3.4",
+                                      timeout=10.0, connect_timeout=5.0)
             self.assertEqual(expected_response, binascii.b2a_hex(response))
+
+
+class TransferQueueTest(AgentTestCase):
+    def setUp(self):
+        super(TransferQueueTest, self).setUp()
+        self.calls = []
+        self.queue = handler.TransferQueue(self._callback, 2)
+
+    def _callback(self, domain_name, action):
+        self.calls.append((domain_name, action))
+        eventlet.sleep(0)
+
+    def test_collapse_pending(self):
+        self.queue.enqueue('example.com.', 'NOTIFY')
+        self.queue.enqueue('example.com.', 'NOTIFY')
+        self.queue.enqueue('example.com.', 'CREATE')
+        self.queue.enqueue('example.com.', 'NOTIFY')
+        self.queue.wait()
+
+        self.assertEqual([('example.com.', 'CREATE')], self.calls)
+
+    def test_requeue_while_in_progress(self):
+        self.queue.enqueue('example.com.', 'CREATE')
+
+        # Let the worker pick up the CREATE
+        eventlet.sleep(0)
+        self.assertTrue(self.queue.is_pending('example.com.'))
+
+        self.queue.enqueue('example.com.', 'NOTIFY')
+        self.queue.enqueue('example.com.', 'NOTIFY')
+        self.queue.wait()
+
+        self.assertEqual([('example.com.', 'CREATE'),
+                          ('example.com.', 'NOTIFY')], self.calls)
+        self.assertFalse(self.queue.is_pending('example.com.'))
+
+    def test_bounded_workers(self):
+        for name in ('a.com.', 'b.com.', 'c.com.', 'd.com.'):
+            self.queue.enqueue(name, 'NOTIFY')
+
+        self.assertEqual(0, self.queue.pool.free())
+        self.queue.wait()
+
+        self.assertEqual(4, len(self.calls))
+
+    def test_discard(self):
+        self.queue.enqueue('example.com.', 'CREATE')
+        self.queue.discard('example.com.')
+        self.queue.wait()
+
+        self.assertEqual([], self.calls)
+
+    def test_discard_in_progress(self):
+        self.queue.enqueue('example.com.', 'CREATE')
+
+        # Let the worker pick up the CREATE
+        eventlet.sleep(0)
+        self.queue.enqueue('example.com.', 'NOTIFY')
+
+        self.assertTrue(self.queue.discard('example.com.'))
+        self.queue.wait()
+
+        self.assertEqual([('example.com.', 'CREATE'),
+                          ('example.com.', 'DELETE')], self.calls)
+
+    def test_callback_failure(self):
+        def callback(domain_name, action):
+            self.calls.append((domain_name, action))
+            raise Exception('Failed')
+
+        self.queue.callback = callback
+        self.queue.enqueue('a.com.', 'NOTIFY')
+        self.queue.enqueue('b.com.', 'NOTIFY')
+        self.queue.wait()
+
+        self.assertEqual(2, len(self.calls))
@@ -140,6 +140,172 @@ class ApiV2RecordSetsTest(ApiV2TestCase):
         self._assert_exception('duplicate_recordset', 409,
                                self.client.post_json, url, body)
 
+    def test_create_recordsets_bulk(self):
+        fixtures = [
+            self.get_recordset_fixture(self.domain['name'], fixture=0),
+            self.get_recordset_fixture(
+                self.domain['name'], fixture=1,
+                values={'records': ['192.0.2.1', '192.0.2.2']}),
+        ]
+
+        response = self.client.post_json(
+            '/zones/%s/recordsets:bulk' % self.domain['id'],
+            {'recordsets': fixtures})
+
+        # Check the headers are what we expect
+        self.assertEqual(202, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+
+        # Check the body structure is what we expect
+        self.assertIn('recordsets', response.json)
+        self.assertEqual(2, len(response.json['recordsets']))
+
+        # Check the values returned are what we expect
+        self.assertEqual([f['name'] for f in fixtures],
+                         [r['name'] for r in response.json['recordsets']])
+        self.assertEqual(2, len(response.json['recordsets'][1]['records']))
+        self.assertEqual('PENDING', response.json['recordsets'][1]['status'])
+
+    def test_create_recordsets_bulk_validation(self):
+        fixture = self.get_recordset_fixture(self.domain['name'], fixture=0)
+        fixture['junk'] = 'Junk Field'
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        # Ensure it fails with a 400
+        self._assert_exception(
+            'invalid_object', 400, self.client.post_json, url,
+            {'recordsets': [fixture]})
+
+        # Nothing was created
+        response = self.client.get('/zones/%s/recordsets' % self.domain['id'])
+        self.assertEqual(2, len(response.json['recordsets']))
+
+    def test_create_recordsets_bulk_soa(self):
+        fixture = self.get_recordset_fixture(
+            self.domain['name'], values={'type': 'SOA'})
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        self._assert_exception(
+            'bad_request', 400, self.client.post_json, url,
+            {'recordsets': [fixture]})
+
+    def test_create_recordsets_bulk_too_many(self):
+        self.config(max_bulk_recordsets_v2=1, group='service:api')
+
+        fixtures = [
+            self.get_recordset_fixture(self.domain['name'], fixture=0),
+            self.get_recordset_fixture(self.domain['name'], fixture=1),
+        ]
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        self._assert_exception(
+            'bad_request', 400, self.client.post_json, url,
+            {'recordsets': fixtures})
+
+    def test_update_recordsets_bulk(self):
+        recordset_one = self.create_recordset(self.domain, fixture=0)
+        recordset_two = self.create_recordset(self.domain, fixture=1)
+
+        body = {'recordsets': [
+            {'id': recordset_two['id'], 'ttl': 600},
+            {'id': recordset_one['id'], 'records': ['192.0.2.1']},
+        ]}
+
+        response = self.client.patch_json(
+            '/zones/%s/recordsets:bulk' % self.domain['id'], body)
+
+        # Check the headers are what we expect
+        self.assertEqual(202, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+
+        # The results are in the order of the request
+        results = response.json['recordsets']
+        self.assertEqual([recordset_two['id'], recordset_one['id']],
+                         [r['id'] for r in results])
+
+        self.assertEqual(600, results[0]['ttl'])
+        self.assertEqual(['192.0.2.1'], results[1]['records'])
+        self.assertEqual('PENDING', results[1]['status'])
+
+    def test_update_recordsets_bulk_validation(self):
+        recordset_one = self.create_recordset(self.domain, fixture=0)
+        recordset_two = self.create_recordset(self.domain, fixture=1)
+
+        body = {'recordsets': [
+            {'id': recordset_one['id'], 'ttl': 600},
+            {'id': recordset_two['id'], 'ttl': -1},
+        ]}
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        response = self.client.patch_json(url, body, status=400)
+
+        # The error points at the invalid recordset
+        self.assertEqual('invalid_object', response.json['type'])
+        self.assertEqual(['recordsets.1.ttl'],
+                         [e['path'] for e in response.json['errors']])
+
+        # Neither recordset was updated
+        recordset = self.central_service.get_recordset(
+            self.admin_context, self.domain['id'], recordset_one['id'])
+        self.assertIsNone(recordset.ttl)
+
+    def test_update_recordsets_bulk_missing(self):
+        recordset = self.create_recordset(self.domain)
+
+        body = {'recordsets': [
+            {'id': recordset['id'], 'ttl': 600},
+            {'id': 'caf771fc-6b05-4891-bee1-c2a48621f57b', 'ttl': 600},
+        ]}
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        self._assert_exception(
+            'recordset_not_found', 404, self.client.patch_json, url, body)
+
+    def test_update_recordsets_bulk_duplicate_ids(self):
+        recordset = self.create_recordset(self.domain)
+
+        body = {'recordsets': [
+            {'id': recordset['id'], 'ttl': 600},
+            {'id': recordset['id'], 'ttl': 300},
+        ]}
+
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        self._assert_exception(
+            'bad_request', 400, self.client.patch_json, url, body)
+
+    def test_delete_recordsets_bulk(self):
+        recordset_one = self.create_recordset(self.domain, fixture=0)
+        recordset_two = self.create_recordset(self.domain, fixture=1)
+
+        body = {'recordsets': [
+            {'id': recordset_one['id']},
+            {'id': recordset_two['id']},
+        ]}
+
+        response = self.client.delete_json(
+            '/zones/%s/recordsets:bulk' % self.domain['id'], body)
+
+        self.assertEqual(202, response.status_int)
+        self.assertEqual([recordset_one['id'], recordset_two['id']],
+                         [r['id'] for r in response.json['recordsets']])
+
+        # Only the SOA and NS recordsets remain
+        response = self.client.get('/zones/%s/recordsets' % self.domain['id'])
+        self.assertEqual(2, len(response.json['recordsets']))
+
+    def test_delete_recordsets_bulk_invalid_id(self):
+        url = '/zones/%s/recordsets:bulk' % self.domain['id']
+
+        self._assert_exception(
+            'invalid_uuid', 400, self.client.delete_json, url,
+            {'recordsets': [{'id': 'junk'}]})
+
     def test_create_recordset_invalid_domain(self):
         fixture = self.get_recordset_fixture(self.domain['name'], fixture=0)
 
@@ -599,7 +765,7 @@ class ApiV2RecordSetsTest(ApiV2TestCase):
             self.client.delete, '/zones/%s/recordsets/%s')
 
     def test_metadata_exists(self):
-        url = '/zones/%s/recordsets' % self.domain['id']
+        url = '/zones/%s/recordsets?total_count=true' % self.domain['id']
 
         response = self.client.get(url)
 
@@ -608,7 +774,7 @@ class ApiV2RecordSetsTest(ApiV2TestCase):
         self.assertIn('total_count', response.json['metadata'])
 
     def test_total_count(self):
-        url = '/zones/%s/recordsets' % self.domain['id']
+        url = '/zones/%s/recordsets?total_count=true' % self.domain['id']
 
         response = self.client.get(url)
 
@@ -636,7 +802,8 @@ class ApiV2RecordSetsTest(ApiV2TestCase):
             '/zones/%s/recordsets' % self.domain['id'], {'recordset': fixture})
 
         # Paginate the recordsets to two, there should be four now
-        url = '/zones/%s/recordsets?limit=2' % self.domain['id']
+        url = '/zones/%s/recordsets?limit=2&total_count=true' % \
+            self.domain['id']
 
         response = self.client.get(url)
 
@@ -13,13 +13,17 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import urlparse
+
 from dns import zone as dnszone
 from mock import patch
 from oslo import messaging
 from oslo_log import log as logging
 
 from designate import exceptions
+from designate.api.v2.controllers import zones
 from designate.central import service as central_service
+from designate.openstack.common import threadgroup
 from designate.tests.test_api.test_v2 import ApiV2TestCase
 
 
@@ -436,16 +440,162 @@ class ApiV2ZonesTest(ApiV2TestCase):
         imported.delete_rdataset('delegation', 'NS')
         self.assertEqual(imported, exported)
 
+    def test_export_paged(self):
+        domain = self.create_domain()
+
+        recordset = self.create_recordset(domain, fixture=0)
+        self.create_record(domain, recordset, fixture=0)
+        self.create_record(domain, recordset, fixture=1)
+
+        recordset = self.create_recordset(domain, type='MX')
+        self.create_record(domain, recordset)
+
+        # Export the zone a record at a time, ensuring the pages join up
+        with patch.object(zones.ZonesController, 'EXPORT_PAGE_SIZE', 1):
+            with patch.object(central_service.Service, 'find_export_records',
+                              wraps=self.central_service.find_export_records
+                              ) as mock_find:
+                response = self.client.get(
+                    '/zones/%s' % domain['id'],
+                    headers={'Accept': 'text/dns'})
+
+        self.assertEqual(200, response.status_int)
+        self.assertEqual('text/dns', response.content_type)
+
+        # SOA, NS, 2 A and MX records, and a final empty page
+        self.assertEqual(6, mock_find.call_count)
+
+        exported = dnszone.from_text(response.body)
+
+        rdataset = exported.get_rdataset('mail', 'A')
+        self.assertEqual(set(['192.0.2.1', '192.0.2.2']),
+                         set(r.to_text() for r in rdataset))
+        self.assertIsNotNone(exported.get_rdataset('mail', 'MX'))
+
+    def test_export_soa_first(self):
+        domain = self.create_domain()
+
+        # Named to sort before the apex
+        recordset = self.create_recordset(
+            domain, name='a.%s' % domain['name'])
+        self.create_record(domain, recordset)
+
+        response = self.client.get('/zones/%s' % domain['id'],
+                                   headers={'Accept': 'text/dns'})
+
+        # The first record follows the $ORIGIN and $TTL statements
+        lines = [l for l in response.body.splitlines() if l.strip()]
+        fields = lines[2].split()
+
+        self.assertEqual(domain['name'], fields[0])
+        self.assertEqual('SOA', fields[fields.index('IN') + 1])
+
+    def _post_zone_import(self, zonefile):
+        # Run the import in the foreground, rather than in a new thread
+        def add_thread(func, *args, **kwargs):
+            func(*args, **kwargs)
+
+        with patch.object(threadgroup.ThreadGroup, 'add_thread',
+                          side_effect=add_thread):
+            return self.client.post('/zones/tasks/imports', zonefile,
+                                    headers={'Content-type': 'text/dns'})
+
+    def test_zone_import(self):
+        response = self._post_zone_import(self.get_zonefile_fixture())
+
+        # The import is accepted before the zonefile is processed
+        self.assertEqual(202, response.status_int)
+        self.assertEqual('PENDING', response.json['import']['status'])
+        self.assertTrue(response.headers['Location'].endswith(
+            '/v2/zones/tasks/imports/%s' % response.json['import']['id']))
+
+        response = self.client.get(
+            '/zones/tasks/imports/%s' % response.json['import']['id'])
+        zone_import = response.json['import']
+
+        self.assertEqual('COMPLETE', zone_import['status'])
+        self.assertEqual(8, zone_import['recordsets_imported'])
+        self.assertIn('zone', zone_import['links'])
+
+        response = self.client.get('/zones/%s' % zone_import['zone_id'],
+                                   headers={'Accept': 'application/json'})
+        self.assertEqual('example.com.', response.json['zone']['name'])
+
+    def test_zone_import_malformed(self):
+        response = self._post_zone_import(
+            self.get_zonefile_fixture(variant='malformed'))
+        self.assertEqual(202, response.status_int)
+
+        response = self.client.get(
+            '/zones/tasks/imports/%s' % response.json['import']['id'])
+        zone_import = response.json['import']
+
+        self.assertEqual('ERROR', zone_import['status'])
+        self.assertEqual('Malformed zonefile.', zone_import['message'])
+        self.assertIsNone(zone_import['zone_id'])
+
+    def test_zone_import_invalid_content_type(self):
+        self._assert_exception('unsupported_content_type', 415,
+                               self.client.post_json, '/zones/tasks/imports',
+                               {'zone': self.get_domain_fixture(0)})
+
+    def test_get_zone_imports(self):
+        response = self.client.get('/zones/tasks/imports')
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(0, len(response.json['imports']))
+
+        self._post_zone_import(self.get_zonefile_fixture())
+
+        response = self.client.get('/zones/tasks/imports')
+        self.assertEqual(1, len(response.json['imports']))
+
+    def test_delete_zone_import(self):
+        response = self._post_zone_import(
+            self.get_zonefile_fixture(variant='malformed'))
+        url = '/zones/tasks/imports/%s' % response.json['import']['id']
+
+        response = self.client.delete(url, status=204)
+        self.assertEqual(204, response.status_int)
+
+        self._assert_exception('zone_import_not_found', 404,
+                               self.client.get, url)
+
     def test_metadata_exists(self):
-        response = self.client.get('/zones/')
+        response = self.client.get('/zones/?total_count=true')
 
         # Make sure the fields exist
         self.assertIn('metadata', response.json)
         self.assertIn('total_count', response.json['metadata'])
 
-    def test_total_count(self):
+    def test_paging_next_link(self):
+        zones = []
+        for fixture in range(3):
+            response = self.client.post_json(
+                '/zones/', {'zone': self.get_domain_fixture(fixture)})
+            zones.append(response.json['zone'])
+
+        response = self.client.get('/zones/?limit=2')
+        self.assertEqual([zones[0]['id'], zones[1]['id']],
+                         [z['id'] for z in response.json['zones']])
+
+        # The next link carries a cursor rather than the last zone's ID
+        next_link = response.json['links']['next']
+        self.assertNotIn(zones[1]['id'], next_link)
+
+        response = self.client.get(
+            '/zones/?%s' % urlparse.urlparse(next_link).query)
+        self.assertEqual([zones[2]['id']],
+                         [z['id'] for z in response.json['zones']])
+
+    def test_total_count_opt_in(self):
         response = self.client.get('/zones/')
 
+        # The zones aren't counted unless asked to be
+        self.assertNotIn('total_count', response.json['metadata'])
+
+    def test_total_count(self):
+        response = self.client.get('/zones/?total_count=true')
+
         # There are no zones by default
         self.assertEqual(0, response.json['metadata']['total_count'])
 
@@ -453,7 +603,7 @@ class ApiV2ZonesTest(ApiV2TestCase):
         fixture = self.get_domain_fixture(0)
         response = self.client.post_json('/zones/', {'zone': fixture})
 
-        response = self.client.get('/zones/')
+        response = self.client.get('/zones/?total_count=true')
 
         # Make sure total_count picked it up
         self.assertEqual(1, response.json['metadata']['total_count'])
@@ -467,7 +617,7 @@ class ApiV2ZonesTest(ApiV2TestCase):
         response = self.client.post_json('/zones/', {'zone': fixture})
 
         # Paginate so that there is only one zone returned
-        response = self.client.get('/zones?limit=1')
+        response = self.client.get('/zones?limit=1&total_count=true')
 
         self.assertEqual(1, len(response.json['zones']))
 
@@ -0,0 +1,125 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import time
+
+import eventlet
+import mock
+import testtools
+from oslo.config import cfg
+
+from designate import exceptions
+from designate import objects
+from designate.tests.test_backend import BackendTestCase
+from designate.backend import impl_multi
+
+
+class MultiBackendTestCase(BackendTestCase):
+    def setUp(self):
+        super(MultiBackendTestCase, self).setUp()
+
+        for group, opts in impl_multi.MultiBackend.get_cfg_opts():
+            cfg.CONF.register_group(group)
+            cfg.CONF.register_opts(opts, group=group)
+
+        self.config(timeout=1, group=impl_multi.CFG_GROUP)
+
+        self.master = mock.Mock()
+        self.slave = mock.Mock()
+
+        with mock.patch('designate.backend.get_backend',
+                        side_effect=[self.master, self.slave]):
+            self.backend = impl_multi.MultiBackend(mock.Mock())
+
+        self.context = self.get_context()
+        self.tsigkey = objects.TsigKey(name='test-key')
+        self.domain = objects.Domain(name='example.com.')
+
+    def test_create_tsigkey(self):
+        self.backend.create_tsigkey(self.context, self.tsigkey)
+
+        self.master.create_tsigkey.assert_called_once_with(
+            self.context, self.tsigkey)
+        self.slave.create_tsigkey.assert_called_once_with(
+            self.context, self.tsigkey)
+
+    def test_create_tsigkey_slave_fails(self):
+        self.slave.create_tsigkey.side_effect = exceptions.Backend
+
+        with testtools.ExpectedException(exceptions.Backend):
+            self.backend.create_tsigkey(self.context, self.tsigkey)
+
+        # The key is removed from the master again
+        self.master.delete_tsigkey.assert_called_once_with(
+            self.context, self.tsigkey)
+        self.assertFalse(self.slave.delete_tsigkey.called)
+
+    def test_delete_tsigkey_master_fails(self):
+        self.master.delete_tsigkey.side_effect = exceptions.Backend
+
+        with testtools.ExpectedException(exceptions.Backend):
+            self.backend.delete_tsigkey(self.context, self.tsigkey)
+
+        # The key is recreated on the slave
+        self.slave.create_tsigkey.assert_called_once_with(
+            self.context, self.tsigkey)
+        self.assertFalse(self.master.create_tsigkey.called)
+
+    def test_create_domain_slave_fails(self):
+        self.slave.create_domain.side_effect = exceptions.Backend
+
+        with testtools.ExpectedException(exceptions.Backend):
+            self.backend.create_domain(self.context, self.domain)
+
+        self.master.delete_domain.assert_called_once_with(
+            self.context, self.domain)
+
+    def test_ping_is_concurrent(self):
+        def ping(context):
+            eventlet.sleep(0.1)
+            return {'status': True}
+
+        self.master.ping.side_effect = ping
+        self.slave.ping.side_effect = ping
+
+        start_time = time.time()
+        result = self.backend.ping(self.context)
+
+        # Both backends were pinged at the same time
+        self.assertTrue(time.time() - start_time < 0.2)
+        self.assertEqual({'master': {'status': True},
+                          'slave': {'status': True}}, result)
+
+        timings = self.backend.get_timings()
+        self.assertEqual(1, timings['master']['ping']['count'])
+        self.assertEqual(1, timings['slave']['ping']['count'])
+
+    def test_call_timeout(self):
+        self.backend.timeout = 0.01
+
+        self.slave.ping.side_effect = lambda context: eventlet.sleep(1)
+
+        with testtools.ExpectedException(impl_multi.MultiBackendTimeout):
+            self.backend.ping(self.context)
+
+    def test_timings(self):
+        self.backend.create_record(self.context, self.domain, None, None)
+        self.backend.create_record(self.context, self.domain, None, None)
+
+        stats = self.backend.get_timings()['master']['create_record']
+
+        self.assertEqual(2, stats['count'])
+        self.assertTrue(stats['max'] <= stats['total'])
+        self.assertEqual({}, self.backend.get_timings()['slave'])
+
+        self.backend.reset_timings()
+        self.assertEqual({'master': {}, 'slave': {}},
+                         self.backend.get_timings())
@@ -16,15 +16,20 @@
 # under the License.
 import copy
 import random
+import re
 
 import testtools
 from testtools.matchers import GreaterThan
 from mock import patch
 from oslo_log import log as logging
 from oslo_db import exception as db_exception
+from sqlalchemy import event
 
 from designate import exceptions
 from designate import objects
+from designate.central import service as central_service
+from designate.sqlalchemy import session
+from designate.storage import impl_sqlalchemy
 from designate.tests.test_central import CentralTestCase
 
 LOG = logging.getLogger(__name__)
@@ -82,6 +87,30 @@ class CentralServiceTest(CentralTestCase):
             with testtools.ExpectedException(exceptions.InvalidDomainName):
                 self.central_service._is_valid_domain_name(context, 'biz.')
 
+    def test_is_valid_domain_name_tlds_cached(self):
+        self.create_tld(name='org')
+
+        context = self.get_context()
+
+        with patch.object(self.central_service.storage, 'find_tlds',
+                          wraps=self.central_service.storage.find_tlds
+                          ) as find_tlds:
+            self.central_service._is_valid_domain_name(context, 'a.org.')
+            self.central_service._is_valid_domain_name(context, 'b.org.')
+
+            # The TLDs are loaded once, until they change
+            self.assertEqual(1, find_tlds.call_count)
+
+            with testtools.ExpectedException(exceptions.InvalidDomainName):
+                self.central_service._is_valid_domain_name(context, 'a.net.')
+
+            # A TLD created through another central is picked up
+            self.storage.create_tld(self.admin_context,
+                                    objects.Tld(name='net'))
+
+            self.central_service._is_valid_domain_name(context, 'a.net.')
+            self.assertEqual(2, find_tlds.call_count)
+
     def test_is_valid_recordset_name(self):
         self.config(max_recordset_name_len=18,
                     group='service:central')
@@ -144,6 +173,63 @@ class CentralServiceTest(CentralTestCase):
 
         self.assertTrue(result)
 
+    def test_is_blacklisted_domain_name_groups_and_flags(self):
+        # These are searched for apart from the combined patterns
+        self.create_blacklist(pattern='^(www|mail)\\.example\\.org\\.$')
+        self.create_blacklist(pattern='(?i)^EXAMPLE\\.NET\\.$')
+        self.create_blacklist(pattern='^example\\.com\\.$')
+
+        context = self.get_context()
+
+        for domain_name in ('www.example.org.', 'example.net.',
+                            'example.com.'):
+            self.assertTrue(self.central_service._is_blacklisted_domain_name(
+                context, domain_name))
+
+        # The case insensitive flag only applies to its own pattern
+        for domain_name in ('ftp.example.org.', 'EXAMPLE.COM.'):
+            self.assertFalse(self.central_service._is_blacklisted_domain_name(
+                context, domain_name))
+
+    def test_is_blacklisted_domain_name_cached(self):
+        blacklist = self.create_blacklist(pattern='^example\\.org\\.$')
+
+        context = self.get_context()
+
+        with patch.object(self.central_service.storage, 'find_blacklists',
+                          wraps=self.central_service.storage.find_blacklists
+                          ) as find_blacklists:
+            self.assertTrue(self.central_service._is_blacklisted_domain_name(
+                context, 'example.org.'))
+            self.assertFalse(self.central_service._is_blacklisted_domain_name(
+                context, 'example.net.'))
+
+            # The blacklists are compiled once, until they change
+            self.assertEqual(1, find_blacklists.call_count)
+
+            blacklist.pattern = '^example\\.net\\.$'
+            self.central_service.update_blacklist(self.admin_context,
+                                                  blacklist)
+
+            self.assertFalse(self.central_service._is_blacklisted_domain_name(
+                context, 'example.org.'))
+            self.assertTrue(self.central_service._is_blacklisted_domain_name(
+                context, 'example.net.'))
+            self.assertEqual(2, find_blacklists.call_count)
+
+    def test_is_blacklisted_domain_name_changed_elsewhere(self):
+        context = self.get_context()
+
+        self.assertFalse(self.central_service._is_blacklisted_domain_name(
+            context, 'example.org.'))
+
+        # A blacklist created through another central moves the version
+        self.storage.create_blacklist(
+            self.admin_context, objects.Blacklist(pattern='example.org.'))
+
+        self.assertTrue(self.central_service._is_blacklisted_domain_name(
+            context, 'example.org.'))
+
     def test_is_subdomain(self):
         context = self.get_context()
 
@@ -164,6 +250,116 @@ class CentralServiceTest(CentralTestCase):
                                                     'www.example.org.')
         self.assertTrue(result)
 
+    def test_is_subdomain_indexed(self):
+        context = self.get_context()
+
+        domain = self.create_domain(name='example.org.')
+
+        # Only the parent domain itself is fetched from storage
+        with patch.object(self.central_service.storage, 'find_domain',
+                          side_effect=AssertionError) as find_domain:
+            result = self.central_service._is_subdomain(
+                context, 'www.EXAMPLE.org.')
+            self.assertEqual(domain.id, result.id)
+
+            result = self.central_service._is_subdomain(
+                context, 'www.example.net.')
+            self.assertFalse(result)
+
+        self.assertFalse(find_domain.called)
+
+    def test_is_subdomain_changed_elsewhere(self):
+        context = self.get_context()
+        admin_context = self.get_admin_context()
+
+        self.assertFalse(self.central_service._is_subdomain(
+            context, 'www.example.org.'))
+
+        # A domain created through another central is picked up
+        values = self.get_domain_fixture(values={'name': 'example.org.'})
+        domain = self.storage.create_domain(
+            admin_context, objects.Domain.from_dict(values))
+
+        result = self.central_service._is_subdomain(
+            context, 'www.example.org.')
+        self.assertEqual(domain.id, result.id)
+
+        # As is its deletion
+        self.storage.delete_domain(admin_context, domain.id)
+
+        self.assertFalse(self.central_service._is_subdomain(
+            context, 'www.example.org.'))
+
+    def test_is_subdomain_deleted_parent(self):
+        context = self.get_context()
+
+        domain = self.create_domain(name='example.org.')
+        self.central_service._is_subdomain(context, 'www.example.org.')
+
+        # The parent disappears without the index seeing it
+        with patch.object(self.central_service.storage,
+                          'find_domain_name_changes', return_value=[]):
+            self.storage.delete_domain(self.admin_context, domain.id)
+
+            self.assertFalse(self.central_service._is_subdomain(
+                context, 'www.example.org.'))
+
+    def test_is_subdomain_index_unavailable(self):
+        context = self.get_context()
+
+        domain = self.create_domain(name='example.org.')
+
+        # Storage is searched when the index can't be synced
+        with patch.object(self.central_service.storage,
+                          'find_domain_name_changes',
+                          side_effect=Exception):
+            result = self.central_service._is_subdomain(
+                context, 'www.example.org.')
+
+        self.assertEqual(domain.id, result.id)
+
+    def test_is_superdomain_indexed(self):
+        context = self.get_context()
+
+        self.create_domain(name='example.org.')
+
+        # Subdomains are only searched for in storage when there are any
+        with patch.object(self.central_service.storage, 'find_domains',
+                          wraps=self.central_service.storage.find_domains
+                          ) as find_domains:
+            self.assertFalse(self.central_service._is_superdomain(
+                context, 'example.net.'))
+            self.assertFalse(find_domains.called)
+
+            self.assertTrue(self.central_service._is_superdomain(
+                context, 'org.'))
+            self.assertTrue(find_domains.called)
+
+    def test_zone_name_index(self):
+        index = central_service.ZoneNameIndex()
+
+        index.add('example.org.', 'parent')
+        index.add('sub.example.org.', 'child')
+
+        self.assertEqual('child', index.find_parent('www.sub.example.org.'))
+        self.assertEqual('parent', index.find_parent('sub.example.org.'))
+        self.assertIsNone(index.find_parent('example.org.'))
+        self.assertTrue(index.has_children('org.'))
+        self.assertTrue(index.has_children('example.org.'))
+        self.assertFalse(index.has_children('sub.example.org.'))
+
+        # A name reused by another domain is not removed with the first
+        index.add('sub.example.org.', 'new-child')
+        index.remove('sub.example.org.', 'child')
+        self.assertEqual('new-child',
+                         index.find_parent('www.sub.example.org.'))
+
+        index.remove('sub.example.org.', 'new-child')
+        self.assertFalse(index.has_children('example.org.'))
+
+        index.remove('example.org.', 'parent')
+        self.assertEqual({}, index.root)
+
     def test_is_superdomain(self):
         context = self.get_context()
 
@@ -775,6 +971,211 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(domain['email'], expected_domain['email'])
         self.assertIn('status', domain)
 
+    def _get_retry_delays(self, sleep):
+        # Ignore the sleep(0) calls which yield to other greenthreads
+        return [c[0][0] for c in sleep.call_args_list if c[0][0] != 0]
+
+    def _fail_with_deadlocks(self, method, failures):
+        central_service.RETRY_COUNTERS.clear()
+        central_service.RETRY_DOMAINS.clear()
+
+        calls = {'count': 0}
+        original = getattr(self.central_service.storage, method)
+
+        def side_effect(*args, **kwargs):
+            calls['count'] += 1
+            if calls['count'] <= failures:
+                raise db_exception.DBDeadlock()
+            return original(*args, **kwargs)
+
+        return patch.object(self.central_service.storage, method,
+                            side_effect=side_effect)
+
+    def test_update_domain_deadlock_backoff(self):
+        self.config(retry_delay=100, retry_max_delay=250,
+                    group='service:central')
+
+        domain = self.create_domain()
+        domain.email = 'info@example.net'
+
+        # Always pick the longest delay the jitter allows
+        with self._fail_with_deadlocks('update_domain', 3), \
+                patch.object(central_service.random, 'uniform',
+                             side_effect=lambda low, high: high), \
+                patch.object(central_service.time, 'sleep') as sleep:
+            self.central_service.update_domain(self.admin_context, domain)
+
+        self.assertEqual([0.1, 0.2, 0.25], self._get_retry_delays(sleep))
+
+        domain = self.central_service.get_domain(
+            self.admin_context, domain.id)
+        self.assertEqual('info@example.net', domain.email)
+
+        counters = central_service.get_retry_counters()
+        self.assertEqual({'retries': 3},
+                         counters['methods']['_update_domain_in_storage'])
+        self.assertEqual({domain.id: {'retries': 3}}, counters['domains'])
+
+        # The counters are reported by the central ping
+        pong = self.central_service.ping(self.admin_context)
+        self.assertEqual(counters, pong['retries'])
+
+    def test_update_domain_deadlock_retries_exhausted(self):
+        self.config(retry_attempts=3, group='service:central')
+
+        domain = self.create_domain()
+        domain.email = 'info@example.net'
+
+        with self._fail_with_deadlocks('update_domain', 5), \
+                patch.object(central_service.time, 'sleep') as sleep:
+            with testtools.ExpectedException(db_exception.DBDeadlock):
+                self.central_service.update_domain(
+                    self.admin_context, domain)
+
+        self.assertEqual(2, len(self._get_retry_delays(sleep)))
+
+        counters = central_service.get_retry_counters()
+        self.assertEqual({'retries': 2, 'failures': 1},
+                         counters['methods']['_update_domain_in_storage'])
+        self.assertEqual({'retries': 2, 'failures': 1},
+                         counters['domains'][domain.id])
+
+    def test_retry_counters_bounded(self):
+        central_service.RETRY_COUNTERS.clear()
+        central_service.RETRY_DOMAINS.clear()
+        self.addCleanup(setattr, central_service.DOMAIN_LOCKS, 'held',
+                        set())
+
+        with patch.object(central_service, 'RETRY_DOMAINS_SIZE', 2):
+            for domain_id in ['a', 'b', 'a', 'c']:
+                central_service.DOMAIN_LOCKS.held = set([domain_id])
+                central_service._count_retry('retries', 'create_record')
+
+        counters = central_service.get_retry_counters()
+
+        # The least recently contended domain was forgotten
+        self.assertEqual({'create_record': {'retries': 4}},
+                         counters['methods'])
+        self.assertEqual({'a': {'retries': 2}, 'c': {'retries': 1}},
+                         counters['domains'])
+
+    def test_update_domain_deadlock_budget_exhausted(self):
+        self.config(retry_budget=0, group='service:central')
+
+        domain = self.create_domain()
+        domain.email = 'info@example.net'
+
+        with self._fail_with_deadlocks('update_domain', 1), \
+                patch.object(central_service.time, 'sleep') as sleep:
+            with testtools.ExpectedException(db_exception.DBDeadlock):
+                self.central_service.update_domain(
+                    self.admin_context, domain)
+
+        self.assertEqual([], self._get_retry_delays(sleep))
+
+    def _use_replica_storage(self):
+        # Use the test database as its own replica, and leave the guarding
+        # of reads to central
+        self.config(slave_connection=self.db_fixture.url,
+                    replica_write_window=0,
+                    group='storage:sqlalchemy')
+
+        facades = patch.dict(session._FACADES, clear=True)
+        facades.start()
+        self.addCleanup(facades.stop)
+
+        self.central_service.storage = impl_sqlalchemy.SQLAlchemyStorage()
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if re.search(r'FROM (domains|recordsets|records)\b', statement):
+                statements.append(statement)
+
+        engine = self.central_service.storage.replica_engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute',
+                        before_cursor_execute)
+
+        return statements
+
+    def test_get_domain_replica_reads(self):
+        replica = self._use_replica_storage()
+        domain = self.create_domain()
+
+        self.central_service.get_domain(self.admin_context, domain.id)
+
+        self.assertEqual(1, len(replica))
+
+    def test_get_domain_replica_reads_under_lock(self):
+        replica = self._use_replica_storage()
+        domain = self.create_domain()
+
+        self.addCleanup(setattr, central_service.DOMAIN_LOCKS, 'held',
+                        set())
+        central_service.DOMAIN_LOCKS.held = set([domain.id])
+
+        # A read made while holding the domain's lock sees the primary
+        self.central_service.get_domain(self.admin_context, domain.id)
+
+        self.assertEqual(0, len(replica))
+
+    def test_update_recordset_replica_reads(self):
+        replica = self._use_replica_storage()
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+
+        recordset.ttl = 1800
+        self.central_service.update_recordset(self.admin_context, recordset)
+
+        self.create_record(domain, recordset)
+        self.central_service.update_domain(
+            self.admin_context,
+            self.central_service.get_domain(self.admin_context, domain.id))
+        del replica[:]
+
+        self.central_service.delete_domain(self.admin_context, domain.id)
+
+        # Read-modify-write paths never read from the replica
+        self.assertEqual(0, len(replica))
+
+    def test_update_domain_locked(self):
+        self.config(lock_timeout=0.1, group='service:central')
+
+        domain = self.create_domain()
+        domain.email = 'info@example.net'
+
+        lock_manager = self.central_service.lock_manager
+        token = lock_manager.try_acquire('domain-%s' % domain.id)
+
+        try:
+            with testtools.ExpectedException(exceptions.LockTimeout):
+                self.central_service.update_domain(self.admin_context, domain)
+        finally:
+            lock_manager.release('domain-%s' % domain.id, token)
+
+        # The contention is reported by the central ping
+        pong = self.central_service.ping(self.admin_context)
+        self.assertEqual(1, pong['locks']['timeouts'])
+        self.assertEqual(1, pong['locks']['contended'])
+
+    def test_update_domain_failure_releases_lock(self):
+        domain = self.create_domain()
+        domain.email = 'info@example.net'
+
+        with patch.object(self.central_service.storage, 'update_domain',
+                          side_effect=ValueError):
+            with testtools.ExpectedException(ValueError):
+                self.central_service.update_domain(self.admin_context, domain)
+
+        self.assertNotIn(domain.id, central_service.DOMAIN_LOCKS.held)
+
+        token = self.central_service.lock_manager.try_acquire(
+            'domain-%s' % domain.id)
+        self.assertIsNotNone(token)
+        self.central_service.lock_manager.release(
+            'domain-%s' % domain.id, token)
+
     def test_update_domain(self):
         # Create a domain
         domain = self.create_domain(email='info@example.org')
@@ -1533,6 +1934,87 @@ class CentralServiceTest(CentralTestCase):
             self.central_service.delete_recordset(
                 self.admin_context, other_domain['id'], recordset['id'])
 
+    def test_apply_recordset_changes(self):
+        domain = self.create_domain()
+
+        updated = self.create_recordset(domain, fixture=0)
+        deleted = self.create_recordset(domain, type='MX')
+
+        # Update a recordset, and create another with records
+        updated.ttl = 1800
+
+        values = self.get_recordset_fixture(domain['name'], fixture=1)
+        created = objects.RecordSet.from_dict(values)
+        created.records = objects.RecordList(objects=[
+            objects.Record(data='192.0.2.1'),
+            objects.Record(data='192.0.2.2'),
+        ])
+
+        increment_serial = patch.object(
+            self.central_service, '_increment_domain_serial',
+            wraps=self.central_service._increment_domain_serial)
+
+        with increment_serial as mock_increment_serial:
+            with patch.object(self.central_service.pool_manager_api,
+                              'update_domain') as mock_update_domain:
+                results = self.central_service.apply_recordset_changes(
+                    self.admin_context, domain['id'],
+                    create=objects.RecordSetList(objects=[created]),
+                    update=objects.RecordSetList(objects=[updated]),
+                    delete=[deleted['id']])
+
+        # The serial was incremented, and the pool manager told, just once
+        self.assertEqual(1, mock_increment_serial.call_count)
+        self.assertEqual(1, mock_update_domain.call_count)
+
+        self.assertEqual([1, 1, 1], [len(r) for r in results])
+
+        domain = self.central_service.get_domain(
+            self.admin_context, domain['id'])
+
+        recordset = self.central_service.get_recordset(
+            self.admin_context, domain['id'], results[0][0]['id'])
+        self.assertEqual(2, len(recordset.records))
+        for record in recordset.records:
+            self.assertEqual(domain.serial, record.serial)
+
+        recordset = self.central_service.get_recordset(
+            self.admin_context, domain['id'], updated['id'])
+        self.assertEqual(1800, recordset.ttl)
+
+        with testtools.ExpectedException(exceptions.RecordSetNotFound):
+            self.central_service.get_recordset(
+                self.admin_context, domain['id'], deleted['id'])
+
+    def test_apply_recordset_changes_rollback(self):
+        domain = self.create_domain()
+
+        values = self.get_recordset_fixture(domain['name'], fixture=0)
+        valid = objects.RecordSet.from_dict(values)
+        invalid = objects.RecordSet(name='www.example.net.', type='A')
+
+        with testtools.ExpectedException(
+                exceptions.InvalidRecordSetLocation):
+            self.central_service.apply_recordset_changes(
+                self.admin_context, domain['id'],
+                create=objects.RecordSetList(objects=[valid, invalid]))
+
+        # None of the changes were applied
+        recordsets = self.central_service.find_recordsets(
+            self.admin_context,
+            criterion={'domain_id': domain['id'], 'name': valid.name})
+        self.assertEqual(0, len(recordsets))
+
+    def test_apply_recordset_changes_incorrect_domain_id(self):
+        domain = self.create_domain()
+        other_domain = self.create_domain(fixture=1)
+
+        recordset = self.create_recordset(other_domain)
+
+        with testtools.ExpectedException(exceptions.RecordSetNotFound):
+            self.central_service.apply_recordset_changes(
+                self.admin_context, domain['id'], delete=[recordset['id']])
+
     def test_count_recordsets(self):
         # in the beginning, there should be nothing
         recordsets = self.central_service.count_recordsets(self.admin_context)
@@ -1586,6 +2068,35 @@ class CentralServiceTest(CentralTestCase):
         with testtools.ExpectedException(exceptions.OverQuota):
             self.create_record(domain, recordset)
 
+    def test_create_record_over_quota_without_counting(self):
+        self.config(quota_domain_records=3)
+
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+
+        self.create_record(domain, recordset)
+
+        # The quota is checked against the domain's record_count, rather
+        # than by counting its records
+        with patch.object(self.central_service.storage,
+                          'count_records') as count_records:
+            with testtools.ExpectedException(exceptions.OverQuota):
+                self.create_record(domain, recordset)
+
+        self.assertFalse(count_records.called)
+
+    def test_create_record_over_recordset_quota(self):
+        self.config(quota_recordset_records=2)
+
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+
+        self.create_record(domain, recordset, fixture=0)
+        self.create_record(domain, recordset, fixture=1)
+
+        with testtools.ExpectedException(exceptions.OverQuota):
+            self.create_record(domain, recordset, data='192.0.2.3')
+
     def test_create_record_without_incrementing_serial(self):
         domain = self.create_domain()
         recordset = self.create_recordset(domain, type='A')
@@ -2054,6 +2565,32 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(fip_ptr['address'], fips[0]['address'])
         self.assertEqual(fip_ptr['description'], fips[0]['description'])
 
+    def test_list_floatingips_with_records_bulk(self):
+        self.create_nameserver()
+
+        context = self.get_context(tenant='a')
+
+        fixture = self.get_ptr_fixture()
+
+        for i in range(3):
+            fip = self.network_api.fake.allocate_floatingip(context.tenant)
+            self.central_service.update_floatingip(
+                context, fip['region'], fip['id'], fixture)
+
+        # The records and their TTLs are found together, rather than with a
+        # lookup per floating IP
+        with patch.object(self.central_service.storage,
+                          'get_recordset') as get_recordset, \
+                patch.object(self.central_service.storage,
+                             'get_domain') as get_domain:
+            fips = self.central_service.list_floatingips(context)
+
+        self.assertEqual(3, len(fips))
+        self.assertEqual([fixture['ptrdname']] * 3,
+                         [fip_ptr['ptrdname'] for fip_ptr in fips])
+        self.assertFalse(get_recordset.called)
+        self.assertFalse(get_domain.called)
+
     def test_list_floatingips_deallocated_and_invalidate(self):
         self.create_nameserver()
 
@@ -2111,6 +2648,60 @@ class CentralServiceTest(CentralTestCase):
         with testtools.ExpectedException(exceptions.RecordNotFound):
             self.central_service.find_record(elevated_a, criterion)
 
+    def test_list_floatingips_cached_keeps_other_tenant_record(self):
+        self.config(floatingips_cache_ttl=60)
+        self.create_nameserver()
+
+        context_a = self.get_context(tenant='a')
+        context_b = self.get_context(tenant='b')
+        elevated_b = context_b.elevated()
+        elevated_b.all_tenants = True
+
+        fixture = self.get_ptr_fixture()
+
+        fip = self.network_api.fake.allocate_floatingip(context_a.tenant)
+
+        # Cache tenant a's floating IPs
+        self.assertEqual(
+            1, len(self.central_service.list_floatingips(context_a)))
+
+        # The floating IP is reassigned to tenant b, which sets its PTR
+        self.network_api.fake.deallocate_floatingip(fip['id'])
+        self.network_api.fake.allocate_floatingip(context_b.tenant, fip['id'])
+
+        self.central_service.update_floatingip(
+            context_b, fip['region'], fip['id'], fixture)
+
+        criterion = {
+            'managed_resource_id': fip['id'],
+            'managed_tenant_id': context_b.tenant}
+        domain_id = self.central_service.find_record(
+            elevated_b, criterion).domain_id
+
+        def assert_record_kept():
+            # Simulate any update on the backend
+            domain_serial = self.central_service.get_domain(
+                elevated_b, domain_id).serial
+            self.central_service.update_status(
+                elevated_b, domain_id, "SUCCESS", domain_serial)
+
+            self.central_service.find_record(elevated_b, criterion)
+
+        # Tenant a's cached list still shows the floating IP, but tenant b's
+        # record is kept
+        self.central_service.list_floatingips(context_a)
+        assert_record_kept()
+
+        # As it is while the floating IPs can not be fetched
+        self.config(floatingips_cache_ttl=0)
+
+        with patch.object(self.central_service.network_api,
+                          '_fetch_floatingips',
+                          side_effect=exceptions.CommunicationFailure):
+            self.central_service.list_floatingips(context_a)
+
+        assert_record_kept()
+
     def test_set_floatingip(self):
         self.create_nameserver()
 
@@ -2128,6 +2719,37 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(None, fip_ptr['description'])
         self.assertIsNotNone(fip_ptr['ttl'])
 
+    def test_set_floatingip_reassigned(self):
+        self.config(floatingips_cache_ttl=60)
+        self.create_nameserver()
+
+        context_a = self.get_context(tenant='a')
+        fixture = self.get_ptr_fixture()
+
+        fip = self.network_api.fake.allocate_floatingip(context_a.tenant)
+
+        # Cache tenant a's floating IPs
+        self.assertEqual(
+            1, len(self.central_service.list_floatingips(context_a)))
+
+        # The floating IP is reassigned to tenant b
+        self.network_api.fake.deallocate_floatingip(fip['id'])
+        self.network_api.fake.allocate_floatingip('b', fip['id'])
+
+        # Tenant a can no longer set its PTR, despite the cached list
+        with testtools.ExpectedException(exceptions.NotFound):
+            self.central_service.update_floatingip(
+                context_a, fip['region'], fip['id'], fixture)
+
+        # Nor while the floating IPs can not be fetched
+        with patch.object(self.central_service.network_api,
+                          '_fetch_floatingips',
+                          side_effect=exceptions.CommunicationFailure):
+            with testtools.ExpectedException(
+                    exceptions.CommunicationFailure):
+                self.central_service.update_floatingip(
+                    context_a, fip['region'], fip['id'], fixture)
+
     def test_set_floatingip_removes_old_record(self):
         self.create_nameserver()
 
@@ -2678,6 +3300,47 @@ class CentralServiceTest(CentralTestCase):
 
         self.assertEqual(new_domain_serial, domain_serial)
 
+    def test_update_status_records(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+
+        kept = self.create_record(domain, recordset, fixture=0)
+        deleted = self.create_record(domain, recordset, fixture=1)
+
+        self.central_service.delete_record(
+            self.admin_context, domain['id'], recordset['id'], deleted['id'])
+
+        domain_serial = self.central_service.get_domain(
+            self.admin_context, domain['id']).serial
+        self.central_service.update_status(
+            self.admin_context, domain['id'], "SUCCESS", domain_serial)
+
+        record = self.central_service.get_record(
+            self.admin_context, domain['id'], recordset['id'], kept['id'])
+        self.assertEqual('NONE', record.action)
+        self.assertEqual('ACTIVE', record.status)
+
+        with testtools.ExpectedException(exceptions.RecordNotFound):
+            self.central_service.get_record(
+                self.admin_context, domain['id'], recordset['id'],
+                deleted['id'])
+
+        # The recordset still holds a record, so is kept
+        self.central_service.get_recordset(
+            self.admin_context, domain['id'], recordset['id'])
+
+    def test_update_status_error(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+        record = self.create_record(domain, recordset)
+
+        self.central_service.update_status(
+            self.admin_context, domain['id'], "ERROR", 0)
+
+        record = self.central_service.get_record(
+            self.admin_context, domain['id'], recordset['id'], record['id'])
+        self.assertEqual('ERROR', record.status)
+
     def test_create_zone_transfer_request(self):
         domain = self.create_domain()
         zone_transfer_request = self.create_zone_transfer_request(domain)
@@ -2920,3 +3583,154 @@ class CentralServiceTest(CentralTestCase):
             zone_transfer_accept = \
                 self.central_service.create_zone_transfer_accept(
                     tenant_3_context, zone_transfer_accept)
+
+    # Zone Import Tests
+    def _create_zone_import(self, request_body, context=None):
+        context = context or self.admin_context
+
+        # Run the import in the foreground, rather than in a new thread
+        def add_thread(func, *args, **kwargs):
+            func(*args, **kwargs)
+
+        with patch.object(self.central_service.tg, 'add_thread',
+                          side_effect=add_thread):
+            zone_import = self.central_service.create_zone_import(
+                context, request_body)
+
+        return self.central_service.get_zone_import(context, zone_import.id)
+
+    def test_create_zone_import(self):
+        self.create_nameserver()
+
+        zone_import = self._create_zone_import(self.get_zonefile_fixture())
+
+        self.assertEqual('COMPLETE', zone_import.status)
+        self.assertEqual(self.admin_context.tenant, zone_import.tenant_id)
+        self.assertEqual(8, zone_import.recordsets_total)
+        self.assertEqual(8, zone_import.recordsets_imported)
+
+        domain = self.central_service.get_domain(
+            self.admin_context, zone_import.domain_id)
+        self.assertEqual('example.com.', domain.name)
+        self.assertEqual('nsadmin@example.com', domain.email)
+
+        recordsets = self.central_service.find_recordsets(
+            self.admin_context, {'domain_id': domain.id})
+        types = sorted(rrset.type for rrset in recordsets)
+
+        # The SOA and apex NS recordsets are Designate's own, the delegation
+        # NS recordset is imported.
+        self.assertEqual(['A', 'AAAA', 'CNAME', 'MX', 'NS', 'NS', 'SOA',
+                          'SPF', 'SRV', 'TXT'], types)
+
+    def test_create_zone_import_batches(self):
+        self.create_nameserver()
+
+        apply_recordset_changes = self.central_service.apply_recordset_changes
+
+        with patch('designate.central.service.IMPORT_BATCH_SIZE', 3):
+            with patch.object(self.central_service, 'apply_recordset_changes',
+                              wraps=apply_recordset_changes) as apply_changes:
+                zone_import = self._create_zone_import(
+                    self.get_zonefile_fixture())
+
+        self.assertEqual('COMPLETE', zone_import.status)
+        self.assertEqual(8, zone_import.recordsets_imported)
+        self.assertEqual(3, apply_changes.call_count)
+
+    def test_create_zone_import_batch_failure(self):
+        self.create_nameserver()
+
+        apply_recordset_changes = self.central_service.apply_recordset_changes
+
+        def apply_changes(context, domain_id, **kwargs):
+            if apply_changes.calls:
+                raise exceptions.OverQuota()
+
+            apply_changes.calls += 1
+            return apply_recordset_changes(context, domain_id, **kwargs)
+
+        apply_changes.calls = 0
+
+        with patch('designate.central.service.IMPORT_BATCH_SIZE', 3):
+            with patch.object(self.central_service, 'apply_recordset_changes',
+                              side_effect=apply_changes):
+                zone_import = self._create_zone_import(
+                    self.get_zonefile_fixture())
+
+        self.assertEqual('ERROR', zone_import.status)
+        self.assertEqual(3, zone_import.recordsets_imported)
+        self.assertIsNone(zone_import.domain_id)
+
+        # The partially imported domain is deleted
+        domain = self.central_service.find_domain(
+            self.admin_context, {'name': 'example.com.'})
+        self.assertEqual('DELETE', domain.action)
+
+        # Simulate the deletion on the backend, freeing the name
+        self.central_service.update_status(
+            self.admin_context, domain.id, "SUCCESS", domain.serial)
+
+        zone_import = self._create_zone_import(self.get_zonefile_fixture())
+        self.assertEqual('COMPLETE', zone_import.status)
+
+    def test_create_zone_import_malformed(self):
+        zone_import = self._create_zone_import(
+            self.get_zonefile_fixture(variant='malformed'))
+
+        self.assertEqual('ERROR', zone_import.status)
+        self.assertEqual('Malformed zonefile.', zone_import.message)
+        self.assertIsNone(zone_import.domain_id)
+
+    def test_create_zone_import_missing_soa(self):
+        zone_import = self._create_zone_import(
+            self.get_zonefile_fixture(variant='nosoa'))
+
+        self.assertEqual('ERROR', zone_import.status)
+        self.assertEqual('An SOA record is required', zone_import.message)
+
+    def test_create_zone_import_duplicate_domain(self):
+        self.create_domain(name='example.com.')
+
+        zone_import = self._create_zone_import(self.get_zonefile_fixture())
+
+        self.assertEqual('ERROR', zone_import.status)
+        self.assertEqual('duplicate_domain', zone_import.message)
+
+    def test_find_zone_imports(self):
+        self.create_nameserver()
+
+        self._create_zone_import(self.get_zonefile_fixture())
+        self._create_zone_import(
+            self.get_zonefile_fixture(variant='malformed'))
+
+        zone_imports = self.central_service.find_zone_imports(
+            self.admin_context)
+        self.assertEqual(2, len(zone_imports))
+
+        zone_imports = self.central_service.find_zone_imports(
+            self.admin_context, {'status': 'ERROR'})
+        self.assertEqual(1, len(zone_imports))
+
+    def test_get_zone_import_other_tenant(self):
+        tenant_1_context = self.get_context(tenant='1')
+        tenant_2_context = self.get_context(tenant='2')
+
+        zone_import = self._create_zone_import(
+            self.get_zonefile_fixture(variant='malformed'),
+            context=tenant_1_context)
+
+        with testtools.ExpectedException(exceptions.ZoneImportNotFound):
+            self.central_service.get_zone_import(
+                tenant_2_context, zone_import.id)
+
+    def test_delete_zone_import(self):
+        zone_import = self._create_zone_import(
+            self.get_zonefile_fixture(variant='malformed'))
+
+        self.central_service.delete_zone_import(
+            self.admin_context, zone_import.id)
+
+        with testtools.ExpectedException(exceptions.ZoneImportNotFound):
+            self.central_service.get_zone_import(
+                self.admin_context, zone_import.id)
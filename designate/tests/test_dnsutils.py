@@ -13,6 +13,18 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import os
+import shutil
+import socket
+import struct
+import tempfile
+
+import dns.exception
+import dns.message
+import dns.rdatatype
+import eventlet
+import mock
+import testtools
 from dns import zone as dnszone
 
 from designate import dnsutils
@@ -95,3 +107,239 @@ class TestUtils(TestCase):
 
         self.assertEqual(len(SAMPLES), len(zone.recordsets))
         self.assertEqual('example.com.', zone.name)
+
+
+class FakeMaster(object):
+    """A local master which answers AXFRs for a single zone over TCP"""
+    def __init__(self, zone=None, silent=False):
+        self.zone = zone
+        self.silent = silent
+        self.requests = 0
+
+        self.sock = eventlet.listen(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = eventlet.spawn(self._serve)
+
+    def stop(self):
+        self.thread.kill()
+        self.sock.close()
+
+    def _serve(self):
+        while True:
+            conn, _ = self.sock.accept()
+            self.requests += 1
+            eventlet.spawn_n(self._handle, conn)
+
+    def _handle(self, conn):
+        (length,) = struct.unpack('!H', conn.recv(2))
+        query = dns.message.from_wire(conn.recv(length))
+
+        if self.silent:
+            # Hold the connection open without answering
+            eventlet.sleep(10)
+            return
+
+        response = dns.message.make_response(query)
+        soa = self.zone.find_rrset(self.zone.origin, dns.rdatatype.SOA)
+
+        response.answer.append(soa)
+        for name, rdataset in self.zone.iterate_rdatasets():
+            if rdataset.rdtype != dns.rdatatype.SOA:
+                response.answer.append(
+                    self.zone.find_rrset(name, rdataset.rdtype))
+        response.answer.append(soa)
+
+        wire = response.to_wire()
+        conn.sendall(struct.pack('!H', len(wire)) + wire)
+        conn.close()
+
+
+class AXFRTest(TestCase):
+    def setUp(self):
+        super(AXFRTest, self).setUp()
+        self.addCleanup(dnsutils._master_health.clear)
+
+        self.zone = dnszone.from_text(self.get_zonefile_fixture(),
+                                      relativize=False, check_origin=False)
+
+    def _start_master(self, **kwargs):
+        master = FakeMaster(**kwargs)
+        self.addCleanup(master.stop)
+        return master
+
+    def _make_tempdir(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        return tempdir
+
+    def _closed_port(self):
+        # Bind, then close a socket to find a port nothing listens on
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
+
+    def test_do_axfr(self):
+        master = self._start_master(zone=self.zone)
+
+        zone = dnsutils.do_axfr('example.com.',
+                                [{'ip': '127.0.0.1', 'port': master.port}],
+                                timeout=1, connect_timeout=1)
+
+        self.assertEqual('example.com.', zone.origin.to_text())
+        self.assertEqual(len(self.zone.nodes), len(zone.nodes))
+
+    def test_do_axfr_failover_refused(self):
+        master = self._start_master(zone=self.zone)
+        dead = {'ip': '127.0.0.1', 'port': self._closed_port()}
+
+        zone = dnsutils.do_axfr(
+            'example.com.', [dead, {'ip': '127.0.0.1', 'port': master.port}],
+            timeout=1, connect_timeout=1)
+
+        self.assertEqual('example.com.', zone.origin.to_text())
+        self.assertEqual(1, dnsutils.get_master_health(dead).failures)
+
+    def test_do_axfr_failover_connect_timeout(self):
+        silent = self._start_master(silent=True)
+        master = self._start_master(zone=self.zone)
+
+        zone = dnsutils.do_axfr(
+            'example.com.', [{'ip': '127.0.0.1', 'port': silent.port},
+                             {'ip': '127.0.0.1', 'port': master.port}],
+            timeout=5, connect_timeout=0.1)
+
+        self.assertEqual('example.com.', zone.origin.to_text())
+        self.assertEqual(1, silent.requests)
+        self.assertEqual(1, master.requests)
+
+    def test_do_axfr_all_masters_fail(self):
+        masters = [{'ip': '127.0.0.1', 'port': self._closed_port()},
+                   {'ip': '127.0.0.1', 'port': self._closed_port()}]
+
+        with testtools.ExpectedException(socket.error):
+            dnsutils.do_axfr('example.com.', masters, timeout=1,
+                             connect_timeout=1)
+
+    def test_do_axfr_no_masters(self):
+        with testtools.ExpectedException(
+                dnsutils.exceptions.NoServersConfigured):
+            dnsutils.do_axfr('example.com.', [])
+
+    def test_do_axfr_failing_master_deprioritized(self):
+        silent = self._start_master(silent=True)
+        master = self._start_master(zone=self.zone)
+        masters = [{'ip': '127.0.0.1', 'port': silent.port},
+                   {'ip': '127.0.0.1', 'port': master.port}]
+
+        for i in range(5):
+            dnsutils.do_axfr('example.com.', masters, timeout=5,
+                             connect_timeout=0.1)
+
+        # After its first failure, the silent master is tried last
+        self.assertEqual(1, silent.requests)
+        self.assertEqual(5, master.requests)
+
+    def test_do_axfr_circuit_open(self):
+        master = self._start_master(zone=self.zone)
+        masters = [{'ip': '127.0.0.1', 'port': master.port}]
+
+        health = dnsutils.get_master_health(masters[0])
+        for i in range(health.failure_threshold):
+            health.record_failure()
+
+        self.assertFalse(health.is_available())
+
+        # With every circuit open, the masters are still tried as a last
+        # resort, and a success closes the circuit again
+        dnsutils.do_axfr('example.com.', masters, timeout=1,
+                         connect_timeout=1)
+
+        self.assertTrue(health.is_available())
+        self.assertEqual(0, health.failures)
+
+    def test_order_masters_prefers_fastest(self):
+        masters = [{'ip': '192.0.2.1', 'port': 53},
+                   {'ip': '192.0.2.2', 'port': 53},
+                   {'ip': '192.0.2.3', 'port': 53}]
+
+        dnsutils.get_master_health(masters[0]).record_success(0.5)
+        dnsutils.get_master_health(masters[1]).record_success(0.1)
+
+        # Masters with no history are tried first, then the fastest
+        self.assertEqual([masters[2], masters[1], masters[0]],
+                         dnsutils.order_masters(masters))
+
+        for i in range(3):
+            dnsutils.get_master_health(masters[1]).record_failure()
+
+        self.assertEqual([masters[2], masters[0], masters[1]],
+                         dnsutils.order_masters(masters))
+
+    def test_master_health_half_open(self):
+        health = dnsutils.MasterHealth(failure_threshold=1, reset_timeout=0)
+        health.record_failure()
+
+        self.assertTrue(health.is_available())
+
+        health.record_success(0.2)
+        self.assertEqual(0, health.failures)
+        self.assertEqual(0.2, health.latency)
+
+    def test_master_health_single_probe(self):
+        health = dnsutils.MasterHealth(failure_threshold=1, reset_timeout=30)
+
+        with mock.patch('time.time', return_value=1000):
+            health.record_failure()
+
+        with mock.patch('time.time', return_value=1030):
+            # Only the first caller is let through to probe
+            self.assertTrue(health.is_available())
+            self.assertFalse(health.is_available())
+
+        with mock.patch('time.time', return_value=1040):
+            # A failed probe opens the circuit again
+            health.record_failure()
+            self.assertFalse(health.is_available())
+
+        with mock.patch('time.time', return_value=1070):
+            self.assertTrue(health.is_available())
+
+        with mock.patch('time.time', return_value=1100):
+            # A probe which never reported back is replaced
+            self.assertTrue(health.is_available())
+
+    def test_do_axfr_to_file(self):
+        master = self._start_master(zone=self.zone)
+        output_path = os.path.join(self._make_tempdir(), 'example.com.zone')
+
+        dnsutils.do_axfr_to_file(
+            'example.com.', [{'ip': '127.0.0.1', 'port': master.port}],
+            output_path, timeout=1, connect_timeout=1)
+
+        zone = dnszone.from_file(output_path, origin='example.com.',
+                                 relativize=False)
+
+        self.assertEqual(self.zone, zone)
+
+    def test_write_xfr_to_file_failure(self):
+        tempdir = self._make_tempdir()
+        output_path = os.path.join(tempdir, 'example.com.zone')
+
+        with open(output_path, 'w') as zone_file:
+            zone_file.write('original')
+
+        # A transfer which doesn't start with the SOA
+        query = dns.message.make_query('example.com.', dns.rdatatype.AXFR)
+        message = dns.message.make_response(query)
+        message.answer.append(
+            self.zone.find_rrset('ipv4.example.com.', dns.rdatatype.A))
+
+        with testtools.ExpectedException(dns.exception.FormError):
+            dnsutils.write_xfr_to_file(iter([message]), output_path)
+
+        # The zone file is untouched, and the temporary file removed
+        self.assertEqual(['example.com.zone'], os.listdir(tempdir))
+        with open(output_path) as zone_file:
+            self.assertEqual('original', zone_file.read())
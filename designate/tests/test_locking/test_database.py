@@ -0,0 +1,85 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+import testtools
+
+from designate import exceptions
+from designate import locking
+from designate import tests
+from designate.locking import impl_database
+
+
+class DatabaseLockManagerTest(tests.TestCase):
+    def _get_lock_manager(self, dialect):
+        engine = mock.Mock()
+        engine.dialect.name = dialect
+
+        with mock.patch.object(impl_database.session, 'create_engine',
+                               return_value=engine) as create_engine:
+            lock_manager = locking.get_lock_manager('database')
+
+        # Locks use an engine of their own, with an unbounded overflow
+        self.assertEqual(-1, create_engine.call_args[1]['max_overflow'])
+
+        return lock_manager
+
+    def test_unsupported_dialect(self):
+        # The tests run against SQLite, which has no advisory locks
+        with testtools.ExpectedException(exceptions.ConfigurationError):
+            locking.get_lock_manager('database')
+
+    def test_mysql(self):
+        lock_manager = self._get_lock_manager('mysql')
+        connection = lock_manager.engine.connect.return_value
+        connection.execute.return_value.scalar.return_value = 1
+
+        with lock_manager.lock('domain-one'):
+            query, = connection.execute.call_args[0]
+            self.assertIn('GET_LOCK', str(query))
+            self.assertEqual({'key': 'designate-domain-one'},
+                             connection.execute.call_args[1])
+            self.assertFalse(connection.close.called)
+
+        # The lock is released on the connection it was taken on
+        query, = connection.execute.call_args[0]
+        self.assertIn('RELEASE_LOCK', str(query))
+        connection.close.assert_called_once_with()
+
+    def test_postgresql_contended(self):
+        lock_manager = self._get_lock_manager('postgresql')
+        connection = lock_manager.engine.connect.return_value
+        connection.execute.return_value.scalar.return_value = False
+
+        self.assertIsNone(lock_manager.try_acquire('domain-one'))
+
+        query, = connection.execute.call_args[0]
+        self.assertIn('pg_try_advisory_lock', str(query))
+        self.assertIsInstance(connection.execute.call_args[1]['key'],
+                              (int, long))
+
+        # The connection is returned to the pool straight away
+        connection.close.assert_called_once_with()
+
+    def test_release_failure_discards_connection(self):
+        lock_manager = self._get_lock_manager('mysql')
+        connection = lock_manager.engine.connect.return_value
+        connection.execute.return_value.scalar.return_value = 1
+
+        token = lock_manager.try_acquire('domain-one')
+        connection.execute.side_effect = exceptions.Base()
+
+        with testtools.ExpectedException(exceptions.Base):
+            lock_manager.release('domain-one', token)
+
+        # The connection is not returned to the pool holding the lock
+        connection.invalidate.assert_called_once_with()
+        connection.close.assert_called_once_with()
@@ -0,0 +1,89 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from testscenarios import load_tests_apply_scenarios as load_tests  # noqa
+import fixtures
+import testtools
+from oslo_log import log as logging
+
+from designate import exceptions
+from designate import locking
+from designate import tests
+from designate.locking import impl_file  # noqa
+from designate.locking import impl_memcache  # noqa
+
+
+LOG = logging.getLogger(__name__)
+
+
+class LockManagerTestCase(tests.TestCase):
+    scenarios = [
+        ('local', dict(lock_driver='local')),
+        ('file', dict(lock_driver='file')),
+        ('memcache', dict(lock_driver='memcache')),
+    ]
+
+    def setUp(self):
+        super(LockManagerTestCase, self).setUp()
+
+        self.config(lock_path=self.useFixture(fixtures.TempDir()).path,
+                    group='locking:file')
+
+        self.lock_manager = locking.get_lock_manager(self.lock_driver)
+
+    def test_try_acquire(self):
+        token = self.lock_manager.try_acquire('domain-one')
+        self.assertIsNotNone(token)
+
+        # The lock is held, but other locks are free
+        self.assertIsNone(self.lock_manager.try_acquire('domain-one'))
+        other = self.lock_manager.try_acquire('domain-two')
+        self.assertIsNotNone(other)
+
+        self.lock_manager.release('domain-one', token)
+        self.lock_manager.release('domain-two', other)
+
+        # The lock can be taken again once released
+        token = self.lock_manager.try_acquire('domain-one')
+        self.assertIsNotNone(token)
+        self.lock_manager.release('domain-one', token)
+
+    def test_lock(self):
+        with self.lock_manager.lock('domain-one'):
+            self.assertIsNone(self.lock_manager.try_acquire('domain-one'))
+
+        token = self.lock_manager.try_acquire('domain-one')
+        self.assertIsNotNone(token)
+        self.lock_manager.release('domain-one', token)
+
+        self.assertEqual(1, self.lock_manager.stats['acquired'])
+
+    def test_lock_released_on_exception(self):
+        with testtools.ExpectedException(ValueError):
+            with self.lock_manager.lock('domain-one'):
+                raise ValueError()
+
+        token = self.lock_manager.try_acquire('domain-one')
+        self.assertIsNotNone(token)
+        self.lock_manager.release('domain-one', token)
+
+    def test_lock_timeout(self):
+        token = self.lock_manager.try_acquire('domain-one')
+
+        with testtools.ExpectedException(exceptions.LockTimeout):
+            with self.lock_manager.lock('domain-one', timeout=0.1):
+                pass
+
+        self.lock_manager.release('domain-one', token)
+
+        self.assertEqual(1, self.lock_manager.stats['contended'])
+        self.assertEqual(1, self.lock_manager.stats['timeouts'])
+        self.assertEqual(0, self.lock_manager.stats['acquired'])
@@ -0,0 +1,44 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+
+from designate import locking
+from designate import tests
+from designate.locking import impl_memcache
+
+
+class MemcacheLockManagerTest(tests.TestCase):
+    def setUp(self):
+        super(MemcacheLockManagerTest, self).setUp()
+
+        self.lock_manager = locking.get_lock_manager('memcache')
+
+    def test_release_expired_lock(self):
+        token = self.lock_manager.try_acquire('domain-one')
+
+        # The lock expired, and was taken elsewhere
+        key = self.lock_manager._get_key('domain-one')
+        self.lock_manager.client.set(key, 'other')
+
+        self.lock_manager.release('domain-one', token)
+
+        # The other holder's lock was left alone
+        self.assertEqual('other', self.lock_manager.client.get(key))
+        self.assertIsNone(self.lock_manager.try_acquire('domain-one'))
+
+    def test_short_expiration_warns(self):
+        self.config(expiration=60, group='locking:memcache')
+
+        with mock.patch.object(impl_memcache.LOG, 'warning') as warning:
+            locking.get_lock_manager('memcache')
+
+        self.assertEqual(1, warning.call_count)
@@ -0,0 +1,116 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import eventlet
+from mock import patch
+import testtools
+
+from designate import exceptions
+from designate.network_api import get_network_api
+from designate.tests import TestCase
+
+
+class FakeAPITest(TestCase):
+    def setUp(self):
+        super(FakeAPITest, self).setUp()
+        self.api = get_network_api('fake')
+        self.fake = self.network_api.fake
+
+    def test_list_floatingips_cached(self):
+        self.config(floatingips_cache_ttl=60)
+
+        context = self.get_context(tenant='a')
+        fip = self.fake.allocate_floatingip(context.tenant)
+
+        self.assertEqual([fip], self.api.list_floatingips(context))
+
+        # The new allocation isn't seen until the cached list expires
+        self.fake.allocate_floatingip(context.tenant)
+        self.assertEqual([fip], self.api.list_floatingips(context))
+
+        # Each tenant's floating IPs are cached separately
+        other_context = self.get_context(tenant='b')
+        other_fip = self.fake.allocate_floatingip(other_context.tenant)
+        self.assertEqual([other_fip],
+                         self.api.list_floatingips(other_context))
+
+    def test_list_floatingips_not_cached(self):
+        context = self.get_context(tenant='a')
+        self.fake.allocate_floatingip(context.tenant)
+
+        self.assertEqual(1, len(self.api.list_floatingips(context)))
+
+        self.fake.allocate_floatingip(context.tenant)
+        self.assertEqual(2, len(self.api.list_floatingips(context)))
+
+    def test_list_floatingips_stale(self):
+        context = self.get_context(tenant='a')
+        fip = self.fake.allocate_floatingip(context.tenant)
+
+        self.api.list_floatingips(context)
+
+        # The last floating IPs fetched are used, marked as stale
+        with patch.object(self.api, '_fetch_floatingips',
+                          side_effect=exceptions.CommunicationFailure):
+            fips = self.api.list_floatingips(context)
+
+        self.assertEqual([dict(fip, stale=True)], fips)
+
+    def test_list_floatingips_bypass_cache(self):
+        self.config(floatingips_cache_ttl=60)
+
+        context = self.get_context(tenant='a')
+        fip = self.fake.allocate_floatingip(context.tenant)
+
+        self.api.list_floatingips(context)
+
+        other_fip = self.fake.allocate_floatingip(context.tenant)
+        self.assertEqual(
+            sorted([fip, other_fip]),
+            sorted(self.api.list_floatingips(context, use_cache=False)))
+
+        # The last floating IPs fetched are never used in their place
+        with patch.object(self.api, '_fetch_floatingips',
+                          side_effect=exceptions.CommunicationFailure):
+            with testtools.ExpectedException(
+                    exceptions.CommunicationFailure):
+                self.api.list_floatingips(context, use_cache=False)
+
+    def test_list_floatingips_failure(self):
+        context = self.get_context(tenant='a')
+
+        with patch.object(self.api, '_fetch_floatingips',
+                          side_effect=exceptions.CommunicationFailure):
+            with testtools.ExpectedException(
+                    exceptions.CommunicationFailure):
+                self.api.list_floatingips(context)
+
+    def test_list_floatingips_coalesced(self):
+        context = self.get_context(tenant='a')
+        fip = self.fake.allocate_floatingip(context.tenant)
+
+        fetch = self.api._fetch_floatingips
+        calls = []
+
+        def slow_fetch(*args, **kwargs):
+            calls.append(args)
+            eventlet.sleep(0.01)
+            return fetch(*args, **kwargs)
+
+        with patch.object(self.api, '_fetch_floatingips',
+                          side_effect=slow_fetch):
+            threads = [eventlet.spawn(self.api.list_floatingips, context)
+                       for i in range(3)]
+            results = [thread.wait() for thread in threads]
+
+        # The concurrent callers shared a single fetch
+        self.assertEqual(1, len(calls))
+        self.assertEqual([[fip]] * 3, results)
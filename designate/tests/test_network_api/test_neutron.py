@@ -17,10 +17,12 @@ from neutronclient.v2_0 import client as clientv20
 from neutronclient.common import exceptions as neutron_exceptions
 from oslo.config import cfg
 from mock import patch
+import mock
 import testtools
 
 from designate import exceptions
 from designate.network_api import get_network_api
+from designate.network_api import neutron
 from designate.tests import TestCase
 
 
@@ -50,3 +52,45 @@ class NeutronAPITest(TestCase):
         with testtools.ExpectedException(
                 exceptions.NeutronCommunicationFailure):
             self.api.list_floatingips(context)
+
+    def test_partial_failure(self):
+        self.config(endpoints=['RegionOne|http://localhost:9696',
+                               'RegionTwo|http://remotehost:9696'],
+                    group='network_api:neutron')
+
+        context = self.get_context(tenant='a', auth_token='test')
+        fips = {'floatingips': [{'id': 'fip-one',
+                                 'floating_ip_address': '192.0.2.1'}]}
+
+        def get_client(context, endpoint):
+            client = mock.Mock()
+            if endpoint == 'http://remotehost:9696':
+                client.list_floatingips.side_effect = \
+                    neutron_exceptions.NeutronException()
+            else:
+                client.list_floatingips.return_value = fips
+            return client
+
+        # The region which could be reached is returned
+        with patch.object(neutron, 'get_client', side_effect=get_client):
+            result = self.api.list_floatingips(context)
+
+        self.assertEqual([{'id': 'fip-one', 'address': '192.0.2.1',
+                           'region': 'RegionOne'}], result)
+
+    @patch.object(clientv20.Client, 'list_floatingips',
+                  return_value={'floatingips': []})
+    def test_admin_client_kept(self, _):
+        self.config(admin_username='admin', admin_password='secret',
+                    admin_tenant_name='admin',
+                    auth_url='http://localhost:5000/v2.0',
+                    group='network_api:neutron')
+
+        context = self.get_context(tenant='a')
+
+        with patch('designate.network_api.neutron.get_client',
+                   wraps=neutron.get_client) as get_client:
+            self.api.list_floatingips(context)
+            self.api.list_floatingips(context)
+
+        self.assertEqual(1, get_client.call_count)
@@ -0,0 +1,142 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import testtools
+from mock import patch
+from oslo_log import log as logging
+
+from designate.tests import TestCase
+from designate import context
+from designate import exceptions
+from designate import policy
+
+LOG = logging.getLogger(__name__)
+
+
+class TestPolicy(TestCase):
+    def setUp(self):
+        super(TestPolicy, self).setUp()
+
+        self.policy({'owner': 'tenant:%(tenant_id)s'})
+
+    def _check(self, rule, ctxt, target=None, **kwargs):
+        with patch.object(policy._ENFORCER, 'enforce',
+                          wraps=policy._ENFORCER.enforce) as enforce:
+            result = policy.check(rule, ctxt, target, **kwargs)
+
+        return result, enforce.call_count
+
+    def test_check_memoized_per_request(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        target = {'tenant_id': '54321'}
+
+        self.assertEqual((True, 1), self._check('owner', ctxt, target))
+        self.assertEqual((True, 0), self._check('owner', ctxt, target))
+
+        # Served from the memo, even once evicted from the shared cache
+        policy._DECISIONS.clear()
+        self.assertEqual((True, 0), self._check('owner', ctxt, target))
+
+    def test_check_cached_across_requests(self):
+        target = {'tenant_id': '54321'}
+
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        self.assertEqual((True, 1), self._check('owner', ctxt, target))
+
+        ctxt = context.DesignateContext(user='12345', tenant='54321',
+                                        request_id='another')
+        self.assertEqual((True, 0), self._check('owner', ctxt, target))
+
+    def test_check_keyed_by_target_and_creds(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+
+        self.assertEqual(
+            (True, 1), self._check('owner', ctxt, {'tenant_id': '54321'}))
+
+        # A different target value is evaluated
+        self.assertEqual(
+            (False, 1), self._check('owner', ctxt, {'tenant_id': 'other'},
+                                    do_raise=False))
+
+        # As is the same target with different credentials
+        ctxt.tenant = 'other'
+        self.assertEqual(
+            (True, 1), self._check('owner', ctxt, {'tenant_id': 'other'}))
+
+    def test_check_cached_failure_raises(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        target = {'tenant_id': 'other'}
+
+        for i in range(2):
+            with testtools.ExpectedException(exceptions.Forbidden):
+                policy.check('owner', ctxt, target)
+
+        self.assertFalse(policy.check('owner', ctxt, target, do_raise=False))
+
+    def test_check_unhashable_target(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        target = {'tenant_id': '54321', 'records': ['192.0.2.1']}
+
+        self.assertEqual((True, 1), self._check('owner', ctxt, target))
+        self.assertEqual((True, 1), self._check('owner', ctxt, target))
+
+    def test_check_cache_bounded(self):
+        with patch.object(policy, 'DECISIONS_CACHE_SIZE', 2):
+            for tenant_id in ['a', 'b', 'c']:
+                ctxt = context.DesignateContext(tenant=tenant_id)
+                policy.check('owner', ctxt, {'tenant_id': tenant_id})
+
+        self.assertEqual(2, len(policy._DECISIONS))
+
+        # The least recently used decision was evicted
+        ctxt = context.DesignateContext(tenant='a')
+        self.assertEqual(
+            (True, 1), self._check('owner', ctxt, {'tenant_id': 'a'}))
+
+    def test_check_invalidated_by_set_rules(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        target = {'tenant_id': '54321'}
+
+        self.assertTrue(policy.check('owner', ctxt, target))
+
+        self.policy({'owner': '!'}, overwrite=False)
+
+        self.assertEqual((False, 1), self._check('owner', ctxt, target,
+                                                 do_raise=False))
+
+    def test_check_invalidated_by_reload(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+        target = {'tenant_id': '54321'}
+
+        self.assertTrue(policy.check('owner', ctxt, target))
+
+        # Simulate the enforcer reloading a modified policy file
+        policy._ENFORCER.set_rules({}, overwrite=True)
+
+        # Including for a long lived context
+        self.assertEqual((False, 1), self._check('owner', ctxt, target,
+                                                 do_raise=False))
+
+    def test_check_success_logging_sampled(self):
+        ctxt = context.DesignateContext(user='12345', tenant='54321')
+
+        with patch.object(policy, 'SUCCESS_LOG_SAMPLE', 3), \
+                patch.object(policy, '_SUCCESSES', iter(range(6))), \
+                patch.object(policy.LOG, 'debug') as debug, \
+                patch.object(policy.LOG, 'info') as info:
+            for i in range(6):
+                policy.check('owner', ctxt, {'tenant_id': '54321'})
+
+            policy.check('owner', ctxt, {'tenant_id': 'other'},
+                         do_raise=False)
+
+        self.assertEqual(2, debug.call_count)
+        self.assertEqual(1, info.call_count)
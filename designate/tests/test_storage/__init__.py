@@ -15,6 +15,7 @@
 # under the License.
 import uuid
 import math
+import datetime
 
 import mock
 import testtools
@@ -23,6 +24,7 @@ from oslo_log import log as logging
 
 from designate import exceptions
 from designate import objects
+from designate import utils
 from designate.storage.base import Storage as StorageBase
 
 
@@ -84,6 +86,30 @@ class StorageTestCase(object):
             self.storage.find_pool_attributes(
                 self.admin_context, marker='4')
 
+    def test_paging_cursor(self):
+        created = [self.create_domain(name='example-%d.org.' % i)
+                   for i in xrange(5)]
+
+        # Page backwards by name, resuming from a cursor
+        marker = utils.encode_marker(
+            created[3], ['name', 'id', 'created_at'])
+
+        results = self.storage.find_domains(
+            self.admin_context, marker=marker, limit=2, sort_key='name',
+            sort_dir='desc')
+
+        self.assertEqual([created[2]['id'], created[1]['id']],
+                         [r['id'] for r in results])
+
+    def test_paging_cursor_sort_key_mismatch(self):
+        marker = utils.encode_marker(
+            {'id': str(uuid.uuid4()), 'created_at': datetime.datetime.now()},
+            ['id', 'created_at'])
+
+        with testtools.ExpectedException(exceptions.InvalidMarker):
+            self.storage.find_domains(
+                self.admin_context, marker=marker, sort_key='name')
+
     def test_paging_limit_invalid(self):
         with testtools.ExpectedException(exceptions.ValueError):
             self.storage.find_pool_attributes(
@@ -548,6 +574,19 @@ class StorageTestCase(object):
         # Ensure we can page through the results.
         self._ensure_paging(created, self.storage.find_domains)
 
+    def test_find_domains_total_count(self):
+        self.create_domain()
+        self.create_domain(fixture=1)
+
+        # Domains are only counted when asked to be
+        results = self.storage.find_domains(self.admin_context, limit=1)
+        self.assertFalse(results.obj_attr_is_set('total_count'))
+
+        results = self.storage.find_domains(
+            self.admin_context, limit=1, total_count=True)
+        self.assertEqual(1, len(results))
+        self.assertEqual(2, results.total_count)
+
     def test_find_domains_criterion(self):
         domain_one = self.create_domain()
         domain_two = self.create_domain(fixture=1)
@@ -755,6 +794,33 @@ class StorageTestCase(object):
             uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
             self.storage.delete_domain(self.admin_context, uuid)
 
+    def test_find_domain_name_changes(self):
+        context = self.get_admin_context()
+        context.all_tenants = True
+
+        domain_one = self.create_domain(fixture=0)
+        domain_two = self.create_domain(fixture=1)
+
+        self.storage.delete_domain(context, domain_one.id)
+
+        # Only undeleted domains are loaded
+        domains = self.storage.find_domain_name_changes(context)
+        self.assertEqual([(domain_two.id, domain_two.name, '0')],
+                         [(d.id, d.name, d.deleted) for d in domains])
+
+        # While changes include the deleted domains
+        domains = self.storage.find_domain_name_changes(
+            context, since=domain_one.created_at)
+        self.assertEqual(
+            set([domain_one.id, domain_two.id]), set(d.id for d in domains))
+
+        deleted = [d for d in domains if d.id == domain_one.id][0]
+        self.assertNotEqual('0', deleted.deleted)
+
+        domains = self.storage.find_domain_name_changes(
+            context, since=deleted.deleted_at + datetime.timedelta(seconds=1))
+        self.assertEqual(0, len(domains))
+
     def test_count_domains(self):
         # in the beginning, there should be nothing
         domains = self.storage.count_domains(self.admin_context)
@@ -851,6 +917,28 @@ class StorageTestCase(object):
         self.assertEqual(recordset_one['name'], actual[2]['name'])
         self.assertEqual(recordset_one['type'], actual[2]['type'])
 
+    def test_find_recordsets_with_records_multiple(self):
+        domain = self.create_domain()
+
+        recordset_one = self.create_recordset(domain, fixture=0)
+        recordset_two = self.create_recordset(domain, fixture=1)
+
+        records_one = [self.create_record(domain, recordset_one, fixture=i)
+                       for i in range(2)]
+        record_two = self.create_record(domain, recordset_two, fixture=0)
+
+        criterion = {'domain_id': domain['id'], 'type': 'A'}
+
+        results = self.storage.find_recordsets(self.admin_context, criterion)
+
+        self.assertEqual(2, len(results))
+
+        self.assertEqual([r.id for r in records_one],
+                         [r.id for r in results[0].records])
+        self.assertEqual([record_two.id],
+                         [r.id for r in results[1].records])
+        self.assertFalse(results[0].obj_what_changed())
+
     def test_find_recordsets_paging(self):
         domain = self.create_domain(name='example.org.')
 
@@ -914,6 +1002,22 @@ class StorageTestCase(object):
         # Should be 3, as SOA and NS recordsets are automiatcally created
         self.assertEqual(len(results), 3)
 
+    def test_find_recordsets_criterion_list(self):
+        domain = self.create_domain()
+
+        recordset_one = self.create_recordset(domain, fixture=0)
+        recordset_two = self.create_recordset(domain, fixture=1)
+
+        criterion = dict(
+            domain_id=domain['id'],
+            id=[recordset_one['id'], recordset_two['id']],
+        )
+
+        results = self.storage.find_recordsets(self.admin_context, criterion)
+
+        self.assertEqual(sorted([recordset_one['id'], recordset_two['id']]),
+                         sorted(r['id'] for r in results))
+
     def test_find_recordsets_with_records(self):
         domain = self.create_domain()
         recordset = self.create_recordset(domain)
@@ -1170,6 +1274,35 @@ class StorageTestCase(object):
             uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
             self.storage.delete_recordset(self.admin_context, uuid)
 
+    def test_recordset_exists(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        criterion = {'domain_id': domain['id'], 'name': recordset['name']}
+
+        self.assertTrue(self.storage.recordset_exists(
+            self.admin_context, criterion))
+
+        criterion['type'] = 'CNAME'
+        self.assertFalse(self.storage.recordset_exists(
+            self.admin_context, criterion))
+
+        # Exclude the only match by its ID
+        criterion = {'domain_id': domain['id'], 'name': recordset['name'],
+                     'id': '!%s' % recordset['id']}
+        self.assertFalse(self.storage.recordset_exists(
+            self.admin_context, criterion))
+
+    def test_recordset_exists_other_tenant(self):
+        context = self.get_context(tenant='one')
+        domain = self.create_domain(context=context)
+        recordset = self.create_recordset(domain, context=context)
+
+        criterion = {'domain_id': domain['id'], 'name': recordset['name']}
+
+        self.assertFalse(self.storage.recordset_exists(
+            self.get_context(tenant='two'), criterion))
+
     def test_count_recordsets(self):
         # in the beginning, there should be nothing
         recordsets = self.storage.count_recordsets(self.admin_context)
@@ -1458,6 +1591,313 @@ class StorageTestCase(object):
             uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
             self.storage.delete_record(self.admin_context, uuid)
 
+    def test_create_records_bulk(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        records = [objects.Record.from_dict({'data': '192.0.2.%d' % i})
+                   for i in range(1, 4)]
+
+        results = self.storage.create_records_bulk(
+            self.admin_context, domain['id'], recordset['id'], records)
+
+        self.assertEqual(3, len(results))
+
+        for record in records:
+            # The records were updated in place
+            self.assertIsNotNone(record['id'])
+            self.assertIsNotNone(record['created_at'])
+            self.assertIsNotNone(record['hash'])
+            self.assertEqual(self.admin_context.tenant, record['tenant_id'])
+            self.assertEqual(recordset['id'], record['recordset_id'])
+            self.assertEqual('PENDING', record['status'])
+            self.assertFalse(record.obj_what_changed())
+
+        actual = self.storage.find_records(
+            self.admin_context, {'recordset_id': recordset['id']})
+        self.assertEqual(sorted(r['data'] for r in records),
+                         sorted(r['data'] for r in actual))
+
+    def test_create_records_bulk_duplicate(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        records = [objects.Record.from_dict({'data': '192.0.2.1'}),
+                   objects.Record.from_dict({'data': '192.0.2.1'})]
+
+        with testtools.ExpectedException(exceptions.DuplicateRecord):
+            self.storage.create_records_bulk(
+                self.admin_context, domain['id'], recordset['id'], records)
+
+        # Neither record was created
+        actual = self.storage.find_records(
+            self.admin_context, {'recordset_id': recordset['id']})
+        self.assertEqual(0, len(actual))
+
+    def test_update_records_bulk(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        record_one = self.create_record(domain, recordset, fixture=0)
+        record_two = self.create_record(domain, recordset, fixture=1)
+
+        version = record_one.version
+
+        record_one.data = '192.0.2.100'
+        record_two.status = 'ACTIVE'
+
+        self.storage.update_records_bulk(
+            self.admin_context, [record_one, record_two])
+
+        # The versions were incremented, and refreshed in place
+        self.assertEqual(version + 1, record_one.version)
+        self.assertEqual(version + 1, record_two.version)
+
+        record_one = self.storage.get_record(
+            self.admin_context, record_one['id'])
+        self.assertEqual('192.0.2.100', record_one['data'])
+        self.assertEqual(record_one['hash'],
+                         self.storage._recalculate_record_hash(record_one))
+
+        record_two = self.storage.get_record(
+            self.admin_context, record_two['id'])
+        self.assertEqual('ACTIVE', record_two['status'])
+
+    def test_update_records_bulk_missing(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        record = self.create_record(domain, recordset)
+        missing = objects.Record(id='caf771fc-6b05-4891-bee1-c2a48621f57b',
+                                 data='192.0.2.200', domain_id=domain['id'],
+                                 recordset_id=recordset['id'])
+
+        record.data = '192.0.2.100'
+
+        with testtools.ExpectedException(exceptions.RecordNotFound):
+            self.storage.update_records_bulk(
+                self.admin_context, [record, missing])
+
+    def test_delete_records_bulk(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        record_one = self.create_record(domain, recordset, fixture=0)
+        record_two = self.create_record(domain, recordset, fixture=1)
+        record_three = self.create_record(domain, recordset,
+                                          data='192.0.2.3')
+
+        results = self.storage.delete_records_bulk(
+            self.admin_context, [record_one['id'], record_two['id']])
+
+        self.assertEqual(sorted([record_one['id'], record_two['id']]),
+                         sorted(r['id'] for r in results))
+
+        actual = self.storage.find_records(
+            self.admin_context, {'recordset_id': recordset['id']})
+        self.assertEqual([record_three['id']], [r['id'] for r in actual])
+
+    def test_delete_records_bulk_missing(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        record = self.create_record(domain, recordset)
+
+        with testtools.ExpectedException(exceptions.RecordNotFound):
+            self.storage.delete_records_bulk(
+                self.admin_context,
+                [record['id'], 'caf771fc-6b05-4891-bee1-c2a48621f57b'])
+
+        # The existing record was left alone
+        self.storage.get_record(self.admin_context, record['id'])
+
+    def _create_record_with_state(self, domain, recordset, **kwargs):
+        # Create the record directly in storage, as central would override
+        # its action, status and serial
+        fixture = kwargs.pop('fixture', 0)
+        values = self.get_record_fixture(recordset['type'], fixture=fixture,
+                                         values=kwargs)
+
+        return self.storage.create_record(
+            self.admin_context, domain['id'], recordset['id'],
+            objects.Record.from_dict(values))
+
+    def test_update_records_status(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        pending = self._create_record_with_state(
+            domain, recordset, fixture=0, action='CREATE', status='PENDING',
+            serial=10)
+        errored = self._create_record_with_state(
+            domain, recordset, fixture=1, action='UPDATE', status='ERROR',
+            serial=10)
+        newer = self._create_record_with_state(
+            domain, recordset, data='192.0.2.3', action='CREATE',
+            status='PENDING', serial=11)
+        deleting = self._create_record_with_state(
+            domain, recordset, data='192.0.2.4', action='DELETE',
+            status='PENDING', serial=10)
+
+        count = self.storage.update_records_status(
+            self.admin_context, domain['id'],
+            {'action': 'NONE', 'status': 'ACTIVE'},
+            statuses=['PENDING', 'ERROR'], actions=['CREATE', 'UPDATE'],
+            serial=10)
+
+        self.assertEqual(2, count)
+
+        for record in [pending, errored]:
+            actual = self.storage.get_record(self.admin_context, record['id'])
+            self.assertEqual('NONE', actual.action)
+            self.assertEqual('ACTIVE', actual.status)
+            self.assertEqual(record.version + 1, actual.version)
+
+        for record in [newer, deleting]:
+            actual = self.storage.get_record(self.admin_context, record['id'])
+            self.assertEqual(record.action, actual.action)
+            self.assertEqual('PENDING', actual.status)
+            self.assertEqual(record.version, actual.version)
+
+    def test_purge_records(self):
+        domain = self.create_domain()
+        recordset_one = self.create_recordset(domain, type='A')
+        recordset_two = self.create_recordset(domain, type='A', fixture=1)
+
+        deleting_one = self._create_record_with_state(
+            domain, recordset_one, fixture=0, action='DELETE',
+            status='PENDING', serial=10)
+        remaining = self._create_record_with_state(
+            domain, recordset_one, fixture=1, action='NONE', status='ACTIVE',
+            serial=10)
+        deleting_two = self._create_record_with_state(
+            domain, recordset_two, fixture=0, action='DELETE',
+            status='ERROR', serial=10)
+
+        count = self.storage.purge_records(
+            self.admin_context, domain['id'], statuses=['PENDING', 'ERROR'],
+            actions=['DELETE'], serial=10)
+
+        self.assertEqual(2, count)
+
+        for record in [deleting_one, deleting_two]:
+            with testtools.ExpectedException(exceptions.RecordNotFound):
+                self.storage.get_record(self.admin_context, record['id'])
+
+        self.storage.get_record(self.admin_context, remaining['id'])
+
+        # Only the recordset left empty is removed
+        self.storage.get_recordset(self.admin_context, recordset_one['id'])
+
+        with testtools.ExpectedException(exceptions.RecordSetNotFound):
+            self.storage.get_recordset(self.admin_context, recordset_two['id'])
+
+    def test_purge_records_none_matching(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+        record = self._create_record_with_state(
+            domain, recordset, action='DELETE', status='PENDING', serial=10)
+
+        count = self.storage.purge_records(
+            self.admin_context, domain['id'], statuses=['PENDING', 'ERROR'],
+            actions=['DELETE'], serial=9)
+
+        self.assertEqual(0, count)
+        self.storage.get_record(self.admin_context, record['id'])
+
+    def test_find_export_records(self):
+        domain = self.create_domain()
+
+        recordset_one = self.create_recordset(domain, fixture=0)
+        recordset_two = self.create_recordset(domain, fixture=1)
+        # Named to sort before the apex
+        recordset_three = self.create_recordset(
+            domain, name='a.%s' % domain['name'])
+
+        self.create_record(domain, recordset_one, fixture=0)
+        self.create_record(domain, recordset_one, fixture=1)
+        self.create_record(domain, recordset_two, fixture=0)
+        self.create_record(domain, recordset_three, fixture=0)
+
+        # Page through the records, two at a time
+        pages = []
+        marker = None
+
+        while True:
+            page = self.storage.find_export_records(
+                self.admin_context, domain['id'], marker=marker, limit=2)
+
+            records = [(rs.name, rs.type, r.data)
+                       for rs in page for r in rs.records]
+            pages.append(records)
+
+            if len(records) < 2:
+                break
+
+            marker = page[-1].records[-1].id
+
+        exported = sum(pages, [])
+
+        # The SOA, then the NS and four A records, ordered by name
+        self.assertEqual(6, len(exported))
+        self.assertEqual((domain['name'], 'SOA'), exported[0][:2])
+        self.assertEqual(sorted(r[0] for r in exported[1:]),
+                         [r[0] for r in exported[1:]])
+        self.assertIn((recordset_two['name'], 'A', '192.0.2.1'), exported)
+
+    def test_find_floatingip_records(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A', ttl=None)
+
+        def create_ptr(address, **kwargs):
+            kwargs.setdefault('managed_resource_type', 'ptr:floatingip')
+            return self._create_record_with_state(
+                domain, recordset, data=address, managed=True,
+                managed_extra=address, **kwargs)
+
+        ptr_one = create_ptr('192.0.2.1', managed_tenant_id='one')
+        ptr_two = create_ptr('192.0.2.2', managed_tenant_id='two')
+        create_ptr('192.0.2.3')
+        create_ptr('192.0.2.4', managed_resource_type='other')
+
+        recordsets = self.storage.find_floatingip_records(
+            self.admin_context, ['192.0.2.1', '192.0.2.2', '192.0.2.4'])
+
+        self.assertEqual(1, len(recordsets))
+        self.assertEqual(recordset['id'], recordsets[0].id)
+
+        # The recordset has no TTL of its own, so it's the domain's
+        self.assertEqual(domain['ttl'], recordsets[0].ttl)
+
+        records = sorted(recordsets[0].records, key=lambda r: r.data)
+        self.assertEqual([ptr_one['id'], ptr_two['id']],
+                         [r.id for r in records])
+        self.assertEqual(['one', 'two'],
+                         [r.managed_tenant_id for r in records])
+
+    def test_find_floatingip_records_deleted_domain(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+        self._create_record_with_state(
+            domain, recordset, data='192.0.2.1', managed=True,
+            managed_extra='192.0.2.1',
+            managed_resource_type='ptr:floatingip')
+
+        self.storage.delete_domain(self.admin_context, domain['id'])
+
+        recordsets = self.storage.find_floatingip_records(
+            self.admin_context, ['192.0.2.1'])
+
+        self.assertEqual(0, len(recordsets))
+
+    def test_find_export_records_missing_marker(self):
+        domain = self.create_domain()
+
+        with testtools.ExpectedException(exceptions.MarkerNotFound):
+            self.storage.find_export_records(
+                self.admin_context, domain['id'],
+                marker='caf771fc-6b05-4891-bee1-c2a48621f57b')
+
     def test_count_records(self):
         # in the beginning, there should be nothing
         records = self.storage.count_records(self.admin_context)
@@ -1485,6 +1925,64 @@ class StorageTestCase(object):
             records = self.storage.count_records(self.admin_context)
             self.assertEqual(records, 0)
 
+    def _get_record_count(self, domain):
+        return self.storage.get_domain(
+            self.admin_context, domain['id']).record_count
+
+    def test_record_count(self):
+        # The domain starts with its SOA and NS records
+        domain = self.create_domain()
+        self.assertEqual(2, self._get_record_count(domain))
+
+        recordset = self.create_recordset(domain, type='A')
+        record_one = self.create_record(domain, recordset, fixture=0)
+        record_two = self.create_record(domain, recordset, fixture=1)
+        self.assertEqual(4, self._get_record_count(domain))
+
+        self.storage.create_records_bulk(
+            self.admin_context, domain['id'], recordset['id'],
+            [objects.Record(data='192.0.2.3'),
+             objects.Record(data='192.0.2.4')])
+        self.assertEqual(6, self._get_record_count(domain))
+
+        self.storage.delete_record(self.admin_context, record_one['id'])
+        self.assertEqual(5, self._get_record_count(domain))
+
+        self.storage.delete_records_bulk(
+            self.admin_context, [record_two['id']])
+        self.assertEqual(4, self._get_record_count(domain))
+
+        # Deleting the recordset removes its two remaining records
+        self.storage.delete_recordset(self.admin_context, recordset['id'])
+        self.assertEqual(2, self._get_record_count(domain))
+
+    def test_record_count_purge_records(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain, type='A')
+
+        self._create_record_with_state(
+            domain, recordset, fixture=0, action='DELETE', status='PENDING',
+            serial=10)
+        self._create_record_with_state(
+            domain, recordset, fixture=1, action='NONE', status='ACTIVE',
+            serial=10)
+        self.assertEqual(4, self._get_record_count(domain))
+
+        self.storage.purge_records(
+            self.admin_context, domain['id'], statuses=['PENDING'],
+            actions=['DELETE'])
+        self.assertEqual(3, self._get_record_count(domain))
+
+    def test_reconcile_record_counts_none_drifted(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+        self.create_record(domain, recordset)
+
+        count = self.storage.reconcile_record_counts(self.admin_context)
+
+        self.assertEqual(0, count)
+        self.assertEqual(3, self._get_record_count(domain))
+
     def test_ping(self):
         pong = self.storage.ping(self.admin_context)
 
@@ -1653,6 +2151,18 @@ class StorageTestCase(object):
             uuid = 'cac1fc02-79b2-4e62-a1a4-427b6790bbe6'
             self.storage.delete_tld(self.admin_context, uuid)
 
+    def test_get_tlds_version(self):
+        versions = [self.storage.get_tlds_version(self.admin_context)]
+
+        tld = self.create_tld(fixture=0)
+        versions.append(self.storage.get_tlds_version(self.admin_context))
+
+        tld.description = 'New description'
+        self.storage.update_tld(self.admin_context, tld)
+        versions.append(self.storage.get_tlds_version(self.admin_context))
+
+        self.assertEqual(3, len(set(versions)))
+
     # Blacklist tests
     def test_create_blacklist(self):
         values = {
@@ -1801,6 +2311,29 @@ class StorageTestCase(object):
             uuid = '97f57960-f41b-4e93-8e22-8fd6c7e2c183'
             self.storage.delete_blacklist(self.admin_context, uuid)
 
+    def test_get_blacklists_version(self):
+        first_blacklist = self.create_blacklist(fixture=0)
+        versions = [self.storage.get_blacklists_version(self.admin_context)]
+
+        blacklist = self.create_blacklist(fixture=1)
+        versions.append(
+            self.storage.get_blacklists_version(self.admin_context))
+
+        blacklist.description = 'New description'
+        self.storage.update_blacklist(self.admin_context, blacklist)
+        versions.append(
+            self.storage.get_blacklists_version(self.admin_context))
+
+        self.storage.delete_blacklist(self.admin_context, first_blacklist.id)
+        versions.append(
+            self.storage.get_blacklists_version(self.admin_context))
+
+        # Every change moves the version, and it is stable otherwise
+        self.assertEqual(4, len(set(versions)))
+        self.assertEqual(
+            versions[-1],
+            self.storage.get_blacklists_version(self.admin_context))
+
     # Pool Tests
     def test_create_pool(self):
         values = {
@@ -2175,6 +2708,75 @@ class StorageTestCase(object):
         self.assertEqual(result.id, zt_accept.id)
         self.assertEqual(result.domain_id, zt_accept.domain_id)
 
+    # ZoneImport tests
+    def _create_zone_import(self, **kwargs):
+        values = {
+            'tenant_id': self.admin_context.tenant,
+            'status': 'PENDING',
+            'recordsets_imported': 0,
+        }
+        values.update(kwargs)
+
+        return self.storage.create_zone_import(
+            self.admin_context, objects.ZoneImport.from_dict(values))
+
+    def test_create_zone_import(self):
+        result = self._create_zone_import()
+
+        self.assertIsNotNone(result['id'])
+        self.assertIsNotNone(result['created_at'])
+        self.assertIsNone(result['updated_at'])
+
+        self.assertEqual(result['tenant_id'], self.admin_context.tenant)
+        self.assertEqual(result['status'], 'PENDING')
+        self.assertIsNone(result['domain_id'])
+
+    def test_find_zone_imports(self):
+        self._create_zone_import()
+        self._create_zone_import(status='ERROR')
+
+        results = self.storage.find_zone_imports(self.admin_context)
+        self.assertEqual(len(results), 2)
+
+        results = self.storage.find_zone_imports(
+            self.admin_context, {'status': 'ERROR'})
+        self.assertEqual(len(results), 1)
+
+    def test_get_zone_import(self):
+        zone_import = self._create_zone_import()
+
+        result = self.storage.get_zone_import(
+            self.admin_context, zone_import.id)
+        self.assertEqual(result.id, zone_import.id)
+
+    def test_get_zone_import_missing(self):
+        with testtools.ExpectedException(exceptions.ZoneImportNotFound):
+            uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
+            self.storage.get_zone_import(self.admin_context, uuid)
+
+    def test_update_zone_import(self):
+        domain = self.create_domain()
+        zone_import = self._create_zone_import()
+
+        zone_import.domain_id = domain.id
+        zone_import.recordsets_total = 10
+        zone_import.recordsets_imported = 5
+        result = self.storage.update_zone_import(
+            self.admin_context, zone_import)
+
+        self.assertEqual(result.domain_id, domain.id)
+        self.assertEqual(result.recordsets_total, 10)
+        self.assertEqual(result.recordsets_imported, 5)
+        self.assertEqual(result.version, 2)
+
+    def test_delete_zone_import(self):
+        zone_import = self._create_zone_import()
+
+        self.storage.delete_zone_import(self.admin_context, zone_import.id)
+
+        with testtools.ExpectedException(exceptions.ZoneImportNotFound):
+            self.storage.get_zone_import(self.admin_context, zone_import.id)
+
     # PoolAttribute tests
     def test_create_pool_attribute(self):
         values = {
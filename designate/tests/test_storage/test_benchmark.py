@@ -0,0 +1,50 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from oslo_log import log as logging
+
+from designate.tests import TestCase
+
+LOG = logging.getLogger(__name__)
+
+BENCHMARK = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'contrib',
+    'storage_benchmark.py'))
+
+
+class StorageBenchmarkTest(TestCase):
+    def setUp(self):
+        super(StorageBenchmarkTest, self).setUp()
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        self.connection = 'sqlite:///%s' % os.path.join(tempdir, 'bench.db')
+
+    def _run(self, *args):
+        # NOTE: The migrations keep the tables they load in module level
+        #       metadata, so the schema can't be built again in the process
+        #       running the tests.
+        return subprocess.check_output(
+            [sys.executable, BENCHMARK, '--connection', self.connection,
+             '--zones', '3', '--recordsets', '20', '--repeat', '1'] +
+            list(args), stderr=subprocess.STDOUT)
+
+    def test_benchmark_old_version(self):
+        output = self._run('--version', '51')
+
+        self.assertIn('Created 3 zones, 60 recordsets', output)
+        self.assertIn('floating IP PTRs by address', output)
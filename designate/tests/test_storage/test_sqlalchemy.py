@@ -13,10 +13,17 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import re
+
+from oslo_db import exception as oslo_db_exception
 from oslo_log import log as logging
 import mock
+from sqlalchemy import event
 
+from designate import objects
 from designate import storage
+from designate.sqlalchemy import session
+from designate.storage import impl_sqlalchemy
 from designate.tests import TestCase
 from designate.tests.test_storage import StorageTestCase
 
@@ -29,6 +36,42 @@ class SqlalchemyStorageTest(StorageTestCase, TestCase):
 
         self.storage = storage.get_storage('sqlalchemy')
 
+    def _capture_statements(self, engine=None, table=None):
+        engine = engine or self.storage.engine
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            if table is None or re.search(r'FROM %s\b' % table, statement):
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute',
+                        before_cursor_execute)
+
+        return statements
+
+    def _get_replica_storage(self, replica_reads=True):
+        # Use the test database as its own replica
+        self.config(slave_connection=self.db_fixture.url,
+                    group='storage:sqlalchemy')
+
+        facades = mock.patch.dict(session._FACADES, clear=True)
+        facades.start()
+        self.addCleanup(facades.stop)
+
+        replica_storage = impl_sqlalchemy.SQLAlchemyStorage()
+
+        primary = self._capture_statements(replica_storage.engine, 'tlds')
+        replica = self._capture_statements(replica_storage.replica_engine,
+                                           'tlds')
+
+        if replica_reads:
+            reads = replica_storage.replica_reads()
+            reads.__enter__()
+            self.addCleanup(reads.__exit__, None, None, None)
+
+        return replica_storage, primary, replica
+
     def test_ping_negative(self):
         with mock.patch.object(self.storage.engine, 'execute',
                                return_value=0):
@@ -36,3 +79,230 @@ class SqlalchemyStorageTest(StorageTestCase, TestCase):
 
             self.assertEqual(pong['status'], False)
             self.assertIsNotNone(pong['rtt'])
+
+    def test_find_recordsets_single_records_query(self):
+        domain = self.create_domain()
+
+        for i in range(5):
+            recordset = self.create_recordset(
+                domain, name='r-%d.%s' % (i, domain['name']))
+            self.create_record(domain, recordset)
+
+        statements = self._capture_statements()
+
+        results = self.storage.find_recordsets(
+            self.admin_context, {'domain_id': domain['id']})
+
+        # 5 recordsets, plus the SOA and NS recordsets
+        self.assertEqual(7, len(results))
+
+        # The records of every recordset are loaded by a single query
+        records_queries = [s for s in statements
+                           if re.search(r'FROM records\b', s)]
+        self.assertEqual(1, len(records_queries))
+
+    def test_recordset_exists_single_query(self):
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+        self.create_record(domain, recordset)
+
+        statements = self._capture_statements()
+
+        self.assertTrue(self.storage.recordset_exists(
+            self.admin_context,
+            {'domain_id': domain['id'], 'name': recordset['name']}))
+
+        # The recordset's records aren't loaded, and nothing is counted
+        statements = [s for s in statements if s != 'SELECT 1']
+
+        self.assertEqual(1, len(statements))
+        self.assertIsNone(re.search(r'FROM records\b', statements[0]))
+        self.assertNotIn('count(', statements[0])
+
+    def test_update_without_refetch(self):
+        domain = self.create_domain()
+        domain.email = 'updated@example.org'
+
+        statements = self._capture_statements()
+
+        self.storage.update_domain(self.admin_context, domain)
+
+        # Just the UPDATE, the row isn't selected again. "SELECT 1" is the
+        # connection being checked out of the pool.
+        statements = [s for s in statements if s != 'SELECT 1']
+
+        self.assertEqual(1, len(statements))
+        self.assertTrue(statements[0].startswith('UPDATE domains'))
+
+    def test_update_matches_stored_row(self):
+        # Check the values computed locally after each kind of update match
+        # what was stored
+        domain = self.create_domain()
+        recordset = self.create_recordset(domain)
+
+        matrix = [
+            (domain, 'email', 'updated@example.org',
+             self.storage.update_domain, self.storage.get_domain),
+            (recordset, 'ttl', 1800,
+             self.storage.update_recordset, self.storage.get_recordset),
+            (self.create_record(domain, recordset), 'data', '192.0.2.200',
+             self.storage.update_record, self.storage.get_record),
+            (self.create_tld(), 'description', 'updated',
+             self.storage.update_tld, self.storage.get_tld),
+            (self.create_tsigkey(), 'secret', 'updated',
+             self.storage.update_tsigkey, self.storage.get_tsigkey),
+            (self.create_blacklist(), 'description', 'updated',
+             self.storage.update_blacklist, self.storage.get_blacklist),
+        ]
+
+        for obj, field, value, update, get in matrix:
+            # Start from the current row, the objects may have been updated
+            # since they were created
+            obj = get(self.admin_context, obj.id)
+            obj[field] = value
+
+            updated = update(self.admin_context, obj)
+            stored = get(self.admin_context, obj.id)
+
+            for name in ('version', 'updated_at', field):
+                self.assertEqual(stored[name], updated[name],
+                                 '%s.%s' % (obj.__class__.__name__, name))
+
+            self.assertFalse(updated.obj_what_changed())
+
+    def test_update_returning(self):
+        domain = self.create_domain()
+        domain.email = 'updated@example.org'
+
+        result = mock.Mock(rowcount=1)
+        result.fetchone.return_value = (7,)
+
+        with mock.patch.object(self.storage.engine.dialect,
+                               'implicit_returning', True):
+            with mock.patch.object(self.storage.session, 'execute',
+                                   return_value=result) as execute:
+                self.storage.update_domain(self.admin_context, domain)
+
+        # The new version was read back from the UPDATE itself
+        self.assertEqual(1, execute.call_count)
+        self.assertIsNotNone(execute.call_args[0][0]._returning)
+        self.assertEqual(7, domain.version)
+
+    def test_reconcile_record_counts(self):
+        domain_one = self.create_domain(fixture=0)
+        domain_two = self.create_domain(fixture=1)
+
+        # Let both counts drift from the stored records
+        self.storage._adjust_record_count(domain_one['id'], 5)
+        self.storage._adjust_record_count(domain_two['id'], -1)
+
+        count = self.storage.reconcile_record_counts(
+            self.admin_context, domain_id=domain_one['id'])
+
+        self.assertEqual(1, count)
+        self.assertEqual(2, self.storage.get_domain(
+            self.admin_context, domain_one['id']).record_count)
+        self.assertEqual(1, self.storage.get_domain(
+            self.admin_context, domain_two['id']).record_count)
+
+        count = self.storage.reconcile_record_counts(self.admin_context)
+
+        self.assertEqual(1, count)
+        self.assertEqual(2, self.storage.get_domain(
+            self.admin_context, domain_two['id']).record_count)
+
+    def test_reader_without_replica(self):
+        self.assertIsNone(self.storage.replica_engine)
+
+        statements = self._capture_statements(table='tlds')
+        self.storage.find_tlds(self.admin_context)
+
+        self.assertEqual(1, len(statements))
+
+    def test_reader_uses_replica(self):
+        replica_storage, primary, replica = self._get_replica_storage()
+
+        replica_storage.find_tlds(self.admin_context)
+
+        self.assertEqual(0, len(primary))
+        self.assertEqual(1, len(replica))
+
+    def test_reader_without_replica_reads_uses_primary(self):
+        replica_storage, primary, replica = self._get_replica_storage(
+            replica_reads=False)
+
+        replica_storage.find_tlds(self.admin_context)
+
+        with replica_storage.replica_reads():
+            replica_storage.find_tlds(self.admin_context)
+
+        # Only the reads within replica_reads() use the replica
+        replica_storage.find_tlds(self.admin_context)
+
+        self.assertEqual(2, len(primary))
+        self.assertEqual(1, len(replica))
+
+    def test_reader_in_transaction_uses_primary(self):
+        replica_storage, primary, replica = self._get_replica_storage()
+
+        replica_storage.begin()
+        try:
+            replica_storage.find_tlds(self.admin_context)
+        finally:
+            replica_storage.rollback()
+
+        self.assertEqual(1, len(primary))
+        self.assertEqual(0, len(replica))
+
+    def test_reader_after_write_uses_primary(self):
+        replica_storage, primary, replica = self._get_replica_storage()
+        context = self.get_context(tenant='one', is_admin=True)
+
+        with mock.patch('time.time', return_value=1000):
+            replica_storage.create_tld(context, objects.Tld(name='com'))
+            del primary[:]
+
+            # Reads by the writing tenant see its write
+            replica_storage.find_tlds(context)
+            self.assertEqual(1, len(primary))
+
+            # Other tenants may read from the replica
+            replica_storage.find_tlds(
+                self.get_context(tenant='two', is_admin=True))
+            self.assertEqual(1, len(replica))
+
+        with mock.patch('time.time', return_value=1010):
+            replica_storage.find_tlds(context)
+            self.assertEqual(1, len(primary))
+            self.assertEqual(2, len(replica))
+
+    def test_reader_lagging_replica_uses_primary(self):
+        replica_storage, primary, replica = self._get_replica_storage()
+
+        with mock.patch.object(replica_storage, '_get_replica_lag',
+                               return_value=60) as get_replica_lag:
+            replica_storage.find_tlds(self.admin_context)
+            replica_storage.find_tlds(self.admin_context)
+
+        # The lag is only checked once per interval
+        self.assertEqual(1, get_replica_lag.call_count)
+        self.assertEqual(2, len(primary))
+        self.assertEqual(0, len(replica))
+
+    def test_reader_replica_failure_uses_primary(self):
+        replica_storage, primary, replica = self._get_replica_storage()
+
+        with mock.patch.object(
+                replica_storage, '_find', wraps=replica_storage._find,
+                side_effect=[oslo_db_exception.DBConnectionError(),
+                             objects.TldList()]) as find:
+            result = replica_storage.find_tlds(self.admin_context)
+
+        self.assertEqual(2, find.call_count)
+        self.assertIsInstance(result, objects.TldList)
+
+        # Reads stay on the primary until the lag is next checked
+        replica_storage.find_tlds(self.admin_context)
+
+        self.assertEqual(1, len(primary))
+        self.assertEqual(0, len(replica))
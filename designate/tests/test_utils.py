@@ -13,6 +13,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import datetime
 import os
 import tempfile
 
@@ -87,3 +88,30 @@ class TestUtils(TestCase):
                 self.assertEqual('Hello World', fh.read())
         finally:
             os.unlink(output_path)
+
+    def test_encode_decode_marker(self):
+        item = {'id': 'a', 'name': 'example.com.',
+                'created_at': datetime.datetime(2015, 1, 2, 3, 4, 5, 6)}
+
+        marker = utils.encode_marker(item, ['name', 'id', 'created_at'])
+
+        self.assertEqual({'id': 'a', 'name': 'example.com.',
+                          'created_at': '2015-01-02T03:04:05.000006'},
+                         utils.decode_marker(marker))
+
+    def test_get_next_marker(self):
+        items = [{'id': 'a'}, {'id': 'b', 'name': 'example.com.',
+                               'created_at': '2015-01-02T03:04:05.000006'}]
+
+        marker = utils.get_next_marker(items, 'name')
+
+        self.assertEqual({'id': 'b', 'name': 'example.com.',
+                          'created_at': '2015-01-02T03:04:05.000006'},
+                         utils.decode_marker(marker))
+
+        # Items lacking a sort key fall back to their ID
+        self.assertEqual('b', utils.get_next_marker(items, 'ttl'))
+
+    def test_decode_marker_invalid(self):
+        with testtools.ExpectedException(exceptions.InvalidMarker):
+            utils.decode_marker('invalid_marker')
@@ -13,7 +13,9 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import base64
 import copy
+import datetime
 import json
 import functools
 import inspect
@@ -139,6 +141,20 @@ def render_template(template, **template_context):
     return template.render(**template_context)
 
 
+def stream_template(template, buffer_size=100, **template_context):
+    """
+    Render a template as an iterator of unicode chunks, each holding
+    buffer_size pieces of the template's output.
+    """
+    if not isinstance(template, Template):
+        template = load_template(template)
+
+    stream = template.stream(**template_context)
+    stream.enable_buffering(buffer_size)
+
+    return stream
+
+
 def render_template_to_file(template_name, output_path, makedirs=True,
                             **template_context):
     output_folder = os.path.dirname(output_path)
@@ -289,6 +305,52 @@ def is_uuid_like(val):
         return False
 
 
+def encode_marker(item, sort_keys):
+    """
+    Encode the sort key values of the last item of a page as an opaque
+    paging cursor, allowing the next page to be fetched without looking the
+    marker item up again.
+    """
+    values = {}
+
+    for key in sort_keys:
+        value = item[key]
+
+        if isinstance(value, datetime.datetime):
+            value = timeutils.strtime(value)
+
+        values[key] = value
+
+    return base64.urlsafe_b64encode(json.dumps(values, sort_keys=True))
+
+
+def get_next_marker(items, sort_key=None):
+    """
+    Build the paging cursor for the page following items, from the sort key
+    values of its last item. Items lacking any of the sort keys fall back to
+    a plain ID marker.
+    """
+    sort_key = sort_key or 'created_at'
+
+    try:
+        return encode_marker(items[-1], [sort_key, 'id', 'created_at'])
+    except (KeyError, AttributeError):
+        return items[-1]['id']
+
+
+def decode_marker(marker):
+    """Decode a paging cursor created by encode_marker"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(marker)))
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise exceptions.InvalidMarker('Marker %s is invalid' % marker)
+
+    if not isinstance(values, dict):
+        raise exceptions.InvalidMarker('Marker %s is invalid' % marker)
+
+    return values
+
+
 def validate_uuid(*check):
     """
     A wrapper to ensure that API controller methods arguments are valid UUID's.